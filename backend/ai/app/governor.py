@@ -0,0 +1,172 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITIES = {"interactive": INTERACTIVE, "background": BACKGROUND}
+
+# Приоритет текущего запроса; задачи asyncio.gather наследуют его вместе с контекстом
+current_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+class GovernorRejected(Exception):
+    pass
+
+
+def is_overload(exc: Exception) -> bool:
+    # 429 / RESOURCE_EXHAUSTED от Gemini — сигнал, что мы упёрлись в квоту
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return code == 429 or "RESOURCE_EXHAUSTED" in str(exc) or "429" in str(exc)
+
+
+def _percentile(values, q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 1)
+
+
+class Governor:
+    # Регулятор исходящих запросов к LLM:
+    # - token bucket ограничивает частоту запросов (rate в секунду, burst — запас);
+    # - лимит одновременных запросов подстраивается по AIMD: +1/limit за успешный
+    #   быстрый ответ, ×backoff при 429 или задержке выше target_latency;
+    # - ожидающие слота стоят в очереди с приоритетом (interactive раньше background),
+    #   при переполнении очереди или слишком долгом ожидании запрос отклоняется.
+
+    BACKOFF = 0.5
+
+    def __init__(self, rate: float, burst: int, initial: int, min_limit: int, max_limit: int,
+                 target_latency: float, max_queue: int, max_wait: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._refilled_at = time.monotonic()
+
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self._decreased_at = 0.0
+
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+        self.rejected = {name: 0 for name in PRIORITIES}
+        self.decreases = 0
+        self.overloads = 0
+        self.wait_ms = {name: deque(maxlen=1000) for name in PRIORITIES}
+
+    def _free(self) -> bool:
+        return self.in_flight < max(int(self.limit), self.min_limit)
+
+    def _wake(self) -> None:
+        while self._waiters and self._free():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    async def _acquire_slot(self, priority: int) -> None:
+        if self._free() and not self._waiters:
+            self.in_flight += 1
+            return
+        name = _priority_name(priority)
+        if len(self._waiters) >= self.max_queue:
+            self.rejected[name] += 1
+            raise GovernorRejected("LLM queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # слот уже выдан, но ждать его больше некому — возвращаем
+                self.in_flight -= 1
+                self._wake()
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected[name] += 1
+                raise GovernorRejected("LLM queue wait timeout") from e
+            raise
+
+    async def _take_token(self) -> None:
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def _release(self, latency: float | None, overloaded: bool) -> None:
+        self.in_flight -= 1
+        now = time.monotonic()
+        if overloaded or (latency is not None and latency > self.target_latency):
+            # Не чаще раза за target_latency, чтобы одна волна 429 не обнулила лимит
+            if now - self._decreased_at > self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.BACKOFF)
+                self._decreased_at = now
+                self.decreases += 1
+        elif latency is not None:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self):
+        priority = current_priority.get()
+        started = time.monotonic()
+        await self._acquire_slot(priority)
+        try:
+            await self._take_token()
+        except BaseException:
+            self._release(None, False)
+            raise
+        self.wait_ms[_priority_name(priority)].append((time.monotonic() - started) * 1000)
+
+        call_started = time.monotonic()
+        overloaded = False
+        try:
+            yield
+        except Exception as e:
+            overloaded = is_overload(e)
+            if overloaded:
+                self.overloads += 1
+            raise
+        finally:
+            self._release(time.monotonic() - call_started, overloaded)
+
+    def stats(self) -> dict:
+        queued = {name: 0 for name in PRIORITIES}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                queued[_priority_name(priority)] += 1
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "tokens": round(self.tokens, 2),
+            "queued": queued,
+            "rejected": dict(self.rejected),
+            "overloads": self.overloads,
+            "limit_decreases": self.decreases,
+            "queue_wait_ms": {
+                name: {"p50": _percentile(w, 0.5), "p95": _percentile(w, 0.95)}
+                for name, w in self.wait_ms.items()
+            },
+        }
+
+
+def _priority_name(priority: int) -> str:
+    return "interactive" if priority == INTERACTIVE else "background"
@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+
+from google import genai
+from google.genai import types
+
+
+class FakeLLMError(Exception):
+    # Ошибка, которую подставные бэкенды выдают по заданной вероятности
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode()).hexdigest()
+
+
+class GeminiBackend:
+    def __init__(self, api_key: str, model: str):
+        self.client = genai.Client(api_key=api_key)
+        self.model = model
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                temperature=0.7
+            )
+        )
+        return response.text
+
+
+class RecordingBackend:
+    # Проксирует запросы в настоящий бэкенд и дописывает пары промпт → ответ (с задержкой) в JSONL
+    def __init__(self, inner, path: str):
+        self.inner = inner
+        self.model = inner.model
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    async def generate(self, prompt: str) -> str:
+        started = time.perf_counter()
+        text = await self.inner.generate(prompt)
+        record = {
+            "key": prompt_key(prompt),
+            "prompt": prompt,
+            "response": text,
+            "latency_ms": round((time.perf_counter() - started) * 1000),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return text
+
+
+class SyntheticBackend:
+    # Детерминированный ответ без сети: берёт кандидатов из компактного промпта
+    # в их порядке (он уже отсортирован локальным скорингом).
+    # Задержка — логнормальная с медианой latency_ms, ошибки — с вероятностями error_rate / overload_rate
+    ROW_RE = re.compile(r"^(\d+)\|([^|]*)\|", re.MULTILINE)
+    TOP_RE = re.compile(r"Select top (\d+)")
+    ROLE_RE = re.compile(r"^ROLE: (.*) \(needed: (\d+)\)$", re.MULTILINE)
+    model = "synthetic"
+
+    def __init__(self, latency_ms: float, latency_sigma: float, error_rate: float, overload_rate: float, seed: int | None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.overload_rate = overload_rate
+        self.random = random.Random(seed)
+
+    async def _delay(self, median_ms: float) -> None:
+        if median_ms > 0:
+            await asyncio.sleep(self.random.lognormvariate(0, self.latency_sigma) * median_ms / 1000)
+
+    def _maybe_fail(self) -> None:
+        roll = self.random.random()
+        if roll < self.overload_rate:
+            raise FakeLLMError(429, "RESOURCE_EXHAUSTED (synthetic)")
+        if roll < self.overload_rate + self.error_rate:
+            raise FakeLLMError(500, "INTERNAL (synthetic)")
+
+    def respond(self, prompt: str) -> str:
+        top = self.TOP_RE.search(prompt)
+        role = self.ROLE_RE.search(prompt)
+        rows = self.ROW_RE.findall(prompt)[:int(top.group(1)) if top else 3]
+        candidates = [
+            {"id": int(row_id), "score": max(100 - 7 * n, 1), "reason": f"{name.strip() or 'Кандидат'}: синтетический ответ"}
+            for n, (row_id, name) in enumerate(rows)
+        ]
+        return json.dumps({"results": [{
+            "role_name": role.group(1) if role else "Unknown",
+            "needed": int(role.group(2)) if role else 1,
+            "candidates": candidates,
+        }]}, ensure_ascii=False)
+
+    async def generate(self, prompt: str) -> str:
+        await self._delay(self.latency_ms)
+        self._maybe_fail()
+        return self.respond(prompt)
+
+
+class ReplayBackend(SyntheticBackend):
+    # Отдаёт записанные ответы по хэшу промпта. Задержка — записанная (или latency_ms,
+    # если задана), с тем же логнормальным разбросом; незнакомые промпты — синтетический ответ
+    model = "replay"
+
+    def __init__(self, path: str, latency_ms: float, latency_sigma: float, error_rate: float, overload_rate: float, seed: int | None):
+        super().__init__(latency_ms, latency_sigma, error_rate, overload_rate, seed)
+        self.records: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.records[record["key"]] = record
+        self.misses = 0
+
+    async def generate(self, prompt: str) -> str:
+        record = self.records.get(prompt_key(prompt))
+        if record is None:
+            self.misses += 1
+            return await super().generate(prompt)
+        await self._delay(self.latency_ms or record.get("latency_ms", 0))
+        self._maybe_fail()
+        return record["response"]
+
+
+def build_backend(settings):
+    mode = settings.LLM_BACKEND
+    fake = dict(
+        latency_ms=settings.LLM_FAKE_LATENCY_MS,
+        latency_sigma=settings.LLM_FAKE_LATENCY_SIGMA,
+        error_rate=settings.LLM_FAKE_ERROR_RATE,
+        overload_rate=settings.LLM_FAKE_429_RATE,
+        seed=settings.LLM_FAKE_SEED,
+    )
+    if mode == "gemini":
+        return GeminiBackend(settings.GEMINI_API_KEY, settings.GEMINI_MODEL)
+    if mode == "record":
+        return RecordingBackend(GeminiBackend(settings.GEMINI_API_KEY, settings.GEMINI_MODEL), settings.LLM_RECORD_PATH)
+    if mode == "replay":
+        return ReplayBackend(settings.LLM_RECORD_PATH, **fake)
+    if mode == "synthetic":
+        return SyntheticBackend(**fake)
+    raise ValueError(f"Unknown LLM_BACKEND: {mode}")
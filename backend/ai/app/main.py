@@ -1,14 +1,239 @@
+import asyncio
+import itertools
 import json
-import random
+import logging
+import time
 from fastapi import FastAPI
-from google import genai
-from google.genai import types
+from fastapi.responses import StreamingResponse
 from .settings import Settings
+from .scoring import SkillScorer
+from .prompt import CompactPrompt, encode_row, estimate_tokens
+from .retrieval import index, semantic_candidates, semantic_top, sync_profiles
+from .llm import build_backend
+from .governor import Governor, GovernorRejected, current_priority, PRIORITIES, INTERACTIVE
+from . import metrics
+
+logger = logging.getLogger(__name__)
 
 settings = Settings()
 app = FastAPI(title="ai-service")
 
-client = genai.Client(api_key=settings.GEMINI_API_KEY)
+# Gemini или подставной бэкенд (запись/воспроизведение/синтетика) — см. LLM_BACKEND
+backend = build_backend(settings)
+
+
+def _fallback(scorer: SkillScorer, i: int, top_n: int, pool: list[dict] | None = None) -> dict:
+    return {
+        "role_name": scorer.roles[i]["name"],
+        "needed": scorer.roles[i]["count"],
+        "candidates": scorer.top(i, top_n, ids=[c["id"] for c in pool] if pool is not None else None)
+    }
+
+
+async def _generate(prompt: str) -> tuple[list[dict], str]:
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        raw_response = await backend.generate(prompt)
+        outcome = "ok"
+    finally:
+        metrics.LLM_CALL_SECONDS.labels(backend.model, outcome).observe(time.perf_counter() - started)
+    
+    # Парсим JSON
+    parsed = json.loads(raw_response)
+    return parsed.get("results", []), raw_response
+
+
+# Общий на весь сервис регулятор запросов к LLM: частота, адаптивный лимит параллельности, приоритеты
+governor = Governor(
+    rate=settings.LLM_RATE_PER_SEC,
+    burst=settings.LLM_BURST,
+    initial=settings.MAX_CONCURRENCY,
+    min_limit=settings.LLM_MIN_CONCURRENCY,
+    max_limit=settings.LLM_MAX_CONCURRENCY,
+    target_latency=settings.LLM_TARGET_LATENCY_SECONDS,
+    max_queue=settings.LLM_MAX_QUEUE,
+    max_wait=settings.LLM_MAX_QUEUE_WAIT_SECONDS,
+)
+metrics.setup(app, governor)
+
+
+async def _ask(project: dict, scorer: SkillScorer, i: int, pool: list[dict], top_n: int) -> dict:
+    # Один запрос к LLM: роль i среди кандидатов pool. Ошибка повторяется
+    # до ROLE_RETRIES раз, после чего этот запрос уходит в локальный fallback
+    role = scorer.roles[i]
+    prompt = CompactPrompt(project, role, pool, top_n, settings.PROMPT_TOKEN_BUDGET, settings.BIO_TOKENS)
+    logger.info(
+        "prompt %s: %d bytes, ~%d tokens (saved %d bytes, ~%d tokens; dropped %d candidates)",
+        role["name"], len(prompt.text.encode()), prompt.tokens, prompt.bytes_saved, prompt.tokens_saved, prompt.dropped,
+    )
+    prompt_stats = {"prompt_tokens": prompt.tokens, "tokens_saved": prompt.tokens_saved}
+
+    started = time.perf_counter()
+    error = None
+    for attempt in range(settings.ROLE_RETRIES + 1):
+        try:
+            async with governor.slot():
+                results, raw = await _generate(prompt.text)
+            if not results:
+                raise ValueError("empty results")
+            metrics.LLM_ROLE_RESULTS.labels("llm").inc()
+            return {
+                **results[0],
+                "candidates": prompt.decode(results[0].get("candidates") or []),
+                "role_name": role["name"],
+                "needed": role["count"],
+                "raw": raw,
+                "latency_ms": round((time.perf_counter() - started) * 1000),
+                "attempts": attempt + 1,
+                "fallback": False,
+                "response_tokens": estimate_tokens(raw),
+                **prompt_stats,
+            }
+        except GovernorRejected as e:
+            # Очередь переполнена — повтор только усугубит, сразу уходим в fallback
+            error = e
+            logger.warning("llm rejected (role %s): %s", role["name"], e)
+            break
+        except Exception as e:
+            error = e
+            logger.warning("llm error (role %s, attempt %d): %s", role["name"], attempt + 1, e)
+
+    # === FALLBACK (ЗАПАСНОЙ ВАРИАНТ) ===
+    metrics.LLM_ROLE_RESULTS.labels("fallback").inc()
+    return {
+        **_fallback(scorer, i, top_n, pool),
+        "raw": f"Error: {str(error)}. Using fallback.",
+        "latency_ms": round((time.perf_counter() - started) * 1000),
+        "attempts": settings.ROLE_RETRIES + 1,
+        "fallback": True,
+        "response_tokens": 0,
+        **prompt_stats,
+    }
+
+
+async def _rank_role(project: dict, scorer: SkillScorer, i: int, top_n: int) -> dict:
+    # Локальный предварительный скоринг: в промпт попадает только шортлист роли,
+    # дополненный кандидатами, чьё bio близко к описанию проекта и роли
+    pool = scorer.shortlist(i, max(settings.SHORTLIST_SIZE, top_n))
+    if settings.SEMANTIC_TOP_K:
+        in_pool = {c["id"] for c in pool}
+        hits, _ = semantic_top(project, scorer.roles[i], settings.SEMANTIC_TOP_K, set(scorer.index))
+        pool += [scorer.candidates[scorer.index[doc_id]] for doc_id, _ in hits if doc_id not in in_pool]
+    return await _ask(project, scorer, i, pool, top_n)
+
+
+def _chunks(pool: list[dict], budget: int) -> list[list[dict]]:
+    # Жадно набиваем чанки кандидатами, пока оценка токенов не превысит бюджет
+    chunks = []
+    current = []
+    used = 0
+    for cand in pool:
+        tokens = estimate_tokens(encode_row(len(current), cand, settings.BIO_TOKENS))
+        if current and used + tokens > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(cand)
+        used += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def _tournament_role(project: dict, scorer: SkillScorer, i: int, top_n: int) -> dict:
+    # Турнир для пулов, не помещающихся в один промпт: пул режется на чанки
+    # по бюджету токенов, чанки ранжируются параллельно (не более CHUNK_FANOUT
+    # одновременно), победители чанков проходят в следующий раунд.
+    # Раунд из одного чанка — финал, он и даёт top_n. Финал наступает и принудительно:
+    # на CHUNK_MAX_ROUNDS раунде или если пул за раунд не сузился; тогда пул урезается
+    # до первого чанка, чтобы промпт не вышел за CHUNK_TOKEN_BUDGET.
+    pool_size = settings.CHUNKED_POOL_SIZE or len(scorer.candidates)
+    pool = scorer.shortlist(i, max(pool_size, top_n))
+    by_id = {c["id"]: c for c in pool}
+    fanout = asyncio.Semaphore(settings.CHUNK_FANOUT)
+
+    def winners(chunk: list[dict]) -> int:
+        # Из чанка выходит не больше половины кандидатов — так пул сужается с каждым раундом
+        return min(settings.CHUNK_WINNERS, max(len(chunk) // 2, 1))
+
+    async def rank_chunk(chunk: list[dict], final: bool) -> dict:
+        n = top_n if final else winners(chunk)
+        async with fanout:
+            return await _ask(project, scorer, i, chunk, n)
+
+    started = time.perf_counter()
+    stages = []
+    totals = {"attempts": 0, "prompt_tokens": 0, "response_tokens": 0, "tokens_saved": 0}
+    raws = []
+    previous = None
+    while True:
+        chunks = _chunks(pool, settings.CHUNK_TOKEN_BUDGET)
+        # Раунд финальный, если пул помещается в один чанк, если сузить его уже
+        # нельзя (чанки из одного кандидата) или после сужения останется меньше top_n
+        advancing = sum(winners(chunk) for chunk in chunks)
+        final = (
+            len(chunks) == 1 or advancing >= len(pool) or advancing < top_n
+            or len(stages) + 1 >= settings.CHUNK_MAX_ROUNDS
+            or (previous is not None and len(pool) >= previous)
+        )
+        if final:
+            pool = chunks[0]
+            chunks = [pool]
+
+        stage_started = time.perf_counter()
+        chunk_results = await asyncio.gather(*(rank_chunk(chunk, final) for chunk in chunks))
+        stages.append({
+            "round": len(stages) + 1,
+            "candidates": len(pool),
+            "chunks": len(chunks),
+            "fallback_chunks": sum(1 for r in chunk_results if r["fallback"]),
+            "ms": round((time.perf_counter() - stage_started) * 1000),
+        })
+        for key in totals:
+            totals[key] += sum(r[key] for r in chunk_results)
+        raws.extend(r["raw"] for r in chunk_results)
+
+        if final:
+            result = chunk_results[0]
+            break
+        previous = len(pool)
+        # decode уже обрезал ответ чанка до winners(chunk) и убрал повторы внутри чанка.
+        # Победители идут по местам (первые места всех чанков, затем вторые...), так что
+        # урезанный финал оставляет лучших из каждого чанка
+        ranked = [[c["id"] for c in r["candidates"] if c.get("id") in by_id] for r in chunk_results]
+        places = itertools.chain.from_iterable(itertools.zip_longest(*ranked))
+        advanced = list(dict.fromkeys(cid for cid in places if cid is not None))
+        if len(advanced) < top_n:
+            # Модель вернула меньше победителей, чем просили: добираем лучших по локальному скорингу
+            advanced += [c["id"] for c in pool if c["id"] not in advanced][:top_n - len(advanced)]
+        pool = [by_id[candidate_id] for candidate_id in advanced]
+
+    return {
+        **result,
+        "raw": "\n".join(raws),
+        "latency_ms": round((time.perf_counter() - started) * 1000),
+        **totals,
+        "stages": stages,
+    }
+
+
+def _with_semantic(payload: dict, project: dict, roles: list[dict], candidates: list[dict]) -> list[dict]:
+    # Кандидаты из запроса индексируются, а к ним добавляются профили из индекса, близкие
+    # к ролям по bio и навыкам, — в том числе отсечённые SQL-префильтром core по навыкам
+    sync_profiles(candidates)
+    if not settings.SEMANTIC_TOP_K:
+        return candidates
+    known = {c["id"] for c in candidates}
+    exclude = set(payload.get("exclude_ids") or [])
+    return candidates + semantic_candidates(project, roles, settings.SEMANTIC_TOP_K, known, exclude)
+
+
+def _split_meta(role_result: dict) -> tuple[dict, dict]:
+    meta_keys = ("raw", "latency_ms", "attempts", "fallback", "stages", "prompt_tokens", "response_tokens", "tokens_saved")
+    result = {k: v for k, v in role_result.items() if k not in meta_keys}
+    meta = {k: role_result[k] for k in meta_keys if k in role_result}
+    return result, meta
+
 
 @app.post("/match")
 async def match(payload: dict):
@@ -16,71 +241,88 @@ async def match(payload: dict):
     roles = payload.get("roles") or []
     candidates = payload.get("candidates") or []
     top_n = payload.get("top_n", 3)
+    current_priority.set(PRIORITIES.get(payload.get("priority"), INTERACTIVE))
+    # "chunked" — турнирное ранжирование всего пула вместо одного шортлиста на роль
+    rank = _tournament_role if payload.get("mode") == "chunked" else _rank_role
 
+    candidates = _with_semantic(payload, project, roles, candidates)
     if not candidates:
-        return {"results": [], "raw": "No candidates provided"}
+        results = [{"role_name": r["name"], "needed": r["count"], "candidates": []} for r in roles]
+        return {"results": results, "raw": "No candidates provided", "model": backend.model}
 
-    prompt = f"""You are an HR AI Assistant.
-    
-    PROJECT: {project.get("name")}
-    DESCRIPTION: {project.get("description")}
-    
-    ROLES NEEDED:
-    {json.dumps(roles)}
-    
-    CANDIDATES:
-    {json.dumps(candidates)}
-    
-    TASK:
-    Select top {top_n} candidates for EACH role.
-    
-    OUTPUT SCHEMA:
-    Return a JSON object with a key "results" containing a list of objects.
-    Each object must have: "role_name", "needed" (int), and "candidates" (list of objects with "id", "score", "reason").
-    """
+    # По запросу на роль, параллельно (в пределах MAX_CONCURRENCY)
+    scorer = SkillScorer(roles, candidates)
+    started = time.perf_counter()
+    role_results = await asyncio.gather(*(rank(project, scorer, i, top_n) for i in range(len(roles))))
 
-    raw_response = ""
     results = []
+    raws = []
+    timings = {}
+    for role_result in role_results:
+        result, meta = _split_meta(role_result)
+        results.append(result)
+        raws.append(f"[{result['role_name']}] {meta['raw']}")
+        timings[result["role_name"]] = {k: v for k, v in meta.items() if k != "raw"}
+
+    return {
+        "results": results,
+        "raw": "\n".join(raws),
+        "model": backend.model,
+        "timings": {"total_ms": round((time.perf_counter() - started) * 1000), "roles": timings},
+    }
+
+
+@app.post("/match/stream")
+async def match_stream(payload: dict):
+    # NDJSON: по строке на роль, в порядке готовности (каждая роль — отдельный запрос к LLM)
+    project = payload.get("project") or {}
+    roles = payload.get("roles") or []
+    candidates = payload.get("candidates") or []
+    top_n = payload.get("top_n", 3)
+    rank = _tournament_role if payload.get("mode") == "chunked" else _rank_role
+    candidates = _with_semantic(payload, project, roles, candidates)
+    scorer = SkillScorer(roles, candidates)
+
+    async def rank_role(i: int) -> dict:
+        if not candidates:
+            return {"role_name": roles[i]["name"], "needed": roles[i]["count"], "candidates": [], "raw": "No candidates provided"}
+        return await rank(project, scorer, i, top_n)
+
+    async def lines():
+        current_priority.set(PRIORITIES.get(payload.get("priority"), INTERACTIVE))
+        for task in asyncio.as_completed([rank_role(i) for i in range(len(roles))]):
+            result = await task
+            yield json.dumps({**result, "model": backend.model}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/governor/stats")
+async def governor_stats():
+    return governor.stats()
+
+
+@app.post("/index/profiles")
+async def index_profiles(payload: dict):
+    # Инкрементальное обновление семантического индекса: [{"id", "bio", "skills"}, ...]
+    indexed = sync_profiles(payload.get("profiles") or [])
+    return {"indexed": indexed, "size": len(index)}
+
+
+@app.get("/index/profiles")
+async def index_size():
+    # core сверяет размер с числом пользователей и при нехватке загружает профили заново
+    return {"size": len(index)}
+
+
+@app.delete("/index/profiles/{user_id}")
+async def remove_profile(user_id: int):
+    index.remove(user_id)
+    return {"ok": True, "size": len(index)}
 
-    try:
-        response = await client.aio.models.generate_content(
-            model=settings.GEMINI_MODEL,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-                temperature=0.7
-            )
-        )
-        
-        raw_response = response.text
-        
-        # Парсим JSON
-        parsed = json.loads(raw_response)
-        results = parsed.get("results", [])
-
-    except Exception as e:
-        print(f"⚠️ GEMINI ERROR: {e}")
-        
-        # === FALLBACK (ЗАПАСНОЙ ВАРИАНТ) ===
-        raw_response = f"Error: {str(e)}. Using fallback."
-        
-        fallback_results = []
-        for role in roles:
-            fake_candidates = []
-            available = candidates[:top_n] if len(candidates) >= top_n else candidates
-            for cand in available:
-                score = random.randint(70, 99)
-                fake_candidates.append({
-                    "id": cand["id"],
-                    "score": score,
-                    "reason": f"Подходит на роль {role['name']} (Gemini API Error Fallback)"
-                })
-            fake_candidates.sort(key=lambda x: x["score"], reverse=True)
-            fallback_results.append({
-                "role_name": role["name"],
-                "needed": role["count"],
-                "candidates": fake_candidates
-            })
-        results = fallback_results
 
-    return {"results": results, "raw": raw_response}
\ No newline at end of file
+@app.post("/index/search")
+async def index_search(payload: dict):
+    # Top-K по косинусной близости TF-IDF: описание проекта + роль против bio + навыков
+    hits, ms = semantic_top(payload.get("project") or {}, payload.get("role") or {}, payload.get("k", 10))
+    return {"results": [{"id": doc_id, "score": round(score, 4)} for doc_id, score in hits], "ms": round(ms, 3)}
@@ -0,0 +1,71 @@
+import time
+
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# HTTP-метрики те же, что в core-service (app/metrics.py)
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route", ["method", "route"])
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being processed")
+
+# Вызовы LLM (Gemini или подставной бэкенд): длительность по модели и исходу одной попытки,
+# и итог по ролям — доля fallback = fallback / все роли
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_duration_seconds", "LLM call latency", ["model", "outcome"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120),
+)
+LLM_ROLE_RESULTS = Counter("llm_role_results_total", "Role rankings by source", ["result"])
+LLM_CONCURRENCY_LIMIT = Gauge("llm_concurrency_limit", "Current adaptive LLM concurrency limit")
+LLM_IN_FLIGHT = Gauge("llm_in_flight", "LLM calls in progress")
+
+
+def route_template(scope) -> str:
+    # scope["route"] выставляет роутер; без совпадения (404) — одна общая метка. Префикс
+    # смонтированного приложения приходит в root_path, префикс роутера задаётся в самом
+    # APIRouter(prefix=...) и уже есть в route.path (префикс include_router FastAPI >= 0.137
+    # в route.path не кладёт)
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if not path:
+        return "unmatched"
+    return scope.get("root_path", "") + path
+
+
+class MetricsMiddleware:
+    # Чистый ASGI (не BaseHTTPMiddleware): не оборачивает тело, стриминговые ответы
+    # (/ai/match/stream) меряются до последнего байта
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            route = route_template(scope)
+            REQUEST_SECONDS.labels(scope["method"], route).observe(time.perf_counter() - started)
+            REQUESTS.labels(scope["method"], route, str(status)).inc()
+
+
+def setup(app: FastAPI, governor) -> None:
+    app.add_middleware(MetricsMiddleware)
+    LLM_CONCURRENCY_LIMIT.set_function(lambda: governor.limit)
+    LLM_IN_FLIGHT.set_function(lambda: governor.in_flight)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
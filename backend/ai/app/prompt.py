@@ -0,0 +1,100 @@
+import json
+import math
+import re
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    # Приближение к BPE: каждый знак препинания — токен, слово — токен на ~4 символа
+    return sum(max(1, math.ceil(len(t) / 4)) for t in _TOKEN_RE.findall(text or ""))
+
+
+def _clean(text) -> str:
+    # Разделители таблицы и переводы строк внутри полей ломают формат
+    return " ".join(str(text or "").replace("|", "/").split())
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    text = _clean(text)
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    words = []
+    used = 0
+    for word in text.split(" "):
+        used += estimate_tokens(word)
+        if used > max_tokens:
+            break
+        words.append(word)
+    return " ".join(words) + "…"
+
+
+def skills_text(skills: list[dict] | None) -> str:
+    return ",".join(f"{_clean(s.get('name')).replace(',', ' ')}:{s.get('level', 0)}" for s in skills or [])
+
+
+def encode_row(row_id: int, cand: dict, bio_tokens: int) -> str:
+    name = _clean(cand.get("name") or cand.get("username"))
+    return f"{row_id}|{name}|{skills_text(cand.get('skills'))}|{truncate_tokens(cand.get('bio'), bio_tokens)}"
+
+
+class CompactPrompt:
+    # Компактный промпт: кандидаты — строки таблицы "id|name|skills|bio" с короткими
+    # порядковыми id вместо настоящих, навыки — пары name:level, bio обрезано по токенам.
+    # Если промпт не влезает в бюджет, сначала сокращаются bio, затем отбрасываются
+    # последние (худшие по локальному скорингу) кандидаты.
+
+    def __init__(self, project: dict, role: dict, pool: list[dict], top_n: int, budget: int, bio_tokens: int):
+        self.project = project
+        self.role = role
+        self.top_n = top_n
+        self.pool = list(pool)
+        self.bio_tokens = bio_tokens
+
+        self.text = self._render()
+        while estimate_tokens(self.text) > budget:
+            if self.bio_tokens > 8:
+                self.bio_tokens //= 2
+            elif len(self.pool) > top_n:
+                self.pool = self.pool[:max(top_n, len(self.pool) * 3 // 4)]
+            else:
+                break
+            self.text = self._render()
+
+        self.tokens = estimate_tokens(self.text)
+        self.dropped = len(pool) - len(self.pool)
+        # Для сравнения — прежний формат (полные словари в JSON)
+        verbose = json.dumps(list(pool))
+        self.bytes_saved = len(verbose.encode()) - len(self.text.encode())
+        self.tokens_saved = estimate_tokens(verbose) - self.tokens
+
+    def _render(self) -> str:
+        rows = "\n".join(encode_row(i, c, self.bio_tokens) for i, c in enumerate(self.pool))
+        return f"""You are an HR AI Assistant.
+PROJECT: {_clean(self.project.get("name"))}
+DESCRIPTION: {truncate_tokens(self.project.get("description"), 400)}
+ROLE: {_clean(self.role["name"])} (needed: {self.role.get("count", 1)})
+ROLE SKILLS (name:level 0-10): {skills_text(self.role.get("skills"))}
+CANDIDATES (id|name|skills name:level|bio):
+{rows}
+TASK: Select top {self.top_n} candidates for the role. Use the candidate id from the first column.
+OUTPUT: JSON object {{"results": [{{"role_name": str, "needed": int, "candidates": [{{"id": int, "score": 0-100, "reason": str}}]}}]}}"""
+
+    def decode(self, candidates: list[dict]) -> list[dict]:
+        # Короткие id из ответа обратно в id пользователей; незнакомые и повторы отбрасываем,
+        # лишние сверх top_n — тоже (модель не всегда соблюдает число из промпта)
+        result = []
+        seen = set()
+        for c in candidates:
+            try:
+                row = int(c.get("id"))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= row < len(self.pool) and row not in seen:
+                seen.add(row)
+                result.append({**c, "id": self.pool[row]["id"]})
+                if len(result) == self.top_n:
+                    break
+        return result
@@ -0,0 +1,152 @@
+import hashlib
+import heapq
+import math
+import re
+import time
+from collections import Counter
+
+_WORD_RE = re.compile(r"\w+")
+# Грубый стемминг обрезкой: "разработчик"/"разработка" -> "разраб", "developer"/"development" -> "develo"
+_STEM_LEN = 6
+
+
+def tokenize(text: str) -> list[str]:
+    return [w[:_STEM_LEN] for w in _WORD_RE.findall((text or "").lower()) if len(w) > 1 and not w.isdigit()]
+
+
+def profile_terms(profile: dict) -> Counter:
+    terms = Counter(tokenize(profile.get("bio")))
+    # Навыки весят больше свободного текста и тем больше, чем выше уровень
+    for skill in profile.get("skills") or []:
+        weight = 2 + int(skill.get("level") or 0) // 3
+        for token in tokenize(skill.get("name")):
+            terms[token] += weight
+    return terms
+
+
+def query_terms(project: dict, role: dict) -> Counter:
+    terms = Counter(tokenize(project.get("description")))
+    terms.update(tokenize(role.get("name")))
+    for skill in role.get("skills") or []:
+        for token in tokenize(skill.get("name")):
+            terms[token] += 3
+    return terms
+
+
+class SemanticIndex:
+    # Разреженный TF-IDF индекс по bio + навыкам пользователей с инвертированным списком.
+    # Профили добавляются/обновляются по одному (upsert), без перестроения всего индекса.
+    # Нормы документов считаются при upsert по текущим idf и пересчитываются целиком,
+    # только когда размер корпуса заметно (на REFRESH_DRIFT) ушёл от момента последнего пересчёта.
+
+    REFRESH_DRIFT = 0.2
+
+    def __init__(self):
+        self.docs: dict[int, Counter] = {}
+        # Карточка профиля для промпта: кандидат из индекса может не прийти в запросе /match
+        self.profiles: dict[int, dict] = {}
+        self.hashes: dict[int, str] = {}
+        self.norms: dict[int, float] = {}
+        self.postings: dict[str, set[int]] = {}
+        self.df: Counter = Counter()
+        self._norms_size = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def idf(self, term: str) -> float:
+        return math.log((1 + len(self.docs)) / (1 + self.df.get(term, 0))) + 1.0
+
+    def _weight(self, tf: int, term: str) -> float:
+        return (1.0 + math.log(tf)) * self.idf(term)
+
+    def _norm(self, terms: Counter) -> float:
+        return math.sqrt(sum(self._weight(tf, t) ** 2 for t, tf in terms.items())) or 1.0
+
+    def upsert(self, profile: dict) -> bool:
+        doc_id = int(profile["id"])
+        card = {key: profile.get(key) for key in ("id", "name", "username", "bio", "skills")}
+        digest = hashlib.sha1(repr((profile.get("bio"), profile.get("skills"))).encode()).hexdigest()
+        if self.hashes.get(doc_id) == digest:
+            self.profiles[doc_id] = card
+            return False
+
+        self.remove(doc_id)
+        self.profiles[doc_id] = card
+        terms = profile_terms(profile)
+        self.docs[doc_id] = terms
+        self.hashes[doc_id] = digest
+        for term in terms:
+            self.df[term] += 1
+            self.postings.setdefault(term, set()).add(doc_id)
+        self.norms[doc_id] = self._norm(terms)
+        self._maybe_refresh()
+        return True
+
+    def remove(self, doc_id: int) -> None:
+        self.profiles.pop(doc_id, None)
+        terms = self.docs.pop(doc_id, None)
+        if terms is None:
+            return
+        self.hashes.pop(doc_id, None)
+        self.norms.pop(doc_id, None)
+        for term in terms:
+            self.df[term] -= 1
+            if self.df[term] <= 0:
+                del self.df[term]
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.discard(doc_id)
+                if not postings:
+                    del self.postings[term]
+
+    def _maybe_refresh(self) -> None:
+        size = len(self.docs)
+        if abs(size - self._norms_size) > self.REFRESH_DRIFT * max(self._norms_size, 1):
+            self.norms = {doc_id: self._norm(terms) for doc_id, terms in self.docs.items()}
+            self._norms_size = size
+
+    def search(self, terms: Counter, k: int, among: set[int] | None = None) -> list[tuple[int, float]]:
+        # Косинусная близость запроса к документам, у которых есть хотя бы один общий терм
+        query = {t: self._weight(tf, t) for t, tf in terms.items() if t in self.postings}
+        if not query:
+            return []
+        q_norm = math.sqrt(sum(w * w for w in query.values()))
+
+        scores: dict[int, float] = {}
+        for term, q_weight in query.items():
+            idf = self.idf(term)
+            for doc_id in self.postings[term]:
+                if among is not None and doc_id not in among:
+                    continue
+                d_weight = (1.0 + math.log(self.docs[doc_id][term])) * idf
+                scores[doc_id] = scores.get(doc_id, 0.0) + q_weight * d_weight
+
+        cosine = ((doc_id, score / (q_norm * self.norms[doc_id])) for doc_id, score in scores.items())
+        return heapq.nlargest(k, cosine, key=lambda item: (item[1], -item[0]))
+
+
+index = SemanticIndex()
+
+
+def sync_profiles(profiles: list[dict]) -> int:
+    # Индексирует только новые и изменившиеся профили
+    return sum(1 for p in profiles if index.upsert(p))
+
+
+def semantic_top(project: dict, role: dict, k: int, among: set[int] | None = None) -> tuple[list[tuple[int, float]], float]:
+    started = time.perf_counter()
+    hits = index.search(query_terms(project, role), k, among)
+    return hits, (time.perf_counter() - started) * 1000
+
+
+def semantic_candidates(project: dict, roles: list[dict], k: int, known: set[int], exclude: set[int]) -> list[dict]:
+    # Профили из индекса, близкие к ролям проекта, но не прошедшие SQL-префильтр core
+    # (например, нужный навык упомянут только в bio). exclude — владелец и участники проекта
+    found = {}
+    for role in roles:
+        hits, _ = semantic_top(project, role, k + len(known) + len(exclude))
+        fresh = [doc_id for doc_id, _ in hits if doc_id not in known and doc_id not in exclude]
+        for doc_id in fresh[:k]:
+            found.setdefault(doc_id, index.profiles[doc_id])
+    return list(found.values())
@@ -0,0 +1,101 @@
+import numpy as np
+
+
+def _norm(name) -> str:
+    return str(name or "").strip().lower()
+
+
+class SkillScorer:
+    # Локальный скоринг: роли и кандидаты превращаются в плотные матрицы
+    # (строка = роль/кандидат, столбец = навык), а оценки для всех пар
+    # кандидат × роль считаются одной векторной операцией.
+
+    COVERAGE_WEIGHT = 0.4
+    LEVEL_WEIGHT = 0.6
+
+    def __init__(self, roles: list[dict], candidates: list[dict]):
+        self.roles = roles
+        self.candidates = candidates
+
+        vocab: dict[str, int] = {}
+        for role in roles:
+            for skill in role.get("skills") or []:
+                vocab.setdefault(_norm(skill.get("name")), len(vocab))
+        self.vocab = vocab
+
+        # required[r, s] — требуемый уровень (0..10), needed[r, s] — навык нужен роли
+        self.required = np.zeros((len(roles), len(vocab)), dtype=np.float32)
+        self.needed = np.zeros((len(roles), len(vocab)), dtype=bool)
+        for i, role in enumerate(roles):
+            for skill in role.get("skills") or []:
+                j = vocab[_norm(skill.get("name"))]
+                self.required[i, j] = max(self.required[i, j], float(skill.get("level") or 0))
+                self.needed[i, j] = True
+
+        # levels[c, s] — уровень кандидата, has[c, s] — навык указан в профиле
+        self.levels = np.zeros((len(candidates), len(vocab)), dtype=np.float32)
+        self.has = np.zeros((len(candidates), len(vocab)), dtype=bool)
+        for i, cand in enumerate(candidates):
+            for skill in cand.get("skills") or []:
+                j = vocab.get(_norm(skill.get("name")))
+                if j is None:
+                    continue
+                self.levels[i, j] = max(self.levels[i, j], float(skill.get("level") or 0))
+                self.has[i, j] = True
+
+        self.ids = np.array([int(c["id"]) for c in candidates], dtype=np.int64)
+        self.index = {int(c["id"]): i for i, c in enumerate(candidates)}
+        self.scores = self._score()
+
+    def _score(self) -> np.ndarray:
+        n_roles, n_cands = len(self.roles), len(self.candidates)
+        if not n_roles or not n_cands or not self.vocab:
+            return np.zeros((n_roles, n_cands), dtype=np.float32)
+
+        # Более сложные навыки весят больше; навык без уровня весит 1
+        weights = np.where(self.needed, np.maximum(self.required, 1.0), 0.0)
+        total = weights.sum(axis=1)
+        total[total == 0] = 1.0
+
+        # Покрытие: доля (взвешенная) требуемых навыков, которые есть у кандидата
+        coverage = (self.has.astype(np.float32) @ weights.T) / total
+
+        # Соответствие уровню: min(уровень кандидата / требуемый, 1), считается
+        # сразу для всех ролей × кандидатов × навыков
+        req = np.maximum(self.required, 1.0)[:, None, :]
+        fit = np.minimum(self.levels[None, :, :] / req, 1.0)
+        # Навык без требуемого уровня засчитывается полностью, если он указан
+        fit = np.where((self.required[:, None, :] == 0) & self.has[None, :, :], 1.0, fit)
+        level_fit = (fit * weights[:, None, :]).sum(axis=2) / total[:, None]
+
+        scores = 100.0 * (self.COVERAGE_WEIGHT * coverage.T + self.LEVEL_WEIGHT * level_fit)
+        # Роли без навыков оценить нельзя
+        scores[~self.needed.any(axis=1)] = 0.0
+        return scores.astype(np.float32)
+
+    def ranking(self, role_index: int) -> np.ndarray:
+        # Детерминированный порядок: по убыванию оценки, при равенстве — по id
+        return np.lexsort((self.ids, -self.scores[role_index]))
+
+    def shortlist(self, role_index: int, size: int) -> list[dict]:
+        return [self.candidates[i] for i in self.ranking(role_index)[:size]]
+
+    def top(self, role_index: int, top_n: int, ids: list[int] | None = None) -> list[dict]:
+        role = self.roles[role_index]
+        needed = self.needed[role_index]
+        total = int(needed.sum())
+        ranking = self.ranking(role_index)
+        if ids is not None:
+            # Только среди указанных кандидатов (например, внутри одного чанка)
+            allowed = np.zeros(len(self.candidates), dtype=bool)
+            allowed[[self.index[int(x)] for x in ids if int(x) in self.index]] = True
+            ranking = ranking[allowed[ranking]]
+        result = []
+        for i in ranking[:top_n]:
+            matched = int((self.has[i] & needed).sum())
+            result.append({
+                "id": int(self.ids[i]),
+                "score": int(round(float(self.scores[role_index, i]))),
+                "reason": f"Совпадение навыков для роли {role['name']}: {matched}/{total} (локальный скоринг)",
+            })
+        return result
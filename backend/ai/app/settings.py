@@ -4,6 +4,46 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
     
     # Меняем название переменной, чтобы не путаться
-    GEMINI_API_KEY: str 
+    GEMINI_API_KEY: str = ""
     # Модель можно зашить тут жестко
-    GEMINI_MODEL: str = "gemini-2.5-flash"
\ No newline at end of file
+    GEMINI_MODEL: str = "gemini-2.5-flash"
+    # Сколько лучших кандидатов на роль (по локальному скорингу) видит LLM
+    SHORTLIST_SIZE: int = 20
+    # Начальный лимит одновременных запросов к LLM (по всем запросам /match);
+    # дальше регулятор (app/governor.py) двигает его в пределах LLM_MIN/MAX_CONCURRENCY
+    MAX_CONCURRENCY: int = 4
+    # Сколько раз повторить запрос по роли, прежде чем уйти в локальный fallback
+    ROLE_RETRIES: int = 1
+    # Турнирный режим (/match с "mode": "chunked"): размер пула на роль (0 — все кандидаты),
+    # бюджет токенов на чанк, сколько победителей выходит из чанка и сколько чанков ранжируется одновременно
+    CHUNKED_POOL_SIZE: int = 0
+    CHUNK_TOKEN_BUDGET: int = 6000
+    CHUNK_WINNERS: int = 5
+    CHUNK_FANOUT: int = 4
+    # Предел числа раундов турнира: последний раунд всегда финальный
+    CHUNK_MAX_ROUNDS: int = 4
+    # Бюджет промпта в токенах (оценка до вызова) и сколько токенов bio кандидата попадает в промпт
+    PROMPT_TOKEN_BUDGET: int = 8000
+    BIO_TOKENS: int = 60
+    # Сколько кандидатов из семантического индекса (TF-IDF по bio) добавить к шортлисту роли (0 — не добавлять)
+    SEMANTIC_TOP_K: int = 10
+    # Регулятор запросов к LLM: частота (token bucket), границы адаптивного лимита,
+    # целевая задержка ответа и ограничения очереди ожидания
+    LLM_RATE_PER_SEC: float = 5.0
+    LLM_BURST: int = 10
+    LLM_MIN_CONCURRENCY: int = 1
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_TARGET_LATENCY_SECONDS: float = 20.0
+    LLM_MAX_QUEUE: int = 200
+    LLM_MAX_QUEUE_WAIT_SECONDS: float = 60.0
+    # Бэкенд LLM: gemini | record (gemini + запись промпт → ответ в LLM_RECORD_PATH)
+    # | replay (ответы из записи, незнакомые промпты — синтетика) | synthetic (без сети)
+    LLM_BACKEND: str = "gemini"
+    LLM_RECORD_PATH: str = "recordings/llm.jsonl"
+    # Для replay/synthetic: медиана задержки в мс (0 — для replay записанная, для synthetic без задержки),
+    # разброс (sigma логнормального распределения), доли ошибок 500 и 429, seed для воспроизводимости
+    LLM_FAKE_LATENCY_MS: float = 0
+    LLM_FAKE_LATENCY_SIGMA: float = 0.3
+    LLM_FAKE_ERROR_RATE: float = 0.0
+    LLM_FAKE_429_RATE: float = 0.0
+    LLM_FAKE_SEED: int | None = None
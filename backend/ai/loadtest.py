@@ -0,0 +1,85 @@
+# Нагрузочный прогон пути подбора без живого Gemini.
+# ai-service запускается с LLM_BACKEND=synthetic (или replay) и нужными LLM_FAKE_*,
+# затем, например:
+#   python loadtest.py --url http://localhost:8001/match --requests 200 --concurrency 20
+#   python loadtest.py --url http://localhost:8000/ai/match --token <JWT> --project-id 1
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+SKILLS = ["Python", "SQL", "React", "Go", "Docker", "Figma", "ML", "Kotlin", "Swift", "Rust"]
+
+
+def synthetic_payload(n_candidates: int, n_roles: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    roles = [
+        {"name": f"Role {r}", "count": 1, "skills": [{"name": s, "level": rnd.randint(3, 9)} for s in rnd.sample(SKILLS, 3)]}
+        for r in range(n_roles)
+    ]
+    candidates = [
+        {
+            "id": i,
+            "name": f"User {i}",
+            "username": f"user{i}",
+            "bio": "Опыт в " + ", ".join(rnd.sample(SKILLS, 4)),
+            "skills": [{"name": s, "level": rnd.randint(1, 10)} for s in rnd.sample(SKILLS, rnd.randint(1, 5))],
+        }
+        for i in range(1, n_candidates + 1)
+    ]
+    return {"project": {"id": 1, "name": "Load test", "description": "Синтетический проект"}, "roles": roles, "candidates": candidates, "top_n": 3}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8001/match")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=500)
+    parser.add_argument("--roles", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--token", help="JWT для core /ai/match")
+    parser.add_argument("--project-id", type=int, help="project_id для core /ai/match")
+    args = parser.parse_args()
+
+    if args.project_id is not None:
+        payload = {"project_id": args.project_id, "top_n": 3}
+    else:
+        payload = synthetic_payload(args.candidates, args.roles, args.seed)
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+
+    latencies = []
+    statuses = {}
+    fallbacks = 0
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(timeout=180, headers=headers) as client:
+        async def one():
+            nonlocal fallbacks
+            async with slots:
+                started = time.perf_counter()
+                r = await client.post(args.url, json=payload)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+                if r.status_code == 200 and isinstance(r.json(), dict):
+                    roles = (r.json().get("timings") or {}).get("roles") or {}
+                    fallbacks += sum(1 for t in roles.values() if t.get("fallback"))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"requests: {args.requests}, concurrency: {args.concurrency}, elapsed: {elapsed:.2f}s, rps: {args.requests / elapsed:.1f}")
+    print(f"statuses: {statuses}, fallback roles: {fallbacks}")
+    print(
+        f"latency ms: p50={statistics.median(latencies):.0f} "
+        f"p95={latencies[int(0.95 * (len(latencies) - 1))]:.0f} max={latencies[-1]:.0f}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,6 @@
+import os
+
+# Без сети и без ограничения частоты: LLM в тестах подменяется заглушками
+os.environ.setdefault("LLM_BACKEND", "synthetic")
+os.environ.setdefault("LLM_RATE_PER_SEC", "1000")
+os.environ.setdefault("LLM_BURST", "1000")
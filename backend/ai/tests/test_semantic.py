@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from app import main, retrieval
+from app.retrieval import SemanticIndex
+
+
+class EchoBackend:
+    # Возвращает всех кандидатов промпта в их порядке
+    model = "echo"
+
+    async def generate(self, prompt: str) -> str:
+        rows = [line.split("|")[0] for line in prompt.splitlines() if line[:1].isdigit() and "|" in line]
+        candidates = [{"id": int(row), "score": 50, "reason": "ok"} for row in rows]
+        return json.dumps({"results": [{"role_name": "ML", "needed": 1, "candidates": candidates}]})
+
+
+@pytest.fixture
+def fresh_index(monkeypatch):
+    index = SemanticIndex()
+    monkeypatch.setattr(retrieval, "index", index)
+    monkeypatch.setattr(main, "index", index)
+    monkeypatch.setattr(main, "backend", EchoBackend())
+    return index
+
+
+PROJECT = {"id": 1, "name": "Recsys", "description": "recommendation system with pytorch"}
+ROLES = [{"name": "ML", "count": 1, "skills": [{"name": "PyTorch", "level": 5}]}]
+
+
+async def test_bio_only_candidate_found_outside_prefilter(fresh_index):
+    # Профиль пришёл из core через /index/profiles; навыка PyTorch в skills нет, он только в bio,
+    # поэтому SQL-префильтр core его не пропустил и в запросе /match его нет
+    retrieval.sync_profiles([
+        {"id": 7, "name": "Bio Only", "bio": "I build pytorch recommendation models", "skills": []},
+        {"id": 8, "name": "Member", "bio": "pytorch recommendation", "skills": []},
+    ])
+    prefiltered = [{"id": 1, "name": "Skill", "bio": "", "skills": [{"name": "PyTorch", "level": 6}]}]
+
+    response = await main.match({
+        "project": PROJECT, "roles": ROLES, "candidates": prefiltered, "top_n": 5, "exclude_ids": [8],
+    })
+
+    ids = [c["id"] for c in response["results"][0]["candidates"]]
+    assert 7 in ids and 1 in ids
+    assert 8 not in ids
+
+
+async def test_match_with_empty_prefilter_uses_index(fresh_index):
+    retrieval.sync_profiles([{"id": 7, "name": "Bio Only", "bio": "pytorch recommendation", "skills": []}])
+
+    response = await main.match({"project": PROJECT, "roles": ROLES, "candidates": [], "top_n": 3})
+
+    assert [c["id"] for c in response["results"][0]["candidates"]] == [7]
+
+
+async def test_match_without_any_candidates_returns_empty_roles(fresh_index):
+    response = await main.match({"project": PROJECT, "roles": ROLES, "candidates": [], "top_n": 3})
+    assert response["results"] == [{"role_name": "ML", "needed": 1, "candidates": []}]
+
+
+def test_removed_profile_is_not_suggested(fresh_index):
+    retrieval.sync_profiles([{"id": 7, "name": "Bio Only", "bio": "pytorch", "skills": []}])
+    fresh_index.remove(7)
+    assert retrieval.semantic_candidates(PROJECT, ROLES, 5, set(), set()) == []
@@ -0,0 +1,107 @@
+import json
+import re
+
+import pytest
+
+from app import main
+from app.prompt import CompactPrompt, estimate_tokens
+from app.scoring import SkillScorer
+
+ROW_RE = re.compile(r"^(\d+)\|", re.MULTILINE)
+ROW_LINE_RE = re.compile(r"^\d+\|.*$", re.MULTILINE)
+TOP_RE = re.compile(r"Select top (\d+)")
+
+
+class GreedyBackend:
+    # Модель, которая не слушается: возвращает всех кандидатов промпта, да ещё и дважды
+    model = "greedy"
+
+    def __init__(self):
+        self.calls = 0
+        self.prompts = []
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        self.prompts.append(prompt)
+        rows = [int(row) for row in ROW_RE.findall(prompt)]
+        candidates = [{"id": row, "score": 50, "reason": "ok"} for row in rows + rows]
+        return json.dumps({"results": [{"role_name": "Backend", "needed": 1, "candidates": candidates}]})
+
+
+class SilentBackend(GreedyBackend):
+    # Модель, которая не выбирает никого
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        return json.dumps({"results": [{"role_name": "Backend", "needed": 1, "candidates": []}]})
+
+
+def _scorer(n: int) -> SkillScorer:
+    roles = [{"name": "Backend", "count": 1, "skills": [{"name": "Python", "level": 5}]}]
+    candidates = [
+        {"id": 1000 + i, "name": f"User {i}", "bio": "backend developer " * 20, "skills": [{"name": "Python", "level": i % 10}]}
+        for i in range(n)
+    ]
+    return SkillScorer(roles, candidates)
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # ~10 кандидатов на чанк, чтобы 200 кандидатов давали несколько раундов
+    monkeypatch.setattr(main.settings, "CHUNK_TOKEN_BUDGET", 400)
+    monkeypatch.setattr(main.settings, "CHUNK_WINNERS", 5)
+
+
+def test_decode_drops_duplicates_and_extra_ids():
+    pool = [{"id": 10 + i, "name": f"U{i}"} for i in range(5)]
+    prompt = CompactPrompt({}, {"name": "Backend"}, pool, 2, 8000, 60)
+    decoded = prompt.decode([{"id": 1}, {"id": 1}, {"id": "x"}, {"id": 9}, {"id": 3}, {"id": 4}])
+    assert [c["id"] for c in decoded] == [11, 13]
+
+
+async def test_tournament_terminates_when_model_returns_too_many(monkeypatch, small_chunks):
+    backend = GreedyBackend()
+    monkeypatch.setattr(main, "backend", backend)
+
+    result = await main._tournament_role({"name": "P", "description": "d"}, _scorer(200), 0, 3)
+
+    assert len(result["stages"]) <= main.settings.CHUNK_MAX_ROUNDS
+    assert [s["candidates"] for s in result["stages"]] == sorted((s["candidates"] for s in result["stages"]), reverse=True)
+    assert len(result["candidates"]) == 3
+    assert len({c["id"] for c in result["candidates"]}) == 3
+    assert backend.calls == sum(s["chunks"] for s in result["stages"])
+
+
+async def test_tournament_round_limit(monkeypatch, small_chunks):
+    monkeypatch.setattr(main.settings, "CHUNK_MAX_ROUNDS", 2)
+    monkeypatch.setattr(main, "backend", GreedyBackend())
+
+    result = await main._tournament_role({"name": "P", "description": "d"}, _scorer(400), 0, 3)
+
+    assert len(result["stages"]) == 2
+    assert result["stages"][-1]["chunks"] == 1
+
+
+async def test_tournament_tops_up_when_model_returns_nobody(monkeypatch, small_chunks):
+    backend = SilentBackend()
+    monkeypatch.setattr(main, "backend", backend)
+
+    result = await main._tournament_role({"name": "P", "description": "d"}, _scorer(200), 0, 3)
+
+    # Победителей нет — следующий раунд из top_n лучших по скорингу, и он финальный
+    assert len(result["stages"]) == 2
+    assert result["stages"][-1]["candidates"] == 3
+
+
+async def test_forced_final_fits_token_budget(monkeypatch, small_chunks):
+    # Пул после единственного раунда не помещается в один чанк: финал всё равно в пределах бюджета
+    monkeypatch.setattr(main.settings, "CHUNK_MAX_ROUNDS", 2)
+    backend = GreedyBackend()
+    monkeypatch.setattr(main, "backend", backend)
+
+    result = await main._tournament_role({"name": "P", "description": "d"}, _scorer(400), 0, 3)
+
+    assert result["stages"][-1]["chunks"] == 1
+    assert len(result["candidates"]) == 3
+    for prompt in backend.prompts:
+        rows = ROW_LINE_RE.findall(prompt)
+        assert sum(estimate_tokens(row) for row in rows) <= main.settings.CHUNK_TOKEN_BUDGET
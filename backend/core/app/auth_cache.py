@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from .config import settings
+from .models import User
+from .redis_client import redis_client
+from .security import decode_token
+
+logger = logging.getLogger(__name__)
+
+# Канал, по которому воркеры сообщают друг другу id пользователя с изменившимся профилем
+INVALIDATE_CHANNEL = "auth:user:invalidate"
+
+# Уровень 1 (в процессе): расшифрованные claims по хэшу токена и строки пользователей
+_claims: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+_users: dict[int, tuple[dict, float]] = {}
+_listener: asyncio.Task | None = None
+
+# Время проверки токена (hit — claims из кэша, miss — расшифровка JWT) и поиска пользователя по источнику.
+# С AUTH_CACHE_ENABLED=false всё идёт через miss + db — это путь без кэша для сравнения
+_claims_ms = {source: deque(maxlen=2000) for source in ("hit", "miss")}
+_user_ms = {source: deque(maxlen=2000) for source in ("local", "redis", "db")}
+
+
+def _user_key(user_id: int) -> str:
+    # Уровень 2 (Redis): строка пользователя, общая для всех воркеров
+    return f"auth:user:{user_id}"
+
+
+def claims(token: str) -> dict:
+    started = time.perf_counter()
+    if not settings.AUTH_CACHE_ENABLED:
+        payload = decode_token(token, settings.JWT_SECRET)
+        _claims_ms["miss"].append((time.perf_counter() - started) * 1000)
+        return payload
+
+    key = hashlib.sha256(token.encode()).hexdigest()
+    now = time.monotonic()
+    cached = _claims.get(key)
+    if cached is not None and cached[1] > now:
+        _claims.move_to_end(key)
+        _claims_ms["hit"].append((time.perf_counter() - started) * 1000)
+        return cached[0]
+
+    payload = decode_token(token, settings.JWT_SECRET)
+    _claims_ms["miss"].append((time.perf_counter() - started) * 1000)
+    if payload:
+        # Не дольше, чем живёт сам токен
+        ttl = min(settings.AUTH_CLAIMS_TTL_SECONDS, payload.get("exp", float("inf")) - time.time())
+        if ttl > 0:
+            _claims[key] = (payload, now + ttl)
+            _claims.move_to_end(key)
+            while len(_claims) > settings.AUTH_CLAIMS_CACHE_SIZE:
+                _claims.popitem(last=False)
+    return payload
+
+
+def _to_row(user: User) -> dict:
+    # Генерируемые столбцы (search_vector) не загружаются и в кэш не попадают
+    return {c.name: getattr(user, c.name) for c in User.__table__.columns if c.computed is None}
+
+
+def _from_row(row: dict) -> User:
+    # Отсоединённый объект: для чтения атрибутов сессия не нужна,
+    # изменять профиль нужно через строку, загруженную в сессии запроса
+    user = User(**row)
+    make_transient_to_detached(user)
+    return user
+
+
+async def load_user(db: AsyncSession, user_id: int) -> User | None:
+    started = time.perf_counter()
+    source = "db"
+    row = None
+
+    if settings.AUTH_CACHE_ENABLED:
+        cached = _users.get(user_id)
+        if cached is not None and cached[1] > time.monotonic():
+            row, source = cached[0], "local"
+        else:
+            try:
+                raw = await redis_client.get(_user_key(user_id))
+            except RedisError as e:
+                logger.warning("auth cache unavailable: %s", e)
+                raw = None
+            if raw is not None:
+                row, source = json.loads(raw), "redis"
+
+    if row is None:
+        res = await db.execute(select(User).where(User.id == user_id))
+        user = res.scalar_one_or_none()
+        if user is None:
+            return None
+        if settings.AUTH_CACHE_ENABLED:
+            row = _to_row(user)
+            try:
+                await redis_client.setex(_user_key(user_id), settings.AUTH_USER_TTL_SECONDS, json.dumps(row, ensure_ascii=False))
+            except RedisError as e:
+                logger.warning("auth cache unavailable: %s", e)
+    else:
+        user = _from_row(row)
+
+    if settings.AUTH_CACHE_ENABLED and source != "local":
+        _users[user_id] = (row, time.monotonic() + settings.AUTH_USER_LOCAL_TTL_SECONDS)
+    _user_ms[source].append((time.perf_counter() - started) * 1000)
+    return user
+
+
+async def invalidate_user(user_id: int) -> None:
+    # Вызывать после коммита изменений профиля: Redis-копия удаляется, остальные воркеры
+    # узнают через pub/sub и выбрасывают свою локальную
+    _users.pop(user_id, None)
+    try:
+        await redis_client.delete(_user_key(user_id))
+        await redis_client.publish(INVALIDATE_CHANNEL, str(user_id))
+    except RedisError as e:
+        logger.warning("auth cache invalidation failed: %s", e)
+
+
+async def _listen() -> None:
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATE_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _users.pop(int(message["data"]), None)
+        except asyncio.CancelledError:
+            raise
+        except RedisError as e:
+            # Пока подписки нет, локальные копии живут не дольше AUTH_USER_LOCAL_TTL_SECONDS
+            logger.warning("auth invalidation listener: %s", e)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+
+def start() -> None:
+    global _listener
+    _listener = asyncio.create_task(_listen())
+
+
+async def stop() -> None:
+    global _listener
+    if _listener is None:
+        return
+    _listener.cancel()
+    await asyncio.gather(_listener, return_exceptions=True)
+    _listener = None
+
+
+def stats() -> dict:
+    def percentiles(values) -> dict:
+        values = sorted(values)
+        if not values:
+            return {"count": 0, "p50": None, "p95": None}
+        return {
+            "count": len(values),
+            "p50": round(values[len(values) // 2], 3),
+            "p95": round(values[min(len(values) - 1, int(0.95 * len(values)))], 3),
+        }
+
+    return {
+        "enabled": settings.AUTH_CACHE_ENABLED,
+        "claims_cached": len(_claims),
+        "users_cached": len(_users),
+        "claims_ms": {source: percentiles(values) for source, values in _claims_ms.items()},
+        "user_ms": {source: percentiles(values) for source, values in _user_ms.items()},
+    }
@@ -4,11 +4,99 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
     CORE_DATABASE_URL: str
+    # Реплика для чтения (необязательна, см. app/read_routing.py); без неё всё читается из primary
+    CORE_READ_DATABASE_URL: str | None = None
     REDIS_URL: str
     JWT_SECRET: str
     JWT_EXPIRE_MINUTES: int = 60 * 24 * 30
     TG_SERVICE_URL: str
     AI_SERVICE_URL: str
+    # Telegram id администраторов (JSON-список, например [123, 456]): только им доступны
+    # служебные эндпоинты (/internal/*, статистика аудита и кэша). Пусто — недоступны никому
+    ADMIN_TELEGRAM_IDS: set[int] = set()
+
+    # Насколько уровень кандидата может быть ниже требуемого, чтобы пройти SQL-префильтр /ai/match
+    MATCH_LEVEL_TOLERANCE: int = 2
+    # Сколько живёт закэшированный результат /ai/match (инвалидация — через версии, см. match_cache)
+    MATCH_CACHE_TTL_SECONDS: int = 60 * 60
+    # Фоновые задачи подбора (POST /ai/match?job=true)
+    MATCH_JOB_WORKERS: int = 2
+    MATCH_JOB_TTL_SECONDS: int = 60 * 60 * 24
+    # Взятая задача, не завершившаяся за MATCH_JOB_STALE_SECONDS (воркер упал), возвращается в очередь;
+    # проверка раз в MATCH_JOB_REAP_SECONDS, после MATCH_JOB_MAX_ATTEMPTS запусков задача — failed
+    MATCH_JOB_STALE_SECONDS: int = 600
+    MATCH_JOB_REAP_SECONDS: float = 60.0
+    MATCH_JOB_MAX_ATTEMPTS: int = 3
+    # Single-flight для одинаковых одновременных подборов: TTL блокировки (больше таймаута ai-service)
+    # и сколько хранится результат для ожидающих
+    MATCH_FLIGHT_LOCK_SECONDS: int = 150
+    MATCH_FLIGHT_RESULT_SECONDS: int = 30
+
+    # Аудит запросов к LLM (llm_requests) пишется фоном пачками: размер буфера (при переполнении
+    # строки отбрасываются), размер пачки и максимум ожидания пачки
+    AUDIT_QUEUE_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 200
+    AUDIT_FLUSH_SECONDS: float = 1.0
+    AUDIT_SHUTDOWN_TIMEOUT_SECONDS: float = 10.0
+    # Пулы HTTP-клиентов к ai-service и tg-service (app/http_clients.py). HTTP/2 требует пакет h2
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP2_ENABLED: bool = False
+    AI_HTTP_TIMEOUT_SECONDS: float = 120.0
+    TG_HTTP_TIMEOUT_SECONDS: float = 10.0
+
+    # Профили в семантическом индексе ai-service (app/profile_index.py): как часто сверять размер
+    # индекса с числом пользователей (0 — не сверять) и размер пачки при полной загрузке
+    PROFILE_INDEX_SYNC_SECONDS: float = 300.0
+    PROFILE_INDEX_BATCH_SIZE: int = 500
+
+    # Отправка уведомлений из notification_outbox: размер пачки, период опроса,
+    # число попыток и экспоненциальная задержка между ними
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_POLL_SECONDS: float = 1.0
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_BACKOFF_BASE_SECONDS: float = 2.0
+    OUTBOX_BACKOFF_MAX_SECONDS: float = 600.0
+
+    # Кэш авторизации (app/auth_cache.py): claims токенов в процессе (LRU),
+    # строки пользователей — в процессе (коротко, сброс по pub/sub) и в Redis
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CLAIMS_CACHE_SIZE: int = 10000
+    AUTH_CLAIMS_TTL_SECONDS: float = 300.0
+    AUTH_USER_LOCAL_TTL_SECONDS: float = 10.0
+    AUTH_USER_TTL_SECONDS: int = 60
+
+    # Списки GET /users/ и GET /projects/: размер страницы по умолчанию и максимальный;
+    # LISTING_UNPAGINATED_DEFAULT — без limit отдавать весь список, как раньше (старые клиенты);
+    # false — без limit отдавать страницу LISTING_DEFAULT_LIMIT
+    LISTING_DEFAULT_LIMIT: int = 100
+    LISTING_MAX_LIMIT: int = 500
+    LISTING_UNPAGINATED_DEFAULT: bool = True
+
+    # Поиск /users/search и /projects/search: размер страницы, число слов запроса
+    # и порог триграммной похожести (ниже — больше опечаток прощается, но и больше шума)
+    SEARCH_DEFAULT_LIMIT: int = 20
+    SEARCH_MAX_LIMIT: int = 100
+    SEARCH_MAX_WORDS: int = 8
+    SEARCH_TRGM_THRESHOLD: float = 0.5
+
+    # На сколько месяцев вперёд создаются секции llm_requests (при каждом запуске миграций
+    # и фоновой проверкой раз в LLM_PARTITION_CHECK_SECONDS; 0 — без фоновой проверки)
+    LLM_PARTITION_MONTHS_AHEAD: int = 3
+    LLM_PARTITION_CHECK_SECONDS: float = 21600.0
+
+    # Схему применяет `python -m app.migrations` (сервис migrate), core при старте только проверяет версию;
+    # MIGRATE_ON_STARTUP=true — применять при старте (локальный запуск одним процессом).
+    # INDEX_AUDIT_MIN_ROWS — с какого размера таблицы `migrations audit` показывает статистику перебора
+    MIGRATE_ON_STARTUP: bool = False
+    INDEX_AUDIT_MIN_ROWS: int = 1000
+
+    # Чтение с реплики: сколько после своей записи пользователь читает из primary (read-your-writes,
+    # больше обычного отставания реплики) и на сколько реплика отключается после ошибки подключения
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    READ_REPLICA_RETRY_SECONDS: float = 10.0
 
 
 settings = Settings()
\ No newline at end of file
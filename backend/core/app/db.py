@@ -6,6 +6,16 @@ from .config import settings
 engine = create_async_engine(settings.CORE_DATABASE_URL, echo=False, pool_pre_ping=True)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
+# Ключ advisory lock для изменений схемы (миграции, секции llm_requests): их выполняет один процесс за раз
+SCHEMA_LOCK_KEY = 7_310_014
+
+# Реплика для чтения: только SELECT из get_read_db / read_routing.read_session
+read_engine = (
+    create_async_engine(settings.CORE_READ_DATABASE_URL, echo=False, pool_pre_ping=True)
+    if settings.CORE_READ_DATABASE_URL else None
+)
+ReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False) if read_engine is not None else None
+
 
 class Base(DeclarativeBase):
     pass
\ No newline at end of file
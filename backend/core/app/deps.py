@@ -1,14 +1,14 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from . import auth_cache, read_routing
 from .config import settings
 from .db import SessionLocal
 from .models import User
-from .security import decode_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/telegram/complete")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/telegram/complete", auto_error=False)
 
 
 async def get_db() -> AsyncSession:
@@ -16,17 +16,35 @@ async def get_db() -> AsyncSession:
         yield session
 
 
+async def get_read_db(token: str | None = Depends(optional_oauth2_scheme)) -> AsyncSession:
+    # Для обработчиков, которые только читают: реплика (если настроена и доступна),
+    # но автор недавних изменений читает из primary (app/read_routing.py)
+    user_id = auth_cache.claims(token).get("user_id") if token else None
+    async with read_routing.read_session(user_id) as session:
+        yield session
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db),
 ) -> User:
-    payload = decode_token(token, settings.JWT_SECRET)
+    # Claims и строка пользователя берутся из кэша (app/auth_cache.py); возвращаемый
+    # объект может быть не привязан к db — изменять его нужно через загруженную в сессии строку
+    payload = auth_cache.claims(token)
     user_id = payload.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    res = await db.execute(select(User).where(User.id == user_id))
-    user = res.scalar_one_or_none()
+    user = await auth_cache.load_user(db, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
\ No newline at end of file
+    # Записи этой сессии после коммита отмечаются для read-your-writes
+    db.info["user_id"] = user.id
+    return user
+
+
+async def require_admin(current: User = Depends(get_current_user)) -> User:
+    # Служебная статистика — только пользователям из ADMIN_TELEGRAM_IDS
+    if current.telegram_id not in settings.ADMIN_TELEGRAM_IDS:
+        raise HTTPException(status_code=403, detail="Admin only")
+    return current
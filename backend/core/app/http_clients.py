@@ -0,0 +1,156 @@
+import time
+
+import httpx
+
+from .config import settings
+
+# Клиенты на всё время жизни приложения: соединения с ai-service и tg-service
+# переиспользуются (keep-alive) вместо нового TCP-подключения на каждый запрос
+_clients: dict[str, httpx.AsyncClient] = {}
+_transports: dict[str, "CountingTransport"] = {}
+
+# События трассировки httpcore (расширение "trace"), после которых запрос уже получил соединение
+_ACQUIRED = (
+    "connection.connect_tcp.started",
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+)
+
+
+class _CountingStream(httpx.AsyncByteStream):
+    # Соединение занято, пока не дочитано или не закрыто тело ответа
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                self._on_close()
+                self._on_close = None
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    # Обёртка над транспортом httpx: считает запросы, новые соединения и ожидание свободного
+    # соединения в пуле через публичное расширение "trace", не заглядывая во внутренности пула
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+        self.stats = {
+            "requests": 0,
+            "failed": 0,
+            "active": 0,
+            "waiting": 0,
+            "pool_waits": 0,
+            "pool_wait_ms": 0.0,
+            "connections_opened": 0,
+            "http2": 0,
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self.stats
+        stats["requests"] += 1
+        stats["active"] += 1
+        stats["waiting"] += 1
+        started = time.perf_counter()
+        waiting = True
+        outer_trace = request.extensions.get("trace")
+
+        def acquired() -> None:
+            nonlocal waiting
+            if not waiting:
+                return
+            waiting = False
+            stats["waiting"] -= 1
+            wait_ms = (time.perf_counter() - started) * 1000
+            stats["pool_wait_ms"] += wait_ms
+            # Ожидание дольше миллисекунды — запрос стоял в очереди пула, а не просто брал соединение
+            if wait_ms >= 1.0:
+                stats["pool_waits"] += 1
+
+        async def trace(event_name: str, info: dict) -> None:
+            if event_name in _ACQUIRED:
+                acquired()
+            if event_name == "connection.connect_tcp.complete":
+                stats["connections_opened"] += 1
+            if outer_trace is not None:
+                await outer_trace(event_name, info)
+
+        def finished() -> None:
+            acquired()
+            stats["active"] -= 1
+
+        request.extensions["trace"] = trace
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            stats["failed"] += 1
+            finished()
+            raise
+        acquired()
+        if response.extensions.get("http_version") == b"HTTP/2":
+            stats["http2"] += 1
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_CountingStream(response.stream, finished),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def _client(name: str, base_url: str, timeout: float) -> httpx.AsyncClient:
+    # limits и http2 задаются транспорту: при своём transport клиент их не применяет
+    transport = CountingTransport(httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        http2=settings.HTTP2_ENABLED,
+    ))
+    _transports[name] = transport
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=httpx.Timeout(timeout, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+        transport=transport,
+    )
+
+
+def start() -> None:
+    _clients["ai"] = _client("ai", settings.AI_SERVICE_URL, settings.AI_HTTP_TIMEOUT_SECONDS)
+    _clients["tg"] = _client("tg", settings.TG_SERVICE_URL, settings.TG_HTTP_TIMEOUT_SECONDS)
+
+
+async def stop() -> None:
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+    _transports.clear()
+
+
+def ai() -> httpx.AsyncClient:
+    return _clients["ai"]
+
+
+def tg() -> httpx.AsyncClient:
+    return _clients["tg"]
+
+
+def stats() -> dict:
+    result = {}
+    for name, transport in _transports.items():
+        result[name] = {
+            **transport.stats,
+            "pool_wait_ms": round(transport.stats["pool_wait_ms"], 1),
+            "max_connections": settings.HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        }
+    return result
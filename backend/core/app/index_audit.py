@@ -0,0 +1,68 @@
+import json
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Горячие запросы сервиса в виде SQL с типичными значениями. Для каждого строится план с
+# enable_seqscan = off: Seq Scan в таком плане значит, что подходящего индекса нет вовсе
+# (на маленькой базе планировщик и так выбрал бы Seq Scan, так что смотреть обычный план бесполезно)
+HOT_QUERIES = {
+    "auth: user by id": "SELECT * FROM users WHERE id = 1",
+    "login: user by telegram_id": "SELECT * FROM users WHERE telegram_id = 1",
+    "users page": "SELECT id, name FROM users WHERE id < 1000 ORDER BY id DESC LIMIT 101",
+    "projects page": "SELECT id, name FROM projects WHERE id < 1000 ORDER BY id DESC LIMIT 101",
+    "projects of owner": "SELECT id FROM projects WHERE owner_id = 1",
+    "members of project": "SELECT user_id, role_name FROM project_members WHERE project_id = 1",
+    "memberships of user": "SELECT project_id FROM project_members WHERE user_id = 1",
+    "match prefilter by skill": "SELECT id FROM users WHERE skills_normalized @> '[{\"name\": \"python\"}]'",
+    "search users": "SELECT id FROM users WHERE search_vector @@ to_tsquery('simple', 'ivan:*')",
+    "search users with typo": "SELECT id FROM users WHERE 'ivna' <% name",
+    "search projects": "SELECT id FROM projects WHERE search_vector @@ to_tsquery('simple', 'crm:*')",
+    "audit by day": "SELECT count(*) FROM llm_requests WHERE created_at >= now() - interval '30 days'",
+    "audit by project": (
+        "SELECT count(*) FROM llm_requests WHERE project_id = 1 AND created_at >= now() - interval '30 days'"
+    ),
+    "outbox claim": (
+        "SELECT id FROM notification_outbox WHERE status = 'pending' AND next_attempt_at <= now() "
+        "ORDER BY next_attempt_at LIMIT 100"
+    ),
+}
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    found = [plan["Relation Name"]] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        found += _seq_scans(child)
+    return found
+
+
+async def audit(conn: AsyncConnection, min_rows: int) -> int:
+    # 1 — есть горячие запросы без индекса (удобно для CI после миграций), иначе 0
+    failed = 0
+    trans = await conn.begin()
+    try:
+        await conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, sql in HOT_QUERIES.items():
+            raw = await conn.scalar(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            tables = _seq_scans(plan)
+            if tables:
+                failed += 1
+                print(f"SEQ SCAN  {name}: {', '.join(sorted(set(tables)))}")
+            else:
+                print(f"ok        {name}")
+    finally:
+        await trans.rollback()
+
+    # Что уже происходило в этой базе: таблицы, которые читаются в основном перебором
+    rows = (await conn.execute(text(
+        "SELECT relname, seq_scan, coalesce(idx_scan, 0) AS idx_scan, n_live_tup FROM pg_stat_user_tables "
+        "WHERE n_live_tup >= :min_rows AND seq_scan > coalesce(idx_scan, 0) ORDER BY seq_tup_read DESC"
+    ), {"min_rows": min_rows})).all()
+    if rows:
+        print(f"\ntables with more sequential than index scans (>= {min_rows} rows):")
+        for relname, seq_scan, idx_scan, live in rows:
+            print(f"  {relname}: seq_scan={seq_scan} idx_scan={idx_scan} rows={live}")
+
+    print(f"\n{failed} of {len(HOT_QUERIES)} hot queries need a sequential scan")
+    return 1 if failed else 0
@@ -0,0 +1,72 @@
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import Text, cast, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+
+# Курсор следующей страницы отдаётся заголовком, тело ответа остаётся прежним списком
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class ORJSONResponse(JSONResponse):
+    # Быстрый путь списков: строки из Core select() сразу кодируются в байты,
+    # без ORM-объектов и без повторной проверки через response_model
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def row_columns(model, fields: list[str]) -> list:
+    # JSONB (навыки, роли) выбирается текстом: asyncpg не разбирает его в dict,
+    # а orjson вставляет готовый JSON как есть (см. encode_rows)
+    columns = []
+    for f in fields:
+        column = getattr(model, f)
+        columns.append(cast(column, Text).label(f) if isinstance(column.type, JSONB) else column)
+    return columns
+
+
+def encode_rows(rows, model, fields: list[str]) -> list[dict]:
+    raw = [f for f in fields if isinstance(getattr(model, f).type, JSONB)]
+    result = []
+    for row in rows:
+        row = dict(row)
+        for f in raw:
+            if row[f] is not None:
+                row[f] = orjson.Fragment(row[f])
+        result.append(row)
+    return result
+
+
+def parse_fields(fields: str | None, allowed: list[str]) -> list[str]:
+    # fields=id,name,skills -> только эти столбцы; id нужен для курсора и добавляется всегда
+    if not fields:
+        return allowed
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return ["id"] + [f for f in requested if f != "id"]
+
+
+async def keyset_page(db: AsyncSession, model, fields: list[str], cursor: int | None, limit: int | None) -> ORJSONResponse:
+    # Страница по id в порядке убывания (как и раньше — новые сначала): WHERE id < cursor LIMIT n,
+    # так что стоимость запроса не зависит от номера страницы
+    # Без limit — весь список (LISTING_UNPAGINATED_DEFAULT, совместимость), иначе страница по умолчанию
+    if limit is None and not (settings.LISTING_UNPAGINATED_DEFAULT and cursor is None):
+        limit = settings.LISTING_DEFAULT_LIMIT
+
+    query = select(*row_columns(model, fields)).order_by(model.id.desc())
+    if cursor is not None:
+        query = query.where(model.id < cursor)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    rows = encode_rows((await db.execute(query)).mappings(), model, fields)
+
+    headers = {}
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = str(rows[-1]["id"])
+    return ORJSONResponse(content=rows, headers=headers)
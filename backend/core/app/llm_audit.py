@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy import Date, cast, func, insert, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .db import SessionLocal
+from .models import LLMRequest
+
+logger = logging.getLogger(__name__)
+
+_queue: asyncio.Queue | None = None
+_writer: asyncio.Task | None = None
+_stopping = False
+_stats = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0}
+_flush_ms: list[float] = []
+
+
+def record(
+    project_id: int | None,
+    user_id: int | None,
+    question: str,
+    answer: str,
+    model: str | None = None,
+    prompt_tokens: int | None = None,
+    response_tokens: int | None = None,
+    latency_ms: int | None = None,
+    fallback: bool = False,
+    candidate_count: int | None = None,
+) -> None:
+    # Не блокирует запрос: строка уходит в буфер, запись в БД — фоновой задачей пачками.
+    # Если буфер полон (БД не успевает), строка аудита отбрасывается
+    row = {
+        "project_id": project_id,
+        "user_id": user_id,
+        "question": question,
+        "answer": answer,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "response_tokens": response_tokens,
+        "latency_ms": latency_ms,
+        "fallback": fallback,
+        "candidate_count": candidate_count,
+    }
+    if _queue is None or _stopping:
+        _stats["dropped"] += 1
+        logger.warning("llm audit writer is not running, dropping row for project %s", project_id)
+        return
+    try:
+        _queue.put_nowait(row)
+        _stats["enqueued"] += 1
+    except asyncio.QueueFull:
+        _stats["dropped"] += 1
+        logger.warning("llm audit buffer is full, dropping row for project %s", project_id)
+
+
+async def _flush(rows: list[dict]) -> None:
+    started = time.perf_counter()
+    try:
+        # Один многострочный INSERT на пачку
+        async with SessionLocal() as db:
+            await db.execute(insert(LLMRequest).values(rows))
+            await db.commit()
+    except Exception:
+        _stats["failed"] += len(rows)
+        logger.exception("llm audit flush of %d rows failed", len(rows))
+        return
+    _stats["written"] += len(rows)
+    _stats["batches"] += 1
+    _flush_ms.append((time.perf_counter() - started) * 1000)
+    del _flush_ms[:-500]
+
+
+def _drain(rows: list[dict]) -> None:
+    while len(rows) < settings.AUDIT_BATCH_SIZE and not _queue.empty():
+        rows.append(_queue.get_nowait())
+
+
+async def _run() -> None:
+    # Пачка уходит, когда набралось AUDIT_BATCH_SIZE строк или прошло AUDIT_FLUSH_SECONDS;
+    # после stop() дописывает остаток буфера и завершается
+    while not (_stopping and _queue.empty()):
+        rows = []
+        deadline = time.monotonic() + settings.AUDIT_FLUSH_SECONDS
+        while len(rows) < settings.AUDIT_BATCH_SIZE:
+            _drain(rows)
+            timeout = deadline - time.monotonic()
+            if len(rows) >= settings.AUDIT_BATCH_SIZE or _stopping or timeout <= 0:
+                break
+            try:
+                rows.append(await asyncio.wait_for(_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        if rows:
+            await _flush(rows)
+
+
+def start() -> None:
+    global _queue, _writer, _stopping
+    _stopping = False
+    _queue = asyncio.Queue(maxsize=settings.AUDIT_QUEUE_SIZE)
+    _writer = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    # Дописываем остаток буфера, но не дольше AUDIT_SHUTDOWN_TIMEOUT_SECONDS
+    global _writer, _stopping
+    if _writer is None:
+        return
+    _stopping = True
+    try:
+        await asyncio.wait_for(_writer, settings.AUDIT_SHUTDOWN_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        lost = _queue.qsize()
+        _stats["dropped"] += lost
+        logger.warning("llm audit shutdown timed out, %d rows lost", lost)
+    _writer = None
+
+
+def stats() -> dict:
+    flush_ms = sorted(_flush_ms)
+    return {
+        **_stats,
+        "queued": _queue.qsize() if _queue is not None else 0,
+        "capacity": settings.AUDIT_QUEUE_SIZE,
+        "flush_ms": {
+            "p50": round(flush_ms[len(flush_ms) // 2], 1) if flush_ms else None,
+            "p95": round(flush_ms[min(len(flush_ms) - 1, int(0.95 * len(flush_ms)))], 1) if flush_ms else None,
+        },
+    }
+
+
+def _aggregates():
+    return (
+        func.count().label("requests"),
+        func.percentile_cont(0.5).within_group(LLMRequest.latency_ms).label("latency_p50_ms"),
+        func.percentile_cont(0.95).within_group(LLMRequest.latency_ms).label("latency_p95_ms"),
+        func.coalesce(func.sum(LLMRequest.prompt_tokens), 0).label("prompt_tokens"),
+        func.coalesce(func.sum(LLMRequest.response_tokens), 0).label("response_tokens"),
+        func.count().filter(LLMRequest.fallback).label("fallbacks"),
+    )
+
+
+async def summary(db: AsyncSession, days: int, projects_limit: int) -> dict:
+    # Агрегаты считает Postgres; фильтр по created_at отсекает лишние месячные секции
+    since = func.now() - func.make_interval(0, 0, 0, days)
+    day = cast(func.date_trunc(literal_column("'day'"), LLMRequest.created_at), Date).label("day")
+    by_day = await db.execute(
+        select(day, *_aggregates())
+        .where(LLMRequest.created_at >= since)
+        .group_by(day)
+        .order_by(day)
+    )
+    by_project = await db.execute(
+        select(LLMRequest.project_id, *_aggregates())
+        .where(LLMRequest.created_at >= since)
+        .group_by(LLMRequest.project_id)
+        .order_by((func.coalesce(func.sum(LLMRequest.prompt_tokens), 0) + func.coalesce(func.sum(LLMRequest.response_tokens), 0)).desc())
+        .limit(projects_limit)
+    )
+    return {
+        "days": days,
+        "by_day": [_summary_row(r) for r in by_day.mappings()],
+        "by_project": [_summary_row(r) for r in by_project.mappings()],
+    }
+
+
+def _summary_row(row) -> dict:
+    item = dict(row)
+    for key in ("latency_p50_ms", "latency_p95_ms"):
+        if item[key] is not None:
+            item[key] = round(item[key])
+    return item
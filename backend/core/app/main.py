@@ -2,8 +2,9 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import settings
-from .db import engine, Base
-from .routers import auth, users, projects, ai
+from .db import engine
+from . import auth_cache, http_clients, llm_audit, match_jobs, metrics, migrations, outbox, partitions, profile_index
+from .routers import auth, users, projects, ai, internal
 
 app = FastAPI(title="core-service")
 
@@ -13,18 +14,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+metrics.setup(app)
 
 
 @app.on_event("startup")
 async def on_startup():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        if settings.MIGRATE_ON_STARTUP:
+            await migrations.upgrade(conn)
+        else:
+            await migrations.check(conn)
+    http_clients.start()
+    auth_cache.start()
+    llm_audit.start()
+    partitions.start()
+    outbox.start()
+    match_jobs.start_workers()
+    profile_index.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await profile_index.stop()
+    await match_jobs.stop_workers()
+    await outbox.stop()
+    await partitions.stop()
+    await llm_audit.stop()
+    await auth_cache.stop()
+    await http_clients.stop()
 
 
 app.state.settings = settings
 
-app.include_router(auth.router, prefix="/auth", tags=["auth"])
-app.include_router(users.router, prefix="/users", tags=["users"])
-app.include_router(projects.router, prefix="/projects", tags=["projects"])
-app.include_router(ai.router, prefix="/ai", tags=["ai"])
\ No newline at end of file
+# Префиксы задаются в самих APIRouter, а не в include_router: так они попадают в route.path
+# и в метку маршрута метрик (app/metrics.py)
+app.include_router(auth.router)
+app.include_router(users.router)
+app.include_router(projects.router)
+app.include_router(ai.router)
+app.include_router(internal.router)
\ No newline at end of file
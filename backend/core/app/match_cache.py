@@ -0,0 +1,76 @@
+import hashlib
+import json
+import logging
+
+from redis.exceptions import RedisError
+
+from .config import settings
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Версия пула кандидатов: растёт при любом изменении профилей
+POOL_VERSION_KEY = "match:pool_version"
+HITS_KEY = "match:cache:hits"
+MISSES_KEY = "match:cache:misses"
+
+
+def _project_version_key(project_id: int) -> str:
+    return f"match:project_version:{project_id}"
+
+
+def roles_hash(roles: list[dict]) -> str:
+    raw = json.dumps(roles, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+async def cache_key(project_id: int, roles: list[dict], top_n: int, mode: str) -> str | None:
+    try:
+        pool_ver, project_ver = await redis_client.mget(POOL_VERSION_KEY, _project_version_key(project_id))
+    except RedisError as e:
+        logger.warning("match cache unavailable: %s", e)
+        return None
+    return f"match:result:{project_id}:{project_ver or 0}:{pool_ver or 0}:{roles_hash(roles)}:{top_n}:{mode}"
+
+
+async def get(key: str | None) -> list | None:
+    if key is None:
+        return None
+    try:
+        raw = await redis_client.get(key)
+        await redis_client.incr(HITS_KEY if raw is not None else MISSES_KEY)
+    except RedisError as e:
+        logger.warning("match cache unavailable: %s", e)
+        return None
+    return json.loads(raw) if raw is not None else None
+
+
+async def put(key: str | None, value: list) -> None:
+    if key is None:
+        return
+    try:
+        await redis_client.setex(key, settings.MATCH_CACHE_TTL_SECONDS, json.dumps(value, ensure_ascii=False))
+    except RedisError as e:
+        logger.warning("match cache unavailable: %s", e)
+
+
+async def invalidate_pool() -> None:
+    # Старые ключи не удаляем: они перестают совпадать и истекают по TTL
+    try:
+        await redis_client.incr(POOL_VERSION_KEY)
+    except RedisError as e:
+        logger.warning("match cache invalidation failed: %s", e)
+
+
+async def invalidate_project(project_id: int) -> None:
+    try:
+        await redis_client.incr(_project_version_key(project_id))
+    except RedisError as e:
+        logger.warning("match cache invalidation failed: %s", e)
+
+
+async def stats() -> dict:
+    hits, misses = await redis_client.mget(HITS_KEY, MISSES_KEY)
+    hits, misses = int(hits or 0), int(misses or 0)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_ratio": round(hits / total, 4) if total else 0.0}
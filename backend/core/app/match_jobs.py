@@ -0,0 +1,225 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+
+from . import read_routing
+from .config import settings
+from .matching import run_match
+from .redis_client import redis_client
+from .schemas import MatchRequestIn
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "match:jobs:queue"
+# Взятые воркерами задачи: BLMOVE переносит id сюда из очереди, после завершения он удаляется.
+# Если воркер упал, задача остаётся здесь, и сборщик (_reap) возвращает её в очередь
+PROCESSING_KEY = "match:jobs:processing"
+# Последние тайминги завершённых задач (ограниченный список) — для /ai/match/jobs/stats
+TIMINGS_KEY = "match:jobs:timings"
+TIMINGS_KEEP = 500
+
+_workers: list[asyncio.Task] = []
+
+# Вернуть зависшую задачу в голову очереди, если её ещё не вернул другой процесс
+_REQUEUE_LUA = """
+if redis.call('lrem', KEYS[1], 1, ARGV[1]) == 1 then
+    redis.call('hset', KEYS[3], 'status', 'queued')
+    redis.call('hdel', KEYS[3], 'started_at', 'claimed_at')
+    redis.call('rpush', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# Время взятия задачи воркером (ARGV[2] = hset) или первого взгляда сборщика на взятую,
+# но не отмеченную задачу (hsetnx). Истёкшая задача не пересоздаётся
+_CLAIM_LUA = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return redis.call(ARGV[2], KEYS[1], 'claimed_at', ARGV[1])
+end
+return -1
+"""
+
+
+def _job_key(job_id: str) -> str:
+    return f"match:job:{job_id}"
+
+
+async def enqueue(payload: MatchRequestIn, user_id: int) -> str:
+    job_id = uuid.uuid4().hex
+    key = _job_key(job_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping={
+            "status": "queued",
+            "user_id": user_id,
+            "payload": payload.model_dump_json(),
+            "enqueued_at": time.time(),
+        })
+        pipe.expire(key, settings.MATCH_JOB_TTL_SECONDS)
+        pipe.lpush(QUEUE_KEY, job_id)
+        await pipe.execute()
+    return job_id
+
+
+async def get_job(job_id: str) -> dict | None:
+    data = await redis_client.hgetall(_job_key(job_id))
+    if not data:
+        return None
+
+    job = {
+        "job_id": job_id,
+        "status": data["status"],
+        "user_id": int(data["user_id"]),
+        "result": json.loads(data["result"]) if "result" in data else None,
+        "error": data.get("error"),
+    }
+    enqueued_at = float(data["enqueued_at"])
+    started_at = float(data["started_at"]) if "started_at" in data else None
+    finished_at = float(data["finished_at"]) if "finished_at" in data else None
+    job["queue_wait_ms"] = round((started_at - enqueued_at) * 1000) if started_at else None
+    job["run_ms"] = round((finished_at - started_at) * 1000) if started_at and finished_at else None
+    return job
+
+
+async def _process(job_id: str) -> None:
+    key = _job_key(job_id)
+    # BLMOVE нельзя вызвать из Lua, поэтому время взятия отмечается сразу после него:
+    # сборщик считает задачу зависшей по claimed_at, а не по времени в очереди
+    claimed = await redis_client.eval(_CLAIM_LUA, 1, key, time.time(), "hset")
+    data = await redis_client.hgetall(key) if claimed != -1 else None
+    if not data:
+        # задача истекла, пока лежала в очереди
+        await redis_client.lrem(PROCESSING_KEY, 1, job_id)
+        return
+
+    started_at = time.time()
+    await redis_client.hset(key, mapping={"status": "running", "started_at": started_at})
+    await redis_client.hincrby(key, "attempts", 1)
+
+    fields = {}
+    try:
+        payload = MatchRequestIn.model_validate_json(data["payload"])
+        async with read_routing.read_session(int(data["user_id"])) as db:
+            result = await run_match(db, payload, int(data["user_id"]), priority="background")
+        fields = {"status": "done", "result": json.dumps(result, ensure_ascii=False)}
+    except HTTPException as e:
+        fields = {"status": "failed", "error": str(e.detail)}
+    except Exception as e:
+        logger.exception("match job %s failed", job_id)
+        fields = {"status": "failed", "error": str(e)}
+
+    finished_at = time.time()
+    fields["finished_at"] = finished_at
+    timing = {
+        "queue_wait_ms": round((started_at - float(data["enqueued_at"])) * 1000),
+        "run_ms": round((finished_at - started_at) * 1000),
+        "status": fields["status"],
+    }
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, settings.MATCH_JOB_TTL_SECONDS)
+        pipe.lpush(TIMINGS_KEY, json.dumps(timing))
+        pipe.ltrim(TIMINGS_KEY, 0, TIMINGS_KEEP - 1)
+        pipe.lrem(PROCESSING_KEY, 1, job_id)
+        await pipe.execute()
+
+
+async def _worker(n: int) -> None:
+    while True:
+        try:
+            job_id = await redis_client.blmove(QUEUE_KEY, PROCESSING_KEY, 5, "RIGHT", "LEFT")
+            if job_id is None:
+                continue
+            await _process(job_id)
+        except asyncio.CancelledError:
+            raise
+        except RedisError as e:
+            logger.warning("match worker %d: redis error: %s", n, e)
+            await asyncio.sleep(1)
+        except Exception:
+            # Задача остаётся в PROCESSING_KEY, её вернёт в очередь _reap
+            logger.exception("match worker %d: unexpected error", n)
+            await asyncio.sleep(1)
+
+
+async def _reap() -> int:
+    # Задачи, взятые воркером, который упал или перезапустился: не завершились за
+    # MATCH_JOB_STALE_SECONDS — снова в очередь (до MATCH_JOB_MAX_ATTEMPTS запусков, потом failed)
+    requeued = 0
+    now = time.time()
+    for job_id in await redis_client.lrange(PROCESSING_KEY, 0, -1):
+        key = _job_key(job_id)
+        data = await redis_client.hgetall(key)
+        if not data or data["status"] in ("done", "failed"):
+            await redis_client.lrem(PROCESSING_KEY, 1, job_id)
+            continue
+        if "claimed_at" not in data:
+            # Воркер только что взял задачу или упал сразу после BLMOVE: отсчёт с этого прохода
+            await redis_client.eval(_CLAIM_LUA, 1, key, now, "hsetnx")
+            continue
+        if now - float(data["claimed_at"]) < settings.MATCH_JOB_STALE_SECONDS:
+            continue
+        if int(data.get("attempts", 0)) >= settings.MATCH_JOB_MAX_ATTEMPTS:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping={"status": "failed", "error": "Job was interrupted too many times", "finished_at": now})
+                pipe.lrem(PROCESSING_KEY, 1, job_id)
+                await pipe.execute()
+            logger.warning("match job %s failed after %s interrupted runs", job_id, data.get("attempts"))
+            continue
+        if await redis_client.eval(_REQUEUE_LUA, 3, PROCESSING_KEY, QUEUE_KEY, key, job_id):
+            requeued += 1
+            logger.warning("match job %s was stuck in %s, requeued", job_id, data["status"])
+    return requeued
+
+
+async def _reaper() -> None:
+    while True:
+        try:
+            await _reap()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("match job reaper failed")
+        await asyncio.sleep(settings.MATCH_JOB_REAP_SECONDS)
+
+
+def start_workers() -> None:
+    for n in range(settings.MATCH_JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker(n)))
+    _workers.append(asyncio.create_task(_reaper()))
+
+
+async def stop_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+def _percentile(values: list[int], q: float) -> int | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def stats() -> dict:
+    depth = await redis_client.llen(QUEUE_KEY)
+    processing = await redis_client.llen(PROCESSING_KEY)
+    timings = [json.loads(t) for t in await redis_client.lrange(TIMINGS_KEY, 0, -1)]
+    waits = [t["queue_wait_ms"] for t in timings]
+    runs = [t["run_ms"] for t in timings]
+    return {
+        "queue_depth": depth,
+        "processing": processing,
+        "local_workers": settings.MATCH_JOB_WORKERS if _workers else 0,
+        "recent_jobs": len(timings),
+        "failed": sum(1 for t in timings if t["status"] == "failed"),
+        "queue_wait_ms": {"p50": _percentile(waits, 0.5), "p95": _percentile(waits, 0.95)},
+        "run_ms": {"p50": _percentile(runs, 0.5), "p95": _percentile(runs, 0.95)},
+    }
@@ -0,0 +1,245 @@
+import json
+import time
+import httpx
+from fastapi import HTTPException
+from sqlalchemy import select, and_, or_, func, literal, cast
+from sqlalchemy.dialects.postgresql import JSONB, JSONPATH
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from . import http_clients, llm_audit, match_cache, single_flight
+from .config import settings
+from .models import Project, User
+from .schemas import MatchRequestIn, RoleMatchResult
+
+# Есть ли у кандидата навык $name с уровнем не ниже $level
+_SKILL_LEVEL_PATH = "$[*] ? (@.name == $name && @.level >= $level)"
+
+
+def candidate_prefilter(roles: list[dict]):
+    # Кандидат проходит, если у него есть хотя бы один навык из запрошенных ролей
+    # с уровнем не ниже требуемого минус MATCH_LEVEL_TOLERANCE. Имена сравниваются без учёта
+    # регистра: skills_normalized — копия skills в нижнем регистре (генерируемый столбец).
+    # Containment (@>) обслуживается GIN-индексом ix_users_skills_normalized_gin,
+    # jsonb_path_exists лишь перепроверяет уровень у найденных строк.
+    min_levels: dict[str, int] = {}
+    for role in roles:
+        for skill in role.get("skills") or []:
+            name = (skill.get("name") or "").strip().lower()
+            if not name:
+                continue
+            min_level = max(int(skill.get("level") or 0) - settings.MATCH_LEVEL_TOLERANCE, 0)
+            # Один навык в нескольких ролях — одно условие с самым мягким порогом
+            min_levels[name] = min(min_level, min_levels.get(name, min_level))
+
+    conditions = []
+    for name, min_level in min_levels.items():
+        cond = User.skills_normalized.contains([{"name": name}])
+        if min_level > 0:
+            cond = and_(cond, func.jsonb_path_exists(
+                User.skills_normalized,
+                cast(literal(_SKILL_LEVEL_PATH), JSONPATH),
+                literal({"name": name, "level": min_level}, JSONB),
+            ))
+        conditions.append(cond)
+    return or_(*conditions) if conditions else None
+
+
+async def load_match_project(db: AsyncSession, payload: MatchRequestIn, user_id: int) -> tuple[Project, list[dict]]:
+    # Загружаем проект с участниками
+    res = await db.execute(
+        select(Project)
+        .where(Project.id == payload.project_id)
+        .options(selectinload(Project.members))
+    )
+    p = res.scalar_one_or_none()
+    if not p:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if p.owner_id != user_id:
+        raise HTTPException(status_code=403, detail="Only owner can run matching")
+
+    if not p.roles:
+        raise HTTPException(status_code=400, detail="Project has no roles defined")
+
+    # Фильтруем роли для обработки
+    roles_to_process = p.roles
+    if payload.role_name:
+        roles_to_process = [r for r in p.roles if r["name"] == payload.role_name]
+        if not roles_to_process:
+            raise HTTPException(status_code=404, detail=f"Role '{payload.role_name}' not found")
+
+    return p, roles_to_process
+
+
+class MatchPlan:
+    # Всё, что нужно для вызова ai-service: проект, роли, заполненность и кандидаты
+    def __init__(self, project: Project, roles: list[dict], role_fill_count: dict[str, int], top_n: int, mode: str):
+        self.project = project
+        self.roles = roles
+        self.role_fill_count = role_fill_count
+        self.top_n = top_n
+        self.mode = mode
+        # interactive — владелец ждёт ответа; background — фоновые задачи, ai-service пропускает их вперёд реже
+        self.priority = "interactive"
+        self.candidates: list[dict] = []
+        # Владелец и участники: ai-service не предлагает их из своего семантического индекса
+        self.exclude_ids: set[int] = set()
+        self.cache_key: str | None = None
+        self.cached: list[dict] | None = None
+
+    def ai_input(self) -> dict:
+        return {
+            "project": {
+                "id": self.project.id,
+                "name": self.project.name,
+                "description": self.project.description,
+            },
+            "roles": self.roles,
+            "candidates": self.candidates,
+            "exclude_ids": sorted(self.exclude_ids),
+            "top_n": self.top_n,
+            "mode": self.mode,
+            "priority": self.priority,
+        }
+
+    def role_result(self, role_result: dict) -> dict:
+        return RoleMatchResult(
+            role_name=role_result.get("role_name", "Unknown"),
+            needed=role_result.get("needed", 1),
+            filled=self.role_fill_count.get(role_result.get("role_name"), 0),
+            candidates=role_result.get("candidates", [])
+        ).model_dump()
+
+    def question(self) -> str:
+        return f"Match candidates for project_id={self.project.id}, roles={[r['name'] for r in self.roles]}"
+
+
+async def prepare_match(db: AsyncSession, payload: MatchRequestIn, user_id: int) -> MatchPlan:
+    p, roles_to_process = await load_match_project(db, payload, user_id)
+
+    # Получаем ID уже добавленных участников
+    existing_member_ids = {m.user_id for m in p.members}
+
+    # Считаем заполненность ролей
+    role_fill_count = {}
+    for m in p.members:
+        if m.role_name:
+            role_fill_count[m.role_name] = role_fill_count.get(m.role_name, 0) + 1
+
+    plan = MatchPlan(p, roles_to_process, role_fill_count, payload.top_n, payload.mode)
+    plan.exclude_ids = existing_member_ids | {user_id}
+
+    # Повторный подбор без изменений в проекте и профилях отдаём из кэша
+    plan.cache_key = await match_cache.cache_key(p.id, roles_to_process, payload.top_n, payload.mode)
+    plan.cached = await match_cache.get(plan.cache_key)
+    if plan.cached is not None:
+        return plan
+
+    # Получаем кандидатов (кроме владельца и уже добавленных участников),
+    # отсекая в SQL тех, у кого нет ни одного нужного навыка
+    query = select(User.id, User.name, User.username, User.bio, User.skills).where(User.id != user_id)
+    if existing_member_ids:
+        query = query.where(User.id.not_in(existing_member_ids))
+    skills_filter = candidate_prefilter(roles_to_process)
+    if skills_filter is not None:
+        query = query.where(skills_filter)
+    res = await db.execute(query)
+    plan.candidates = [
+        {
+            "id": u.id,
+            "name": u.name,
+            "username": u.username,
+            "bio": u.bio,
+            "skills": u.skills or [],
+        }
+        for u in res.all()
+    ]
+    return plan
+
+
+async def run_match(db: AsyncSession, payload: MatchRequestIn, user_id: int, priority: str = "interactive") -> list[dict]:
+    plan = await prepare_match(db, payload, user_id)
+    plan.priority = priority
+    if plan.cached is not None:
+        return plan.cached
+
+    # Пустой результат префильтра тоже уходит в ai-service: кандидаты найдутся в его семантическом индексе.
+    # Одинаковые одновременные запросы (двойной клик, web + desktop) делят один вызов AI
+    return await single_flight.run(plan.cache_key, lambda: _call_ai(db, plan, user_id))
+
+
+async def _call_ai(db: AsyncSession, plan: MatchPlan, user_id: int) -> list[dict]:
+    # Вызываем AI service
+    started = time.perf_counter()
+    r = await http_clients.ai().post("/match", json=plan.ai_input())
+    latency_ms = round((time.perf_counter() - started) * 1000)
+
+    if r.status_code != 200:
+        raise HTTPException(status_code=502, detail=f"AI service error: {r.text}")
+
+    data = r.json()
+    results = data.get("results", [])
+    raw = data.get("raw", "")
+
+    # Сохраняем запрос (фоном, вне времени ответа)
+    roles = (data.get("timings") or {}).get("roles") or {}
+    llm_audit.record(
+        plan.project.id, user_id, plan.question(), raw or json.dumps(results),
+        model=data.get("model"),
+        prompt_tokens=sum(t.get("prompt_tokens") or 0 for t in roles.values()),
+        response_tokens=sum(t.get("response_tokens") or 0 for t in roles.values()),
+        latency_ms=latency_ms,
+        fallback=any(t.get("fallback") for t in roles.values()),
+        candidate_count=len(plan.candidates),
+    )
+
+    # Формируем ответ
+    output = [plan.role_result(role_result) for role_result in results]
+    await match_cache.put(plan.cache_key, output)
+    return output
+
+
+async def stream_match(plan: MatchPlan, user_id: int):
+    # Отдаёт результаты по ролям по мере готовности; ошибка ai-service приходит отдельным событием
+    if plan.cached is not None:
+        for item in plan.cached:
+            yield item
+        return
+
+    output = []
+    raws = []
+    metas = []
+    started = time.perf_counter()
+    try:
+        async with http_clients.ai().stream("POST", "/match/stream", json=plan.ai_input()) as r:
+            if r.status_code != 200:
+                body = await r.aread()
+                yield {"error": f"AI service error: {body.decode(errors='replace')}"}
+                return
+            async for line in r.aiter_lines():
+                if not line.strip():
+                    continue
+                role_result = json.loads(line)
+                raws.append(role_result.pop("raw", ""))
+                metas.append(role_result)
+                item = plan.role_result(role_result)
+                output.append(item)
+                yield item
+    except httpx.HTTPError as e:
+        # ai-service недоступен или оборвал поток: уже отданные роли остаются у клиента,
+        # поток закрывается событием ошибки, а не обрывом ответа
+        yield {"error": f"AI service error: {str(e) or type(e).__name__}"}
+        return
+
+    llm_audit.record(
+        plan.project.id, user_id, plan.question(), "\n".join(raws),
+        model=next((m.get("model") for m in metas), None),
+        prompt_tokens=sum(m.get("prompt_tokens") or 0 for m in metas),
+        response_tokens=sum(m.get("response_tokens") or 0 for m in metas),
+        latency_ms=round((time.perf_counter() - started) * 1000),
+        fallback=any(m.get("fallback") for m in metas),
+        candidate_count=len(plan.candidates),
+    )
+
+    if len(output) == len(plan.roles):
+        await match_cache.put(plan.cache_key, output)
@@ -0,0 +1,78 @@
+import time
+
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from .db import engine, read_engine
+
+# Маршрут в метках — шаблон (/users/{user_id}), а не реальный путь, чтобы число рядов не росло
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route", ["method", "route"])
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being processed")
+
+DB_POOL_SIZE = Gauge("db_pool_size", "SQLAlchemy pool size", ["engine"])
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "SQLAlchemy connections in use", ["engine"])
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "SQLAlchemy connections opened above pool size", ["engine"])
+
+
+def route_template(scope) -> str:
+    # scope["route"] выставляет роутер; без совпадения (404) — одна общая метка. Префикс
+    # смонтированного приложения приходит в root_path, префикс роутера задаётся в самом
+    # APIRouter(prefix=...) и уже есть в route.path (префикс include_router FastAPI >= 0.137
+    # в route.path не кладёт)
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if not path:
+        return "unmatched"
+    return scope.get("root_path", "") + path
+
+
+class MetricsMiddleware:
+    # Чистый ASGI (не BaseHTTPMiddleware): не оборачивает тело, стриминговые ответы
+    # (/ai/match/stream) меряются до последнего байта
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            route = route_template(scope)
+            REQUEST_SECONDS.labels(scope["method"], route).observe(time.perf_counter() - started)
+            REQUESTS.labels(scope["method"], route, str(status)).inc()
+
+
+def _track_pool(name: str, pool) -> None:
+    # Значения читаются из пула в момент сбора метрик (у NullPool и т.п. их нет)
+    if not hasattr(pool, "checkedout"):
+        return
+    DB_POOL_SIZE.labels(name).set_function(pool.size)
+    DB_POOL_CHECKED_OUT.labels(name).set_function(pool.checkedout)
+    # overflow() у QueuePool отрицательный, пока пул не заполнен
+    DB_POOL_OVERFLOW.labels(name).set_function(lambda: max(pool.overflow(), 0))
+
+
+def setup(app: FastAPI) -> None:
+    app.add_middleware(MetricsMiddleware)
+    _track_pool("primary", engine.pool)
+    if read_engine is not None:
+        _track_pool("replica", read_engine.pool)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import base64
+import logging
+import sys
+import zlib
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .config import settings
+from .db import SCHEMA_LOCK_KEY, engine
+from .index_audit import audit
+from .partitions import ensure_llm_partitions
+
+logger = logging.getLogger(__name__)
+
+
+# У каждой миграции свой неизменный DDL, а не текущие модели: применённая версия значит одно
+# и то же при любом app/models.py, и база любой прошлой версии доводится до HEAD по шагам
+
+
+async def _run(conn: AsyncConnection, statements: tuple[str, ...]) -> None:
+    for statement in statements:
+        await conn.execute(text(statement))
+
+
+# Схема, которую создавал create_all при каждом старте core до версионных миграций
+_BASELINE = (
+    "CREATE TABLE IF NOT EXISTS users ("
+    "id SERIAL PRIMARY KEY, telegram_id BIGINT NOT NULL, username VARCHAR(64), name VARCHAR(128), "
+    "skills JSONB, bio TEXT)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_telegram_id ON users (telegram_id)",
+    "CREATE TABLE IF NOT EXISTS projects ("
+    "id SERIAL PRIMARY KEY, name VARCHAR(200) NOT NULL, description TEXT, roles JSONB, "
+    "owner_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE)",
+    "CREATE TABLE IF NOT EXISTS llm_requests ("
+    "id SERIAL PRIMARY KEY, "
+    "project_id INTEGER REFERENCES projects (id) ON DELETE SET NULL, "
+    "user_id INTEGER REFERENCES users (id) ON DELETE SET NULL, "
+    "question TEXT NOT NULL, answer TEXT NOT NULL, created_at TIMESTAMPTZ NOT NULL DEFAULT now())",
+    "CREATE TABLE IF NOT EXISTS project_members ("
+    "id SERIAL PRIMARY KEY, "
+    "project_id INTEGER NOT NULL REFERENCES projects (id) ON DELETE CASCADE, "
+    "user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE, "
+    "role_name VARCHAR(100), CONSTRAINT uq_project_member UNIQUE (project_id, user_id))",
+)
+
+# Поиск: генерируемые tsvector (имя/название — вес A, био/описание — вес B) с GIN-индексами
+# и триграммные индексы для опечаток. ADD COLUMN ... STORED один раз переписывает таблицу
+_SEARCH_COLUMNS = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(username, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(bio, '')), 'B')) STORED",
+    "ALTER TABLE projects ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_users_search_vector ON users USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (username gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_projects_search_vector ON projects USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_projects_name_trgm ON projects USING gin (name gin_trgm_ops)",
+)
+
+
+async def _baseline(conn: AsyncConnection) -> None:
+    await _run(conn, _BASELINE)
+
+
+async def _search_columns(conn: AsyncConnection) -> None:
+    await _run(conn, _SEARCH_COLUMNS)
+
+
+async def _foreign_key_indexes(conn: AsyncConnection) -> None:
+    # Индексы, которых не было в базах, созданных create_all до их появления в моделях:
+    # проекты владельца, участия пользователя (и ON DELETE CASCADE), выборки аудита по времени
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_projects_owner_id ON projects (owner_id)",
+        "CREATE INDEX IF NOT EXISTS ix_project_members_user_id ON project_members (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_llm_requests_created_at ON llm_requests (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_llm_requests_project_id_created_at ON llm_requests (project_id, created_at)",
+    ):
+        await conn.execute(text(statement))
+
+
+async def _normalized_skills(conn: AsyncConnection) -> None:
+    # Регистронезависимый фильтр кандидатов: копия skills в нижнем регистре со своим GIN-индексом
+    # вместо индекса по skills (ADD COLUMN ... STORED один раз переписывает таблицу users)
+    await _run(conn, (
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS skills_normalized jsonb "
+        "GENERATED ALWAYS AS (lower(skills::text)::jsonb) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_users_skills_normalized_gin ON users "
+        "USING gin (skills_normalized jsonb_path_ops)",
+        "DROP INDEX IF EXISTS ix_users_skills_gin",
+    ))
+
+
+async def _audit_answer_compression(conn: AsyncConnection) -> None:
+    # Длинные ответы сжимает сам Postgres (TOAST, lz4) и прозрачно распаковывает при чтении.
+    # Ответы, которые core раньше сжимал сам (префикс zlib: + base64), возвращаются в обычный текст
+    try:
+        async with conn.begin_nested():
+            await conn.execute(text("ALTER TABLE llm_requests ALTER COLUMN answer SET COMPRESSION lz4"))
+    except DBAPIError as e:
+        # Postgres собран без lz4 — остаётся сжатие по умолчанию (pglz)
+        logger.warning("lz4 compression is not available, llm_requests.answer keeps pglz: %s", e)
+    rows = await conn.execute(text(
+        "SELECT id, created_at, answer FROM llm_requests WHERE answer LIKE 'zlib:%'"
+    ))
+    for row in rows.all():
+        answer = zlib.decompress(base64.b64decode(row.answer[len("zlib:"):])).decode()
+        await conn.execute(
+            text("UPDATE llm_requests SET answer = :answer WHERE id = :id AND created_at = :created_at"),
+            {"answer": answer, "id": row.id, "created_at": row.created_at},
+        )
+
+
+async def _notification_outbox(conn: AsyncConnection) -> None:
+    # Очередь уведомлений для tg-service (app/outbox.py)
+    await _run(conn, (
+        "CREATE TABLE IF NOT EXISTS notification_outbox ("
+        "id SERIAL PRIMARY KEY, telegram_id BIGINT NOT NULL, message TEXT NOT NULL, "
+        "status VARCHAR(16) NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+        "last_error TEXT, next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(), "
+        "created_at TIMESTAMPTZ NOT NULL DEFAULT now())",
+        "CREATE INDEX IF NOT EXISTS ix_notification_outbox_pending "
+        "ON notification_outbox (next_attempt_at) WHERE status = 'pending'",
+    ))
+
+
+# Версия, имя, функция. Новые миграции — только в конец списка, применённые не меняются
+MIGRATIONS = [
+    (1, "baseline", _baseline),
+    (2, "search columns", _search_columns),
+    (3, "llm_requests partitions", ensure_llm_partitions),
+    (4, "foreign key indexes", _foreign_key_indexes),
+    (5, "normalized skills", _normalized_skills),
+    (6, "audit answer compression", _audit_answer_compression),
+    (7, "notification outbox", _notification_outbox),
+]
+HEAD = MIGRATIONS[-1][0]
+
+
+async def _applied(conn: AsyncConnection) -> set[int]:
+    exists = await conn.scalar(text("SELECT to_regclass('schema_migrations') IS NOT NULL"))
+    if not exists:
+        return set()
+    return set((await conn.execute(text("SELECT version FROM schema_migrations"))).scalars())
+
+
+async def upgrade(conn: AsyncConnection) -> list[str]:
+    # Все недостающие миграции в одной транзакции вызывающего: либо применятся все, либо ни одна.
+    # Секции llm_requests на месяцы вперёд досоздаются при каждом запуске
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version integer PRIMARY KEY, name text NOT NULL, applied_at timestamptz NOT NULL DEFAULT now())"
+    ))
+    applied = await _applied(conn)
+    done = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        logger.info("applying migration %s: %s", version, name)
+        await migrate(conn)
+        await conn.execute(
+            text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+            {"version": version, "name": name},
+        )
+        done.append(f"{version} {name}")
+    await ensure_llm_partitions(conn)
+    return done
+
+
+async def check(conn: AsyncConnection) -> None:
+    # При старте core схема только проверяется: миграции применяет отдельный запуск
+    # `python -m app.migrations` (сервис migrate в docker-compose)
+    applied = await _applied(conn)
+    pending = [f"{version} {name}" for version, name, _ in MIGRATIONS if version not in applied]
+    if pending:
+        raise RuntimeError(f"database schema is not up to date, pending migrations: {', '.join(pending)}. "
+                           "Run `python -m app.migrations` first")
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status", "audit"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    try:
+        if args.command == "upgrade":
+            async with engine.begin() as conn:
+                done = await upgrade(conn)
+            print(f"applied: {', '.join(done)}" if done else f"schema is up to date (version {HEAD})")
+            return 0
+
+        if args.command == "status":
+            async with engine.connect() as conn:
+                applied = await _applied(conn)
+            for version, name, _ in MIGRATIONS:
+                print(f"{'+' if version in applied else ' '} {version:>3} {name}")
+            return 0 if all(version in applied for version, _, _ in MIGRATIONS) else 1
+
+        async with engine.connect() as conn:
+            return await audit(conn, settings.INDEX_AUDIT_MIN_ROWS)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,12 +1,38 @@
-from sqlalchemy import String, Text, ForeignKey, DateTime, UniqueConstraint, BigInteger, Integer
+from sqlalchemy import String, Text, ForeignKey, DateTime, UniqueConstraint, BigInteger, Integer, Index, Boolean, Computed
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.sql import func, text
 from .db import Base
 
+# Поисковые векторы (app/search.py). Конфигурация 'simple' — без стемминга, одинаково
+# для русского и английского; имя весит больше описания (A > B)
+USER_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(username, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(bio, '')), 'B')"
+)
+PROJECT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+# Навыки с именами в нижнем регистре — для регистронезависимого фильтра кандидатов в /ai/match.
+# Весь JSON приводится к нижнему регистру: ключи и так строчные, а уровни — числа
+USER_SKILLS_NORMALIZED = "lower(skills::text)::jsonb"
+
 
 class User(Base):
     __tablename__ = "users"
+    # GIN по навыкам: фильтр кандидатов в /ai/match использует JSONB containment (@>)
+    __table_args__ = (
+        Index(
+            "ix_users_skills_normalized_gin", "skills_normalized",
+            postgresql_using="gin", postgresql_ops={"skills_normalized": "jsonb_path_ops"},
+        ),
+        # Поиск /users/search: полнотекстовый по search_vector и триграммный (опечатки) по имени и username
+        Index("ix_users_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_users_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_users_username_trgm", "username", postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, index=True)
@@ -14,21 +40,29 @@ class User(Base):
     name: Mapped[str | None] = mapped_column(String(128), nullable=True)
     skills: Mapped[list | None] = mapped_column(JSONB, nullable=True)
     bio: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Генерируемый столбец: Postgres пересчитывает его сам, в обычных SELECT не загружается
+    search_vector: Mapped[str | None] = mapped_column(TSVECTOR, Computed(USER_SEARCH_VECTOR, persisted=True), deferred=True)
+    skills_normalized: Mapped[list | None] = mapped_column(JSONB, Computed(USER_SKILLS_NORMALIZED, persisted=True), deferred=True)
 
     projects_owned: Mapped[list["Project"]] = relationship(back_populates="owner")
 
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        Index("ix_projects_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_projects_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(200))
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    search_vector: Mapped[str | None] = mapped_column(TSVECTOR, Computed(PROJECT_SEARCH_VECTOR, persisted=True), deferred=True)
 
     # Формат: [{"name": "Backend", "count": 2, "skills": [{"name": "Python", "level": 7}]}]
     roles: Mapped[list | None] = mapped_column(JSONB, nullable=True)
 
-    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    owner_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     owner: Mapped["User"] = relationship(back_populates="projects_owned")
 
     members: Mapped[list["ProjectMember"]] = relationship(back_populates="project", cascade="all, delete-orphan")
@@ -40,7 +74,8 @@ class ProjectMember(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     project_id: Mapped[int] = mapped_column(ForeignKey("projects.id", ondelete="CASCADE"))
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    # project_id покрыт уникальным индексом (project_id, user_id), user_id — нет
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
 
     role_name: Mapped[str | None] = mapped_column(String(100), nullable=True)
 
@@ -50,12 +85,44 @@ class ProjectMember(Base):
 
 class LLMRequest(Base):
     __tablename__ = "llm_requests"
-
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # Секции по месяцам created_at (создаются в app/partitions.py), поэтому created_at входит в первичный ключ
+    __table_args__ = (
+        Index("ix_llm_requests_created_at", "created_at"),
+        Index("ix_llm_requests_project_id_created_at", "project_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     project_id: Mapped[int | None] = mapped_column(ForeignKey("projects.id", ondelete="SET NULL"), nullable=True)
     user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
 
     question: Mapped[str] = mapped_column(Text)
     answer: Mapped[str] = mapped_column(Text)
 
-    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    model: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    prompt_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    response_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    fallback: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+    candidate_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+
+
+class NotificationOutbox(Base):
+    # Уведомления в Telegram, записанные в той же транзакции, что и изменение;
+    # отправляет их app/outbox.py. Отправленные строки удаляются, исчерпавшие попытки остаются со status="failed"
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ix_notification_outbox_pending", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    telegram_id: Mapped[int] = mapped_column(BigInteger)
+    message: Mapped[str] = mapped_column(Text)
+
+    status: Mapped[str] = mapped_column(String(16), default="pending", server_default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    next_attempt_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select, update
+
+from . import http_clients
+from .config import settings
+from .db import SessionLocal
+from .models import NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+_task: asyncio.Task | None = None
+_wakeup = asyncio.Event()
+_stats = {"sent": 0, "retried": 0, "failed": 0}
+
+
+def add(db, telegram_id: int, message: str) -> None:
+    # Уведомление попадёт в БД только вместе с коммитом вызывающего
+    db.add(NotificationOutbox(telegram_id=telegram_id, message=message))
+
+
+def wake() -> None:
+    # Вызывается после коммита, чтобы не ждать следующего опроса
+    _wakeup.set()
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = min(settings.OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), settings.OUTBOX_BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+async def _send(rows: list[NotificationOutbox]) -> str | None:
+    # Вся пачка — одним вызовом tg-service (он сам ставит сообщения в очередь отправки).
+    # None — принято, иначе текст ошибки для всей пачки
+    messages = [{"telegram_id": row.telegram_id, "text": row.message} for row in rows]
+    try:
+        r = await http_clients.tg().post("/notify/batch", json={"messages": messages})
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    if r.status_code != 200:
+        return f"tg-service {r.status_code}: {r.text[:200]}"
+    if not r.json().get("ok"):
+        return "tg-service did not accept the batch"
+    return None
+
+
+async def dispatch_batch() -> int:
+    # Берёт пачку готовых к отправке строк (SKIP LOCKED — несколько воркеров/реплик
+    # не возьмут одни и те же), отправляет одним запросом и в той же транзакции
+    # удаляет принятые или откладывает пачку с экспоненциальной задержкой
+    async with SessionLocal() as db:
+        res = await db.execute(
+            select(NotificationOutbox)
+            .where(NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= func.now())
+            .order_by(NotificationOutbox.next_attempt_at)
+            .limit(settings.OUTBOX_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        rows = res.scalars().all()
+        if not rows:
+            return 0
+
+        error = await _send(rows)
+        if error is None:
+            await db.execute(delete(NotificationOutbox).where(NotificationOutbox.id.in_([row.id for row in rows])))
+            _stats["sent"] += len(rows)
+            await db.commit()
+            return len(rows)
+
+        now = datetime.now(timezone.utc)
+        for row in rows:
+            attempts = row.attempts + 1
+            failed = attempts >= settings.OUTBOX_MAX_ATTEMPTS
+            await db.execute(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.id == row.id)
+                .values(
+                    attempts=attempts,
+                    last_error=error,
+                    status="failed" if failed else "pending",
+                    next_attempt_at=now + _backoff(attempts),
+                )
+            )
+            _stats["failed" if failed else "retried"] += 1
+            if failed:
+                logger.warning("outbox notification %d failed after %d attempts: %s", row.id, attempts, error)
+        await db.commit()
+        return len(rows)
+
+
+async def _run() -> None:
+    while True:
+        try:
+            # Полная пачка — возможно, есть ещё, забираем сразу
+            if await dispatch_batch() >= settings.OUTBOX_BATCH_SIZE:
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("outbox dispatch failed")
+        try:
+            await asyncio.wait_for(_wakeup.wait(), settings.OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+
+
+def start() -> None:
+    global _task
+    _task = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    await asyncio.gather(_task, return_exceptions=True)
+    _task = None
+
+
+async def stats() -> dict:
+    async with SessionLocal() as db:
+        res = await db.execute(
+            select(
+                NotificationOutbox.status,
+                func.count(),
+                func.extract("epoch", func.now() - func.min(NotificationOutbox.created_at)),
+            ).group_by(NotificationOutbox.status)
+        )
+        by_status = {status: (count, age) for status, count, age in res.all()}
+    pending_count, oldest = by_status.get("pending", (0, None))
+    return {
+        "pending": pending_count,
+        "failed": by_status.get("failed", (0, None))[0],
+        "oldest_pending_seconds": round(oldest) if oldest is not None else None,
+        "dispatched": dict(_stats),
+    }
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from .config import settings
+from .db import SCHEMA_LOCK_KEY, engine
+
+logger = logging.getLogger(__name__)
+
+_LEGACY = "llm_requests_unpartitioned"
+
+_task: asyncio.Task | None = None
+
+
+def _month(d: date, shift: int = 0) -> date:
+    months = d.year * 12 + d.month - 1 + shift
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"llm_requests_p{month:%Y_%m}"
+
+
+async def _create_month(conn: AsyncConnection, month: date) -> None:
+    try:
+        async with conn.begin_nested():
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF llm_requests "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_month(month, 1).isoformat()}')"
+            ))
+    except DBAPIError as e:
+        # Например, строки за этот месяц уже попали в секцию по умолчанию
+        logger.warning("could not create partition %s: %s", partition_name(month), e)
+
+
+# Секционированная таблица в том виде, в каком её вводила миграция 3, а не по текущей модели
+_PARTITIONED = (
+    "CREATE TABLE llm_requests ("
+    "id SERIAL NOT NULL, "
+    "project_id INTEGER REFERENCES projects (id) ON DELETE SET NULL, "
+    "user_id INTEGER REFERENCES users (id) ON DELETE SET NULL, "
+    "question TEXT NOT NULL, answer TEXT NOT NULL, model VARCHAR(64), prompt_tokens INTEGER, "
+    "response_tokens INTEGER, latency_ms INTEGER, fallback BOOLEAN NOT NULL DEFAULT false, "
+    "candidate_count INTEGER, created_at TIMESTAMPTZ NOT NULL DEFAULT now(), "
+    "PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)"
+)
+
+
+async def _is_partitioned(conn: AsyncConnection) -> bool:
+    # to_regclass учитывает search_path, в отличие от поиска по relname
+    return bool(await conn.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('llm_requests'))"
+    )))
+
+
+async def _convert_legacy(conn: AsyncConnection) -> date | None:
+    # Таблица из старой схемы (без секций): переименовываем, создаём секционированную
+    # и переносим строки. Возвращает месяц самой старой строки
+    logger.warning("converting llm_requests to a partitioned table")
+    await conn.execute(text(f"ALTER TABLE llm_requests RENAME TO {_LEGACY}"))
+    await conn.execute(text(f"ALTER SEQUENCE IF EXISTS llm_requests_id_seq RENAME TO {_LEGACY}_id_seq"))
+    await conn.execute(text(f"ALTER INDEX IF EXISTS llm_requests_pkey RENAME TO {_LEGACY}_pkey"))
+    await conn.execute(text(_PARTITIONED))
+    oldest = await conn.scalar(text(f"SELECT min(created_at) FROM {_LEGACY}"))
+    return _month(oldest) if oldest else None
+
+
+async def _create_ahead(conn: AsyncConnection, start: date) -> None:
+    current = _month(datetime.now(timezone.utc).date())
+    month = start
+    while month <= _month(current, settings.LLM_PARTITION_MONTHS_AHEAD):
+        await _create_month(conn, month)
+        month = _month(month, 1)
+
+
+async def ensure_llm_partitions(conn: AsyncConnection) -> None:
+    # Секции llm_requests на каждый месяц от текущего (или самой старой перенесённой строки)
+    # до LLM_PARTITION_MONTHS_AHEAD вперёд плюс секция по умолчанию на случай, если сервис
+    # не перезапускался дольше этого срока
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+    current = _month(datetime.now(timezone.utc).date())
+    start = current
+    legacy = False
+    if not await _is_partitioned(conn):
+        legacy = True
+        start = min(start, await _convert_legacy(conn) or current)
+
+    await _create_ahead(conn, start)
+    await conn.execute(text("CREATE TABLE IF NOT EXISTS llm_requests_default PARTITION OF llm_requests DEFAULT"))
+
+    if legacy:
+        columns = "id, project_id, user_id, question, answer, created_at"
+        await conn.execute(text(f"INSERT INTO llm_requests ({columns}) SELECT {columns} FROM {_LEGACY}"))
+        await conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('llm_requests', 'id'), "
+            "coalesce((SELECT max(id) FROM llm_requests), 0) + 1, false)"
+        ))
+        await conn.execute(text(f"DROP TABLE {_LEGACY}"))
+
+
+async def top_up(conn: AsyncConnection) -> bool:
+    # Досоздаёт секции на LLM_PARTITION_MONTHS_AHEAD вперёд у работающего сервиса, который давно
+    # не перезапускался. Блокировку держит один воркер, остальные пропускают проверку.
+    # Перенос старой таблицы — только в миграциях
+    locked = await conn.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+    if not locked or not await _is_partitioned(conn):
+        return False
+    await _create_ahead(conn, _month(datetime.now(timezone.utc).date()))
+    return True
+
+
+async def _run() -> None:
+    while True:
+        try:
+            async with engine.begin() as conn:
+                await top_up(conn)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("llm_requests partition top-up failed")
+        await asyncio.sleep(settings.LLM_PARTITION_CHECK_SECONDS)
+
+
+def start() -> None:
+    global _task
+    if settings.LLM_PARTITION_CHECK_SECONDS > 0:
+        _task = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    await asyncio.gather(_task, return_exceptions=True)
+    _task = None
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+
+import httpx
+from sqlalchemy import func, select
+
+from . import http_clients, read_routing
+from .config import settings
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+# Семантический индекс ai-service (TF-IDF по bio и навыкам) должен знать всех пользователей,
+# а не только прошедших SQL-префильтр подбора: иначе кандидат, у которого нужный навык
+# упомянут лишь в bio, не найдётся. Изменённый профиль отправляется сразу после коммита,
+# а раз в PROFILE_INDEX_SYNC_SECONDS индекс сверяется по размеру и при нехватке
+# (ai-service перезапустился — индекс в памяти) заполняется заново пачками
+
+_COLUMNS = (User.id, User.name, User.username, User.bio, User.skills)
+
+_task: asyncio.Task | None = None
+_pending: set[asyncio.Task] = set()
+_stats = {"pushed": 0, "synced": 0, "errors": 0}
+
+
+def profile(user) -> dict:
+    return {"id": user.id, "name": user.name, "username": user.username, "bio": user.bio, "skills": user.skills or []}
+
+
+async def _post(profiles: list[dict]) -> int | None:
+    # Размер индекса после загрузки или None, если ai-service не ответил
+    try:
+        r = await http_clients.ai().post("/index/profiles", json={"profiles": profiles})
+        r.raise_for_status()
+    except httpx.HTTPError as e:
+        _stats["errors"] += 1
+        logger.warning("profile index update failed: %s", e)
+        return None
+    return r.json().get("size")
+
+
+def push(user: User) -> None:
+    # Фоном: ответ пользователю не ждёт ai-service; при ошибке профиль подтянет сверка
+    task = asyncio.get_running_loop().create_task(_post([profile(user)]))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+    _stats["pushed"] += 1
+
+
+async def _index_size() -> int | None:
+    try:
+        r = await http_clients.ai().get("/index/profiles")
+        r.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.warning("profile index size check failed: %s", e)
+        return None
+    return r.json().get("size")
+
+
+async def sync() -> None:
+    # Полная загрузка, если в индексе меньше профилей, чем пользователей
+    async with read_routing.read_session() as db:
+        users = await db.scalar(select(func.count()).select_from(User))
+    size = await _index_size()
+    if size is None or size >= users:
+        return
+
+    last_id = 0
+    while True:
+        async with read_routing.read_session() as db:
+            rows = (await db.execute(
+                select(*_COLUMNS).where(User.id > last_id).order_by(User.id).limit(settings.PROFILE_INDEX_BATCH_SIZE)
+            )).all()
+        if not rows:
+            break
+        if await _post([profile(row) for row in rows]) is None:
+            return
+        _stats["synced"] += len(rows)
+        last_id = rows[-1].id
+    logger.info("profile index synced: %d users", users)
+
+
+async def _run() -> None:
+    while True:
+        try:
+            await sync()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("profile index sync failed")
+        await asyncio.sleep(settings.PROFILE_INDEX_SYNC_SECONDS)
+
+
+def start() -> None:
+    global _task
+    if settings.PROFILE_INDEX_SYNC_SECONDS > 0:
+        _task = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    global _task
+    tasks = [*_pending, *([_task] if _task is not None else [])]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _task = None
+
+
+def stats() -> dict:
+    return dict(_stats)
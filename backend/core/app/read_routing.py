@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from redis.exceptions import RedisError
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .db import ReadSessionLocal, SessionLocal, read_engine
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Чтения идут на реплику (CORE_READ_DATABASE_URL), кроме случаев:
+# - реплика не настроена или недавно не отвечала (READ_REPLICA_RETRY_SECONDS) — primary;
+# - пользователь сам что-то записал за последние READ_YOUR_WRITES_SECONDS — primary,
+#   чтобы он сразу видел свои изменения, пока реплика их догоняет.
+# Отметка о записи ставится по факту коммита сессии с INSERT/UPDATE/DELETE и хранится
+# в памяти процесса и в Redis (rw:user:{id}), чтобы её видели все воркеры
+
+_recent_writes: dict[int, float] = {}
+_replica_down_until = 0.0
+_pending: set[asyncio.Task] = set()
+_stats = {"replica": 0, "primary_no_replica": 0, "primary_read_your_writes": 0, "primary_replica_down": 0, "replica_errors": 0}
+
+
+def _write_key(user_id: int) -> str:
+    return f"rw:user:{user_id}"
+
+
+async def _store_write(user_id: int) -> None:
+    try:
+        await redis_client.set(_write_key(user_id), 1, px=int(settings.READ_YOUR_WRITES_SECONDS * 1000))
+    except RedisError as e:
+        logger.warning("read-your-writes mark not stored: %s", e)
+
+
+def note_write(user_id: int) -> None:
+    # Синхронная: вызывается и из событий сессии. В Redis пишется фоном
+    if read_engine is None:
+        return
+    now = time.monotonic()
+    if len(_recent_writes) > 10000:
+        for key in [key for key, until in _recent_writes.items() if until <= now]:
+            del _recent_writes[key]
+    _recent_writes[user_id] = now + settings.READ_YOUR_WRITES_SECONDS
+    task = asyncio.get_running_loop().create_task(_store_write(user_id))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def _recently_wrote(user_id: int) -> bool:
+    until = _recent_writes.get(user_id)
+    if until is not None:
+        if until > time.monotonic():
+            return True
+        _recent_writes.pop(user_id, None)
+    try:
+        return bool(await redis_client.exists(_write_key(user_id)))
+    except RedisError as e:
+        # Без Redis не знаем о записях в других воркерах — безопаснее читать из primary
+        logger.warning("read-your-writes check failed: %s", e)
+        return True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(state) -> None:
+    # INSERT/UPDATE/DELETE через session.execute (пакетные операции с участниками)
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _on_flush(session, flush_context) -> None:
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session) -> None:
+    # user_id сессии выставляет get_current_user
+    user_id = session.info.get("user_id")
+    if session.info.pop("wrote", False) and user_id is not None:
+        note_write(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session) -> None:
+    session.info.pop("wrote", None)
+
+
+async def _replica_session() -> AsyncSession | None:
+    global _replica_down_until
+    if time.monotonic() < _replica_down_until:
+        _stats["primary_replica_down"] += 1
+        return None
+    session = ReadSessionLocal()
+    try:
+        # Соединение берётся сразу (с pre-ping), чтобы при недоступной реплике уйти в primary до запроса
+        await session.connection()
+    except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+        await session.close()
+        _stats["replica_errors"] += 1
+        _replica_down_until = time.monotonic() + settings.READ_REPLICA_RETRY_SECONDS
+        logger.warning("read replica unavailable, reading from primary for %ss: %s", settings.READ_REPLICA_RETRY_SECONDS, e)
+        return None
+    _stats["replica"] += 1
+    return session
+
+
+@asynccontextmanager
+async def read_session(user_id: int | None = None):
+    # Сессия только для чтения: реплика, если можно, иначе primary
+    session = None
+    if ReadSessionLocal is None:
+        _stats["primary_no_replica"] += 1
+    elif user_id is not None and await _recently_wrote(user_id):
+        _stats["primary_read_your_writes"] += 1
+    else:
+        session = await _replica_session()
+    if session is None:
+        session = SessionLocal()
+    async with session:
+        yield session
+
+
+async def stats() -> dict:
+    lag = None
+    if read_engine is not None and time.monotonic() >= _replica_down_until:
+        try:
+            async with read_engine.connect() as conn:
+                # NULL на primary или если реплика ещё ничего не применила
+                seconds = await conn.scalar(text("SELECT extract(epoch FROM now() - pg_last_xact_replay_timestamp())"))
+            lag = round(float(seconds), 3) if seconds is not None else None
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError) as e:
+            logger.warning("read replica lag check failed: %s", e)
+    return {
+        "replica_configured": read_engine is not None,
+        "replica_down_seconds": round(max(_replica_down_until - time.monotonic(), 0.0), 1),
+        "replica_lag_seconds": lag,
+        "recent_writers": sum(1 for until in _recent_writes.values() if until > time.monotonic()),
+        **_stats,
+    }
@@ -1,115 +1,80 @@
 import json
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-import httpx
 
-from ..deps import get_db, get_current_user
-from ..models import Project, User, LLMRequest, ProjectMember
-from ..schemas import MatchRequestIn, RoleMatchResult
-from ..main import settings
+from .. import llm_audit, match_cache, match_jobs, single_flight
+from ..deps import get_current_user, get_read_db, require_admin
+from ..matching import load_match_project, prepare_match, run_match, stream_match
+from ..models import User
+from ..schemas import MatchRequestIn, RoleMatchResult, MatchJobOut
 
-router = APIRouter()
+router = APIRouter(prefix="/ai", tags=["ai"])
 
 
-@router.post("/match", response_model=list[RoleMatchResult])
+@router.post("/match", response_model=list[RoleMatchResult], responses={202: {"model": MatchJobOut}})
 async def match_candidates(
     payload: MatchRequestIn,
-    db: AsyncSession = Depends(get_db),
+    job: bool = False,  # query parameter: поставить подбор в очередь и сразу вернуть job_id
+    db: AsyncSession = Depends(get_read_db),
     current: User = Depends(get_current_user),
 ):
-    # Загружаем проект с участниками
-    res = await db.execute(
-        select(Project)
-        .where(Project.id == payload.project_id)
-        .options(selectinload(Project.members))
-    )
-    p = res.scalar_one_or_none()
-    if not p:
-        raise HTTPException(status_code=404, detail="Project not found")
-    if p.owner_id != current.id:
-        raise HTTPException(status_code=403, detail="Only owner can run matching")
-
-    if not p.roles:
-        raise HTTPException(status_code=400, detail="Project has no roles defined")
-
-    # Получаем ID уже добавленных участников
-    existing_member_ids = {m.user_id for m in p.members}
-
-    # Считаем заполненность ролей
-    role_fill_count = {}
-    for m in p.members:
-        if m.role_name:
-            role_fill_count[m.role_name] = role_fill_count.get(m.role_name, 0) + 1
-
-    # Фильтруем роли для обработки
-    roles_to_process = p.roles
-    if payload.role_name:
-        roles_to_process = [r for r in p.roles if r["name"] == payload.role_name]
-        if not roles_to_process:
-            raise HTTPException(status_code=404, detail=f"Role '{payload.role_name}' not found")
-
-    # Получаем всех кандидатов (кроме владельца)
-    res = await db.execute(select(User).where(User.id != current.id))
-    all_candidates = list(res.scalars().all())
-
-    if not all_candidates:
-        return [
-            RoleMatchResult(
-                role_name=r["name"],
-                needed=r["count"],
-                filled=role_fill_count.get(r["name"], 0),
-                candidates=[]
-            )
-            for r in roles_to_process
-        ]
-
-    # Формируем запрос к AI
-    ai_input = {
-        "project": {
-            "id": p.id,
-            "name": p.name,
-            "description": p.description,
-        },
-        "roles": roles_to_process,
-        "candidates": [
-            {
-                "id": u.id,
-                "name": u.name,
-                "username": u.username,
-                "bio": u.bio,
-                "skills": u.skills or [],
-            }
-            for u in all_candidates
-        ],
-        "top_n": payload.top_n,
-    }
-
-    # Вызываем AI service
-    async with httpx.AsyncClient(timeout=120) as client:
-        r = await client.post(f"{settings.AI_SERVICE_URL}/match", json=ai_input)
-
-    if r.status_code != 200:
-        raise HTTPException(status_code=502, detail=f"AI service error: {r.text}")
-
-    data = r.json()
-    results = data.get("results", [])
-    raw = data.get("raw", "")
-
-    # Сохраняем запрос
-    q = f"Match candidates for project_id={p.id}, roles={[r['name'] for r in roles_to_process]}"
-    db.add(LLMRequest(project_id=p.id, user_id=current.id, question=q, answer=raw or json.dumps(results)))
-    await db.commit()
-
-    # Формируем ответ
-    output = []
-    for role_result in results:
-        output.append(RoleMatchResult(
-            role_name=role_result.get("role_name", "Unknown"),
-            needed=role_result.get("needed", 1),
-            filled=role_fill_count.get(role_result.get("role_name"), 0),
-            candidates=role_result.get("candidates", [])
-        ))
-
-    return output
\ No newline at end of file
+    if job:
+        # Ошибки запроса (нет проекта, не владелец, нет ролей) отдаём сразу, а не через задачу
+        await load_match_project(db, payload, current.id)
+        job_id = await match_jobs.enqueue(payload, current.id)
+        return JSONResponse(status_code=202, content=MatchJobOut(job_id=job_id, status="queued").model_dump())
+
+    return await run_match(db, payload, current.id)
+
+
+@router.post("/match/stream")
+async def match_candidates_stream(
+    payload: MatchRequestIn,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current: User = Depends(get_current_user),
+):
+    # Результаты по ролям (RoleMatchResult) по мере готовности:
+    # NDJSON по умолчанию, Server-Sent Events при Accept: text/event-stream
+    plan = await prepare_match(db, payload, current.id)
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def body():
+        async for item in stream_match(plan, current.id):
+            line = json.dumps(item, ensure_ascii=False)
+            if sse:
+                yield f"event: {'error' if 'error' in item else 'role'}\ndata: {line}\n\n"
+            else:
+                yield line + "\n"
+
+    return StreamingResponse(body(), media_type="text/event-stream" if sse else "application/x-ndjson")
+
+
+@router.get("/match/cache/stats", dependencies=[Depends(require_admin)])
+async def match_cache_stats():
+    return {**await match_cache.stats(), "coalesced": await single_flight.coalesced()}
+
+
+@router.get("/match/jobs/stats", dependencies=[Depends(require_admin)])
+async def match_jobs_stats():
+    return await match_jobs.stats()
+
+
+@router.get("/audit/stats", dependencies=[Depends(require_admin)])
+async def audit_stats():
+    return llm_audit.stats()
+
+
+@router.get("/audit/summary", dependencies=[Depends(require_admin)])
+async def audit_summary(days: int = Query(30, ge=1, le=366), projects_limit: int = Query(50, ge=1, le=500), db: AsyncSession = Depends(get_read_db)):
+    # p50/p95 задержки, расход токенов и число fallback по дням и по проектам
+    return await llm_audit.summary(db, days, projects_limit)
+
+
+@router.get("/match/jobs/{job_id}", response_model=MatchJobOut)
+async def get_match_job(job_id: str, current: User = Depends(get_current_user)):
+    job = await match_jobs.get_job(job_id)
+    if not job or job["user_id"] != current.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,22 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-import httpx
 
+from .. import auth_cache, http_clients, match_cache, profile_index, read_routing
 from ..deps import get_db
 from ..models import User
 from ..schemas import LoginCompleteIn, TokenOut
 from ..security import create_access_token
 from ..main import settings
 
-router = APIRouter()
+router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/telegram/complete", response_model=TokenOut)
 async def telegram_complete(payload: LoginCompleteIn, db: AsyncSession = Depends(get_db)):
     # 1) проверяем код в tg-service
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.post(f"{settings.TG_SERVICE_URL}/verify-code", json={"code": payload.code})
+    r = await http_clients.tg().post("/verify-code", json={"code": payload.code})
     if r.status_code != 200:
         raise HTTPException(status_code=401, detail="Invalid/expired code")
     data = r.json()
@@ -32,13 +31,20 @@ async def telegram_complete(payload: LoginCompleteIn, db: AsyncSession = Depends
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        await match_cache.invalidate_pool()
+        read_routing.note_write(user.id)
+        profile_index.push(user)
     else:
         # обновим username/name, если пришло
         if username and user.username != username:
             user.username = username
         if name and user.name != name:
             user.name = name
-        await db.commit()
+        if db.is_modified(user):
+            await db.commit()
+            await auth_cache.invalidate_user(user.id)
+            read_routing.note_write(user.id)
+            profile_index.push(user)
 
     token = create_access_token(
         {"user_id": user.id, "telegram_id": telegram_id},
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+
+from .. import auth_cache, http_clients, outbox, read_routing
+from ..deps import require_admin
+
+# Служебная статистика процесса — только администраторам
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/http-pools")
+async def http_pools():
+    # Состояние пулов соединений к ai-service и tg-service
+    return http_clients.stats()
+
+
+@router.get("/outbox")
+async def outbox_stats():
+    # Очередь уведомлений: ждут отправки, исчерпали попытки, возраст самого старого
+    return await outbox.stats()
+
+
+@router.get("/auth")
+async def auth_stats():
+    # p50/p95 проверки токена (кэш/расшифровка) и поиска пользователя (процесс/Redis/БД)
+    return auth_cache.stats()
+
+
+@router.get("/db-routing")
+async def db_routing_stats():
+    # Куда ушли чтения (реплика / primary и почему) и текущее отставание реплики
+    return await read_routing.stats()
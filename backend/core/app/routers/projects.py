@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select, delete
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, delete, func, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-import httpx
 
-from ..deps import get_db, get_current_user
-from ..models import Project, User, ProjectMember
-from ..schemas import ProjectCreate, ProjectPublic, ProjectUpdate, ProjectMemberPublic
+from .. import match_cache, outbox
 from ..main import settings
+from ..deps import get_db, get_current_user, get_read_db
+from ..listing import ORJSONResponse, encode_rows, keyset_page, parse_fields, row_columns
+from ..models import Project, User, ProjectMember
+from ..search import search_page
+from ..schemas import ProjectCreate, ProjectPublic, ProjectUpdate, ProjectMemberPublic, MemberBatchIn, MemberBatchResult
 
-router = APIRouter()
+router = APIRouter(prefix="/projects", tags=["projects"])
 
 
 @router.post("/", response_model=ProjectPublic)
@@ -31,13 +33,30 @@ async def create_project(
 
 
 @router.get("/", response_model=list[ProjectPublic])
-async def list_projects(db: AsyncSession = Depends(get_db)):
-    res = await db.execute(select(Project).order_by(Project.id.desc()))
-    return list(res.scalars().all())
+async def list_projects(
+    limit: int | None = Query(None, ge=1, le=settings.LISTING_MAX_LIMIT),
+    cursor: int | None = None,  # id последнего элемента предыдущей страницы (заголовок X-Next-Cursor)
+    fields: str | None = None,  # например "id,name,owner_id"
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await keyset_page(db, Project, parse_fields(fields, list(ProjectPublic.model_fields)), cursor, limit)
+
+
+@router.get("/search", response_model=list[ProjectPublic])
+async def search_projects(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int | None = Query(None, ge=1, le=settings.SEARCH_MAX_LIMIT),
+    cursor: str | None = None,  # заголовок X-Next-Cursor предыдущей страницы
+    fields: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    # По названию и описанию; опечатки в названии прощаются (триграммы)
+    fields = parse_fields(fields, list(ProjectPublic.model_fields))
+    return await search_page(db, Project, fields, q, [Project.name], cursor, limit)
 
 
 @router.get("/{project_id}", response_model=ProjectPublic)
-async def get_project(project_id: int, db: AsyncSession = Depends(get_db)):
+async def get_project(project_id: int, db: AsyncSession = Depends(get_read_db)):
     res = await db.execute(select(Project).where(Project.id == project_id))
     p = res.scalar_one_or_none()
     if not p:
@@ -68,6 +87,7 @@ async def update_project(
 
     await db.commit()
     await db.refresh(p)
+    await match_cache.invalidate_project(p.id)
     return p
 
 
@@ -86,34 +106,29 @@ async def delete_project(
 
     await db.execute(delete(Project).where(Project.id == project_id))
     await db.commit()
+    await match_cache.invalidate_project(project_id)
     return {"ok": True}
 
 
 @router.get("/{project_id}/members", response_model=list[ProjectMemberPublic])
-async def list_members(project_id: int, db: AsyncSession = Depends(get_db)):
+async def list_members(project_id: int, db: AsyncSession = Depends(get_read_db)):
+    # Участники с их ролями одним запросом от проекта (LEFT JOIN): нет строк — нет проекта,
+    # одна строка без пользователя — проект без участников
+    user_fields = [f for f in ProjectMemberPublic.model_fields if f != "role_name"]
     res = await db.execute(
-        select(Project)
+        select(Project.id.label("project_id"), *row_columns(User, user_fields), ProjectMember.role_name)
+        .select_from(Project)
+        .outerjoin(ProjectMember, ProjectMember.project_id == Project.id)
+        .outerjoin(User, User.id == ProjectMember.user_id)
         .where(Project.id == project_id)
-        .options(selectinload(Project.members).selectinload(ProjectMember.user))
+        .order_by(ProjectMember.id)
     )
-    p = res.scalar_one_or_none()
-    if not p:
+    rows = encode_rows(res.mappings(), User, user_fields)
+    if not rows:
         raise HTTPException(status_code=404, detail="Not found")
-
-    # Возвращаем участников с их ролями
-    result = []
-    for m in p.members:
-        user_data = {
-            "id": m.user.id,
-            "telegram_id": m.user.telegram_id,
-            "username": m.user.username,
-            "name": m.user.name,
-            "skills": m.user.skills,
-            "bio": m.user.bio,
-            "role_name": m.role_name,
-        }
-        result.append(user_data)
-    return result
+    return ORJSONResponse(content=[
+        {f: row[f] for f in ProjectMemberPublic.model_fields} for row in rows if row["id"] is not None
+    ])
 
 
 # ИЗМЕНЕНО: добавление участника с указанием роли
@@ -147,18 +162,16 @@ async def add_member(
         if role_name:
             existing.role_name = role_name
             await db.commit()
+            await match_cache.invalidate_project(project_id)
         return {"ok": True, "already": True}
 
     db.add(ProjectMember(project_id=project_id, user_id=user_id, role_name=role_name))
-    await db.commit()
-
-    # notify
+    # notify: уведомление уходит в outbox в той же транзакции, отправит диспетчер
     role_text = f" на роль '{role_name}'" if role_name else ""
-    async with httpx.AsyncClient(timeout=10) as client:
-        await client.post(
-            f"{settings.TG_SERVICE_URL}/notify",
-            json={"telegram_id": u.telegram_id, "text": f"Вас добавили в проект: {p.name}{role_text}"},
-        )
+    outbox.add(db, u.telegram_id, f"Вас добавили в проект: {p.name}{role_text}")
+    await db.commit()
+    outbox.wake()
+    await match_cache.invalidate_project(project_id)
 
     return {"ok": True}
 
@@ -185,12 +198,79 @@ async def remove_member(
     await db.execute(
         delete(ProjectMember).where(ProjectMember.project_id == project_id, ProjectMember.user_id == user_id)
     )
+    outbox.add(db, u.telegram_id, f"Вас удалили из проекта: {p.name}")
     await db.commit()
+    outbox.wake()
+    await match_cache.invalidate_project(project_id)
+
+    return {"ok": True}
+
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        await client.post(
-            f"{settings.TG_SERVICE_URL}/notify",
-            json={"telegram_id": u.telegram_id, "text": f"Вас удалили из проекта: {p.name}"},
+@router.post("/{project_id}/members:batch", response_model=list[MemberBatchResult])
+async def batch_members(
+    project_id: int,
+    payload: MemberBatchIn,
+    db: AsyncSession = Depends(get_db),
+    current: User = Depends(get_current_user),
+):
+    # Добавление/удаление многих участников в одной транзакции: одна проверка владельца,
+    # один SELECT пользователей, один INSERT ... ON CONFLICT, один DELETE и одна пачка уведомлений
+    res = await db.execute(select(Project).where(Project.id == project_id))
+    p = res.scalar_one_or_none()
+    if not p:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if p.owner_id != current.id:
+        raise HTTPException(status_code=403, detail="Only owner can change members")
+
+    # Для одного пользователя действует последняя операция в списке
+    items = {item.user_id: item for item in payload.items}
+    res = await db.execute(select(User.id, User.telegram_id).where(User.id.in_(items)))
+    telegram_ids = dict(res.all())
+
+    status = {user_id: "user_not_found" for user_id in items if user_id not in telegram_ids}
+    to_add = [i for i in items.values() if i.op == "add" and i.user_id in telegram_ids]
+    to_remove = [i.user_id for i in items.values() if i.op == "remove" and i.user_id in telegram_ids]
+    notifications = []
+
+    if to_add:
+        # Как и в add_member: существующему участнику меняется только переданная роль.
+        # Строки, которые не вставились и не изменились, RETURNING не вернёт
+        stmt = insert(ProjectMember).values(
+            [{"project_id": project_id, "user_id": i.user_id, "role_name": i.role_name} for i in to_add]
         )
+        new_role = func.coalesce(stmt.excluded.role_name, ProjectMember.role_name)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_project_member",
+            set_={"role_name": new_role},
+            where=ProjectMember.role_name.is_distinct_from(new_role),
+        ).returning(ProjectMember.user_id, literal_column("xmax = 0").label("inserted"))
+        res = await db.execute(stmt)
+        for user_id, inserted in res.all():
+            status[user_id] = "added" if inserted else "updated"
+        for i in to_add:
+            status.setdefault(i.user_id, "unchanged")
+            if status[i.user_id] == "added":
+                role_text = f" на роль '{i.role_name}'" if i.role_name else ""
+                notifications.append((telegram_ids[i.user_id], f"Вас добавили в проект: {p.name}{role_text}"))
+
+    if to_remove:
+        res = await db.execute(
+            delete(ProjectMember)
+            .where(ProjectMember.project_id == project_id, ProjectMember.user_id.in_(to_remove))
+            .returning(ProjectMember.user_id)
+        )
+        removed = set(res.scalars().all())
+        for user_id in to_remove:
+            status[user_id] = "removed" if user_id in removed else "not_member"
+            if user_id in removed:
+                notifications.append((telegram_ids[user_id], f"Вас удалили из проекта: {p.name}"))
+
+    for telegram_id, message in notifications:
+        outbox.add(db, telegram_id, message)
+    await db.commit()
+    if notifications:
+        outbox.wake()
+    if any(s in ("added", "updated", "removed") for s in status.values()):
+        await match_cache.invalidate_project(project_id)
 
-    return {"ok": True}
\ No newline at end of file
+    return [{"user_id": user_id, "op": item.op, "status": status[user_id]} for user_id, item in items.items()]
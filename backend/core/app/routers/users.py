@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..deps import get_db, get_current_user
+from .. import auth_cache, match_cache, profile_index
+from ..main import settings
+from ..deps import get_db, get_current_user, get_read_db
+from ..listing import keyset_page, parse_fields
 from ..models import User
+from ..search import search_page
 from ..schemas import UserPublic, UserUpdate
 
-router = APIRouter()
+router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("/me", response_model=UserPublic)
@@ -20,26 +24,48 @@ async def update_me(
     db: AsyncSession = Depends(get_db),
     current: User = Depends(get_current_user),
 ):
+    # current может прийти из кэша авторизации, поэтому меняем строку, загруженную в этой сессии
+    user = await db.get(User, current.id)
     if patch.name is not None:
-        current.name = patch.name
+        user.name = patch.name
     if patch.bio is not None:
-        current.bio = patch.bio
+        user.bio = patch.bio
     if patch.skills is not None:
-        current.skills = [s.model_dump() for s in patch.skills]
+        user.skills = [s.model_dump() for s in patch.skills]
 
     await db.commit()
-    await db.refresh(current)
-    return current
+    await db.refresh(user)
+    await auth_cache.invalidate_user(user.id)
+    await match_cache.invalidate_pool()
+    profile_index.push(user)
+    return user
 
 
 @router.get("/", response_model=list[UserPublic])
-async def list_users(db: AsyncSession = Depends(get_db)):
-    res = await db.execute(select(User).order_by(User.id.desc()))
-    return list(res.scalars().all())
+async def list_users(
+    limit: int | None = Query(None, ge=1, le=settings.LISTING_MAX_LIMIT),
+    cursor: int | None = None,  # id последнего элемента предыдущей страницы (заголовок X-Next-Cursor)
+    fields: str | None = None,  # например "id,name,skills"
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await keyset_page(db, User, parse_fields(fields, list(UserPublic.model_fields)), cursor, limit)
+
+
+@router.get("/search", response_model=list[UserPublic])
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int | None = Query(None, ge=1, le=settings.SEARCH_MAX_LIMIT),
+    cursor: str | None = None,  # заголовок X-Next-Cursor предыдущей страницы
+    fields: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    # По имени, username и био; опечатки в имени и username прощаются (триграммы)
+    fields = parse_fields(fields, list(UserPublic.model_fields))
+    return await search_page(db, User, fields, q, [User.name, User.username], cursor, limit)
 
 
 @router.get("/{user_id}", response_model=UserPublic)
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_read_db)):
     res = await db.execute(select(User).where(User.id == user_id))
     user = res.scalar_one_or_none()
     if not user:
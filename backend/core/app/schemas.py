@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 
 
 class Skill(BaseModel):
@@ -68,6 +68,22 @@ class ProjectMemberPublic(BaseModel):
         from_attributes = True
 
 
+class MemberBatchItem(BaseModel):
+    user_id: int
+    role_name: Optional[str] = None
+    op: Literal["add", "remove"] = "add"
+
+
+class MemberBatchIn(BaseModel):
+    items: list[MemberBatchItem] = Field(min_length=1, max_length=500)
+
+
+class MemberBatchResult(BaseModel):
+    user_id: int
+    op: str
+    status: str  # added | updated | unchanged | removed | not_member | user_not_found
+
+
 class LoginCompleteIn(BaseModel):
     code: str
 
@@ -81,6 +97,8 @@ class MatchRequestIn(BaseModel):
     project_id: int
     role_name: Optional[str] = None
     top_n: int = Field(default=3, ge=1, le=20)
+    # chunked — турнирное ранжирование всего пула в ai-service (для очень больших пулов)
+    mode: Literal["shortlist", "chunked"] = "shortlist"
 
 
 class MatchResultItem(BaseModel):
@@ -93,4 +111,13 @@ class RoleMatchResult(BaseModel):
     role_name: str
     needed: int  # сколько нужно
     filled: int  # сколько уже есть
-    candidates: list[MatchResultItem]
\ No newline at end of file
+    candidates: list[MatchResultItem]
+
+
+class MatchJobOut(BaseModel):
+    job_id: str
+    status: str  # queued | running | done | failed
+    result: Optional[list[RoleMatchResult]] = None
+    error: Optional[str] = None
+    queue_wait_ms: Optional[int] = None
+    run_ms: Optional[int] = None
@@ -0,0 +1,74 @@
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import Float, func, literal, literal_column, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .listing import NEXT_CURSOR_HEADER, ORJSONResponse, encode_rows, row_columns
+
+_WORD = re.compile(r"\w+")
+_SIMPLE = literal_column("'simple'::regconfig")
+
+
+def _prefix_query(q: str) -> str:
+    # "иван разраб" -> "иван:* & разраб:*": каждое слово — префикс, нужны все слова.
+    # В запрос попадают только буквы/цифры, так что синтаксис tsquery не ломается
+    words = _WORD.findall(q.lower())[: settings.SEARCH_MAX_WORDS]
+    return " & ".join(f"{w}:*" for w in words)
+
+
+def _parse_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        score, last_id = cursor.split(":")
+        return float(score), int(last_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def search_page(
+    db: AsyncSession,
+    model,
+    fields: list[str],
+    q: str,
+    trgm_columns: list,
+    cursor: str | None,
+    limit: int | None,
+) -> ORJSONResponse:
+    # Совпадение — либо все слова как префиксы в search_vector (GIN), либо запрос похож на
+    # слово в trgm_columns (триграммный GIN, ловит опечатки). Оценка: ts_rank_cd + лучшая
+    # word_similarity; страницы — keyset по (score, id), курсор "score:id" в X-Next-Cursor
+    limit = limit or settings.SEARCH_DEFAULT_LIMIT
+    q = q.strip()
+    prefix_query = _prefix_query(q)
+    if not prefix_query:
+        return ORJSONResponse(content=[])
+
+    # Порог оператора <% действует до конца транзакции запроса
+    await db.execute(
+        select(func.set_config("pg_trgm.word_similarity_threshold", str(settings.SEARCH_TRGM_THRESHOLD), True))
+    )
+
+    ts_query = func.to_tsquery(_SIMPLE, prefix_query)
+    similarity = [func.word_similarity(q, column, type_=Float) for column in trgm_columns]
+    score = func.ts_rank_cd(model.search_vector, ts_query, type_=Float)
+    # greatest пропускает NULL (пустое имя/username), 0 — на случай, если пусты все
+    score = score + func.greatest(*similarity, 0, type_=Float)
+    matches = or_(
+        model.search_vector.op("@@", is_comparison=True)(ts_query),
+        *[literal(q).op("<%", is_comparison=True)(column) for column in trgm_columns],
+    )
+
+    ranked = select(*row_columns(model, fields), score.label("score")).where(matches).subquery()
+    query = select(ranked).order_by(ranked.c.score.desc(), ranked.c.id.desc()).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(tuple_(ranked.c.score, ranked.c.id) < tuple_(*_parse_cursor(cursor)))
+    rows = encode_rows((await db.execute(query)).mappings(), model, fields)
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = f"{rows[-1]['score']!r}:{rows[-1]['id']}"
+    for row in rows:
+        row.pop("score")
+    return ORJSONResponse(content=rows, headers=headers)
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+import uuid
+
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+
+from .config import settings
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+COALESCED_KEY = "match:flight:coalesced"
+POLL_INTERVAL = 0.2
+
+# Снятие блокировки только её владельцем
+_RELEASE_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Вызовы в этом процессе: ключ -> future с результатом
+_inflight: dict[str, asyncio.Future] = {}
+# Результат отменённого ведущего: ожидающие в процессе не получают его отмену, а пробуют снова
+_RETRY = object()
+
+
+async def _count_coalesced() -> None:
+    try:
+        await redis_client.incr(COALESCED_KEY)
+    except RedisError:
+        pass
+
+
+def _unpack(raw: str) -> list:
+    data = json.loads(raw)
+    if "error" in data:
+        raise HTTPException(status_code=data["status"], detail=data["error"])
+    return data["result"]
+
+
+async def _run_distributed(key: str, compute) -> list:
+    # Между процессами/репликами: выполняет тот, кто взял блокировку в Redis,
+    # остальные ждут, пока он положит результат под result_key
+    lock_key = f"match:flight:lock:{key}"
+    result_key = f"match:flight:result:{key}"
+    token = uuid.uuid4().hex
+    try:
+        acquired = await redis_client.set(lock_key, token, nx=True, ex=settings.MATCH_FLIGHT_LOCK_SECONDS)
+    except RedisError as e:
+        logger.warning("single-flight unavailable: %s", e)
+        return await compute()
+
+    if acquired:
+        # packed остаётся None при отмене (клиент отключился): результата нет, но блокировка
+        # снимается, и ожидающие сразу считают сами, а не ждут её истечения
+        packed = None
+        try:
+            result = await compute()
+            packed = {"result": result}
+            return result
+        except HTTPException as e:
+            packed = {"error": e.detail, "status": e.status_code}
+            raise
+        except Exception as e:
+            packed = {"error": f"Match failed: {e}", "status": 502}
+            raise
+        finally:
+            if packed is not None:
+                try:
+                    await redis_client.setex(result_key, settings.MATCH_FLIGHT_RESULT_SECONDS, json.dumps(packed, ensure_ascii=False))
+                except RedisError as e:
+                    logger.warning("single-flight result not stored: %s", e)
+            try:
+                await redis_client.eval(_RELEASE_LUA, 1, lock_key, token)
+            except RedisError as e:
+                logger.warning("single-flight release failed: %s", e)
+
+    await _count_coalesced()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.MATCH_FLIGHT_LOCK_SECONDS
+    while loop.time() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        try:
+            raw, holder = await redis_client.mget(result_key, lock_key)
+        except RedisError as e:
+            logger.warning("single-flight unavailable: %s", e)
+            break
+        if raw is not None:
+            return _unpack(raw)
+        if holder is None:
+            # Владелец пропал, не оставив результата — считаем сами
+            break
+    return await compute()
+
+
+async def run(key: str | None, compute) -> list:
+    if key is None:
+        return await compute()
+
+    # Внутри процесса: одинаковые запросы ждут один и тот же future
+    existing = _inflight.get(key)
+    if existing is not None:
+        await _count_coalesced()
+    while existing is not None:
+        result = await asyncio.shield(existing)
+        if result is not _RETRY:
+            return result
+        # Ведущий отменён (клиент отключился) — ведущим становится первый проснувшийся
+        existing = _inflight.get(key)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await _run_distributed(key, compute)
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.set_result(_RETRY)
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Ошибку получат ожидающие; здесь она не должна считаться «неполученной»
+        future.exception()
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+async def coalesced() -> int:
+    return int(await redis_client.get(COALESCED_KEY) or 0)
@@ -0,0 +1,179 @@
+# Сравнение двух путей списков: прежнего (ORM-объекты + проверка через response_model)
+# и быстрого (Core select() нужных столбцов + orjson) — пропускная способность и пиковая
+# память на запрос. Запускается из backend/core против базы из CORE_DATABASE_URL:
+#   python bench_listing.py --users 20000 --projects 5000 --members 2000 --repeat 30
+# Синтетические строки вставляются в транзакции, которая в конце откатывается, — база не меняется.
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import tracemalloc
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.db import engine
+from app.main import settings
+from app.models import Project, ProjectMember, User
+from app.routers.projects import list_members, list_projects
+from app.routers.users import list_users
+from app.schemas import ProjectMemberPublic, ProjectPublic, UserPublic
+
+SKILLS = ["Python", "SQL", "React", "Go", "Docker", "Figma", "ML", "Kotlin", "Swift", "Rust"]
+
+
+async def seed(session: AsyncSession, n_users: int, n_projects: int, n_members: int, seed: int) -> int:
+    rnd = random.Random(seed)
+    # Отрицательные telegram_id не пересекаются с настоящими пользователями
+    users = [
+        {
+            "telegram_id": -1_000_000_000_000 - i,
+            "username": f"bench{i}",
+            "name": f"Bench User {i}",
+            "bio": "Опыт в " + ", ".join(rnd.sample(SKILLS, 4)),
+            "skills": [{"name": s, "level": rnd.randint(1, 10)} for s in rnd.sample(SKILLS, rnd.randint(1, 5))],
+        }
+        for i in range(max(n_users, n_members, 1))
+    ]
+    user_ids = list((await session.execute(insert(User).returning(User.id), users)).scalars())
+    projects = [
+        {
+            "name": f"Bench Project {i}",
+            "description": "Синтетический проект для сравнения путей сериализации",
+            "owner_id": rnd.choice(user_ids),
+            "roles": [
+                {"name": f"Role {r}", "count": 1, "skills": [{"name": s, "level": rnd.randint(3, 9)} for s in rnd.sample(SKILLS, 3)]}
+                for r in range(3)
+            ],
+        }
+        for i in range(max(n_projects, 1))
+    ]
+    project_ids = list((await session.execute(insert(Project).returning(Project.id), projects)).scalars())
+    members = [{"project_id": project_ids[0], "user_id": user_id, "role_name": "Role 0"} for user_id in user_ids[:n_members]]
+    if members:
+        await session.execute(insert(ProjectMember), members)
+    return project_ids[0]
+
+
+def orm_paths(session: AsyncSession, limit: int, project_id: int) -> dict:
+    # Прежний путь: ORM-объекты, затем проверка и сериализация через Pydantic, как делает response_model
+    users_adapter = TypeAdapter(list[UserPublic])
+    projects_adapter = TypeAdapter(list[ProjectPublic])
+    members_adapter = TypeAdapter(list[ProjectMemberPublic])
+
+    async def users() -> bytes:
+        res = await session.execute(select(User).order_by(User.id.desc()).limit(limit))
+        return users_adapter.dump_json(users_adapter.validate_python(res.scalars().all(), from_attributes=True))
+
+    async def projects() -> bytes:
+        res = await session.execute(select(Project).order_by(Project.id.desc()).limit(limit))
+        return projects_adapter.dump_json(projects_adapter.validate_python(res.scalars().all(), from_attributes=True))
+
+    async def members() -> bytes:
+        res = await session.execute(
+            select(Project)
+            .where(Project.id == project_id)
+            .options(selectinload(Project.members).selectinload(ProjectMember.user))
+        )
+        p = res.scalar_one()
+        result = [
+            {
+                "id": m.user.id,
+                "telegram_id": m.user.telegram_id,
+                "username": m.user.username,
+                "name": m.user.name,
+                "skills": m.user.skills,
+                "bio": m.user.bio,
+                "role_name": m.role_name,
+            }
+            for m in p.members
+        ]
+        return members_adapter.dump_json(members_adapter.validate_python(result))
+
+    return {"users": users, "projects": projects, "members": members}
+
+
+def fast_paths(session: AsyncSession, limit: int, project_id: int) -> dict:
+    async def users() -> bytes:
+        return (await list_users(limit=limit, cursor=None, fields=None, db=session)).body
+
+    async def projects() -> bytes:
+        return (await list_projects(limit=limit, cursor=None, fields=None, db=session)).body
+
+    async def members() -> bytes:
+        return (await list_members(project_id, db=session)).body
+
+    return {"users": users, "projects": projects, "members": members}
+
+
+async def measure(session: AsyncSession, call, repeat: int, memory_repeat: int) -> dict:
+    for _ in range(2):
+        await call()
+        session.expunge_all()
+
+    # Время — без tracemalloc (он сам замедляет выделения), память — отдельным прогоном
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = await call()
+        timings.append((time.perf_counter() - started) * 1000)
+        session.expunge_all()
+
+    peaks = []
+    tracemalloc.start()
+    for _ in range(memory_repeat):
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        await call()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        session.expunge_all()
+    tracemalloc.stop()
+
+    return {
+        "rps": 1000 / statistics.mean(timings),
+        "p50": statistics.median(timings),
+        "p95": sorted(timings)[min(len(timings) - 1, int(0.95 * len(timings)))],
+        "peak_kib": max(peaks) / 1024,
+        "bytes": len(body),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--projects", type=int, default=5000)
+    parser.add_argument("--members", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=settings.LISTING_MAX_LIMIT)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--memory-repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            session = AsyncSession(bind=conn, expire_on_commit=False)
+            project_id = await seed(session, args.users, args.projects, args.members, args.seed)
+            paths = {"orm": orm_paths(session, args.limit, project_id), "fast": fast_paths(session, args.limit, project_id)}
+
+            print(f"limit={args.limit}, members={args.members}, repeat={args.repeat}")
+            print(f"{'endpoint':<10}{'path':<6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'peak KiB':>10}{'bytes':>10}")
+            for endpoint in ("users", "projects", "members"):
+                results = {}
+                for path, calls in paths.items():
+                    r = results[path] = await measure(session, calls[endpoint], args.repeat, args.memory_repeat)
+                    print(f"{endpoint:<10}{path:<6}{r['rps']:>9.1f}{r['p50']:>9.2f}{r['p95']:>9.2f}{r['peak_kib']:>10.0f}{r['bytes']:>10}")
+                print(
+                    f"{'':<10}x{results['fast']['rps'] / results['orm']['rps']:.1f} req/s, "
+                    f"x{results['orm']['peak_kib'] / max(results['fast']['peak_kib'], 1):.1f} less peak memory"
+                )
+        finally:
+            await trans.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from app.config import settings
+from app.deps import get_current_user, require_admin
+from app.routers import internal
+
+
+async def test_require_admin_allows_listed_telegram_id(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TELEGRAM_IDS", {1001})
+    user = SimpleNamespace(id=1, telegram_id=1001)
+    assert await require_admin(user) is user
+
+
+async def test_require_admin_rejects_other_users(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TELEGRAM_IDS", {1001})
+    with pytest.raises(HTTPException) as exc:
+        await require_admin(SimpleNamespace(id=2, telegram_id=2002))
+    assert exc.value.status_code == 403
+
+
+async def test_internal_endpoints_require_admin(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TELEGRAM_IDS", {1001})
+    app = FastAPI()
+    app.include_router(internal.router)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://core")
+
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=2, telegram_id=2002)
+    assert (await client.get("/internal/http-pools")).status_code == 403
+
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, telegram_id=1001)
+    assert (await client.get("/internal/http-pools")).status_code == 200
+    await client.aclose()
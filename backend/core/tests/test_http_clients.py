@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+
+from app.http_clients import CountingTransport
+
+
+class TracingTransport(httpx.AsyncBaseTransport):
+    # Как пул httpcore: первый запрос открывает соединение, остальные ждут, пока оно освободится
+    def __init__(self):
+        self.free = asyncio.Event()
+        self.connected = False
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        trace = request.extensions["trace"]
+        if self.connected:
+            await self.free.wait()
+        else:
+            self.connected = True
+            await trace("connection.connect_tcp.started", {})
+            await trace("connection.connect_tcp.complete", {})
+        await trace("http11.send_request_headers.started", {})
+        return httpx.Response(200, content=b"ok", extensions={"http_version": b"HTTP/1.1"})
+
+
+async def test_counts_requests_connections_and_pool_waits():
+    inner = TracingTransport()
+    transport = CountingTransport(inner)
+    client = httpx.AsyncClient(base_url="http://ai", transport=transport)
+
+    first = await client.send(client.build_request("GET", "/"), stream=True)
+    assert transport.stats["active"] == 1
+
+    second = asyncio.create_task(client.get("/"))
+    await asyncio.sleep(0.01)
+    assert transport.stats["waiting"] == 1
+
+    await first.aclose()
+    inner.free.set()
+    assert (await second).text == "ok"
+
+    assert transport.stats["requests"] == 2
+    assert transport.stats["connections_opened"] == 1
+    assert transport.stats["pool_waits"] == 1
+    assert transport.stats["active"] == 0
+    assert transport.stats["waiting"] == 0
+    await client.aclose()
+
+
+async def test_failed_request_is_not_left_active():
+    def fail(request):
+        raise httpx.ConnectError("refused")
+
+    transport = CountingTransport(httpx.MockTransport(fail))
+    client = httpx.AsyncClient(base_url="http://tg", transport=transport)
+    try:
+        await client.get("/")
+    except httpx.ConnectError:
+        pass
+
+    assert transport.stats["failed"] == 1
+    assert transport.stats["active"] == 0
+    assert transport.stats["waiting"] == 0
+    await client.aclose()
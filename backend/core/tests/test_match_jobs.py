@@ -0,0 +1,155 @@
+import asyncio
+import time
+
+from fastapi import HTTPException
+
+from app import match_jobs
+from app.config import settings
+from app.schemas import MatchRequestIn
+
+
+class _Session:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _stub_match(monkeypatch, run_match):
+    monkeypatch.setattr(match_jobs.read_routing, "read_session", lambda user_id=None: _Session())
+    monkeypatch.setattr(match_jobs, "run_match", run_match)
+
+
+async def _wait_status(job_id: str, status: str) -> dict:
+    for _ in range(200):
+        job = await match_jobs.get_job(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} is {job['status']}, expected {status}")
+
+
+async def test_worker_runs_job_and_clears_processing(fake_redis, monkeypatch):
+    async def run_match(db, payload, user_id, priority):
+        return [{"role_name": "Backend", "candidates": []}]
+
+    _stub_match(monkeypatch, run_match)
+    job_id = await match_jobs.enqueue(MatchRequestIn(project_id=1), user_id=5)
+    worker = asyncio.create_task(match_jobs._worker(0))
+    try:
+        job = await _wait_status(job_id, "done")
+    finally:
+        worker.cancel()
+    assert job["result"] == [{"role_name": "Backend", "candidates": []}]
+    assert await fake_redis.llen(match_jobs.QUEUE_KEY) == 0
+    assert await fake_redis.llen(match_jobs.PROCESSING_KEY) == 0
+
+
+async def test_job_error_marks_failed(fake_redis, monkeypatch):
+    async def run_match(db, payload, user_id, priority):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    _stub_match(monkeypatch, run_match)
+    job_id = await match_jobs.enqueue(MatchRequestIn(project_id=1), user_id=5)
+    worker = asyncio.create_task(match_jobs._worker(0))
+    try:
+        job = await _wait_status(job_id, "failed")
+    finally:
+        worker.cancel()
+    assert job["error"] == "Project not found"
+    assert await fake_redis.llen(match_jobs.PROCESSING_KEY) == 0
+
+
+async def test_worker_survives_unexpected_error(fake_redis, monkeypatch):
+    calls = []
+
+    async def process(job_id):
+        calls.append(job_id)
+        if len(calls) == 1:
+            raise ValueError("bug")
+
+    monkeypatch.setattr(match_jobs, "_process", process)
+    await fake_redis.lpush(match_jobs.QUEUE_KEY, "a", "b")
+    worker = asyncio.create_task(match_jobs._worker(0))
+    for _ in range(300):
+        if len(calls) == 2:
+            break
+        await asyncio.sleep(0.01)
+    assert not worker.done()
+    worker.cancel()
+    assert calls == ["a", "b"]
+
+
+async def test_job_of_crashed_worker_is_requeued(fake_redis, monkeypatch):
+    job_id = await match_jobs.enqueue(MatchRequestIn(project_id=1), user_id=5)
+    # Воркер взял задачу, отметил running и пропал
+    assert await fake_redis.blmove(match_jobs.QUEUE_KEY, match_jobs.PROCESSING_KEY, 1, "RIGHT", "LEFT") == job_id
+    stale = time.time() - settings.MATCH_JOB_STALE_SECONDS - 1
+    await fake_redis.hset(match_jobs._job_key(job_id), mapping={
+        "status": "running", "claimed_at": stale, "started_at": stale, "attempts": 1,
+    })
+
+    assert await match_jobs._reap() == 1
+    assert await fake_redis.lrange(match_jobs.QUEUE_KEY, 0, -1) == [job_id]
+    assert await fake_redis.llen(match_jobs.PROCESSING_KEY) == 0
+    job = await fake_redis.hgetall(match_jobs._job_key(job_id))
+    assert job["status"] == "queued"
+    assert "claimed_at" not in job and "started_at" not in job
+    # Повторный проход ничего не делает
+    assert await match_jobs._reap() == 0
+
+
+async def test_fresh_running_job_is_left_alone(fake_redis):
+    job_id = await match_jobs.enqueue(MatchRequestIn(project_id=1), user_id=5)
+    await fake_redis.blmove(match_jobs.QUEUE_KEY, match_jobs.PROCESSING_KEY, 1, "RIGHT", "LEFT")
+    await fake_redis.hset(match_jobs._job_key(job_id), mapping={
+        "status": "running", "claimed_at": time.time(), "started_at": time.time(),
+    })
+
+    assert await match_jobs._reap() == 0
+    assert await fake_redis.lrange(match_jobs.PROCESSING_KEY, 0, -1) == [job_id]
+
+
+async def test_long_queued_job_is_not_reaped_while_being_claimed(fake_redis):
+    job_id = await match_jobs.enqueue(MatchRequestIn(project_id=1), user_id=5)
+    key = match_jobs._job_key(job_id)
+    # Задача долго ждала в очереди, воркер только что перенёс её в processing и ещё не отметил
+    await fake_redis.hset(key, "enqueued_at", time.time() - settings.MATCH_JOB_STALE_SECONDS - 1)
+    await fake_redis.blmove(match_jobs.QUEUE_KEY, match_jobs.PROCESSING_KEY, 1, "RIGHT", "LEFT")
+
+    assert await match_jobs._reap() == 0
+    assert await fake_redis.lrange(match_jobs.PROCESSING_KEY, 0, -1) == [job_id]
+    # Сборщик начал отсчёт, а отметка воркера его перезаписывает
+    assert "claimed_at" in await fake_redis.hgetall(key)
+    assert await match_jobs._reap() == 0
+
+
+async def test_worker_records_claim_time(fake_redis, monkeypatch):
+    async def run_match(db, payload, user_id, priority):
+        return []
+
+    _stub_match(monkeypatch, run_match)
+    before = time.time()
+    job_id = await match_jobs.enqueue(MatchRequestIn(project_id=1), user_id=5)
+    worker = asyncio.create_task(match_jobs._worker(0))
+    try:
+        await _wait_status(job_id, "done")
+    finally:
+        worker.cancel()
+    assert float(await fake_redis.hget(match_jobs._job_key(job_id), "claimed_at")) >= before
+
+
+async def test_job_interrupted_too_often_fails(fake_redis):
+    job_id = await match_jobs.enqueue(MatchRequestIn(project_id=1), user_id=5)
+    await fake_redis.blmove(match_jobs.QUEUE_KEY, match_jobs.PROCESSING_KEY, 1, "RIGHT", "LEFT")
+    stale = time.time() - settings.MATCH_JOB_STALE_SECONDS - 1
+    await fake_redis.hset(match_jobs._job_key(job_id), mapping={
+        "status": "running", "claimed_at": stale, "attempts": settings.MATCH_JOB_MAX_ATTEMPTS,
+    })
+
+    assert await match_jobs._reap() == 0
+    job = await match_jobs.get_job(job_id)
+    assert job["status"] == "failed"
+    assert await fake_redis.llen(match_jobs.PROCESSING_KEY) == 0
+    assert await fake_redis.llen(match_jobs.QUEUE_KEY) == 0
@@ -0,0 +1,66 @@
+import json
+from types import SimpleNamespace
+
+import httpx
+from sqlalchemy.dialects import postgresql
+
+from app import http_clients
+from app.matching import MatchPlan, candidate_prefilter, stream_match
+
+
+def _sql(roles) -> tuple[str, dict]:
+    compiled = candidate_prefilter(roles).compile(dialect=postgresql.dialect())
+    return str(compiled), compiled.params
+
+
+def test_prefilter_is_case_insensitive_with_one_condition_per_skill():
+    roles = [
+        {"name": "Frontend", "skills": [{"name": "JavaScript", "level": 5}]},
+        {"name": "Backend", "skills": [{"name": " PostgreSQL ", "level": 1}, {"name": "javascript", "level": 3}]},
+    ]
+    sql, params = _sql(roles)
+
+    assert sql.count("skills_normalized @>") == 2
+    values = [v for v in params.values() if isinstance(v, list)]
+    assert [{"name": "javascript"}] in values
+    assert [{"name": "postgresql"}] in values
+    # Один навык в двух ролях: порог — самый мягкий (3 - MATCH_LEVEL_TOLERANCE)
+    assert {"name": "javascript", "level": 1} in params.values()
+
+
+def test_prefilter_without_skills():
+    assert candidate_prefilter([{"name": "Any", "skills": []}]) is None
+
+
+class _BrokenStream(httpx.AsyncByteStream):
+    # Первая роль приходит, затем ai-service обрывает соединение
+    async def __aiter__(self):
+        yield (json.dumps({"role_name": "Backend", "needed": 1, "candidates": [], "raw": ""}) + "\n").encode()
+        raise httpx.ReadError("connection reset")
+
+
+def _plan() -> MatchPlan:
+    project = SimpleNamespace(id=1, name="P", description="d")
+    return MatchPlan(project, [{"name": "Backend", "count": 1}, {"name": "Frontend", "count": 1}], {}, 3, "single")
+
+
+async def _stream(monkeypatch, handler) -> list[dict]:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://ai")
+    monkeypatch.setitem(http_clients._clients, "ai", client)
+    items = [item async for item in stream_match(_plan(), user_id=5)]
+    await client.aclose()
+    return items
+
+
+async def test_stream_match_reports_unreachable_ai_service(monkeypatch):
+    def handler(request):
+        raise httpx.ConnectError("connection refused")
+
+    assert await _stream(monkeypatch, handler) == [{"error": "AI service error: connection refused"}]
+
+
+async def test_stream_match_ends_with_error_when_stream_breaks(monkeypatch):
+    items = await _stream(monkeypatch, lambda request: httpx.Response(200, stream=_BrokenStream()))
+
+    assert [item.get("role_name") for item in items[:-1]] == ["Backend"]
+    assert items[-1] == {"error": "AI service error: connection reset"}
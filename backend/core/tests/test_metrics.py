@@ -0,0 +1,42 @@
+import httpx
+from fastapi import APIRouter, FastAPI
+from prometheus_client import REGISTRY
+
+from app.metrics import MetricsMiddleware
+
+
+def requests_total(route: str, status: str) -> float:
+    return REGISTRY.get_sample_value(
+        "http_requests_total", {"method": "GET", "route": route, "status": status}
+    ) or 0.0
+
+
+async def test_route_label_is_template_with_router_and_mount_prefix():
+    # Так же подключены роутеры core: префикс в APIRouter, в include_router — без префикса
+    router = APIRouter(prefix="/users")
+
+    @router.get("/{user_id}")
+    async def get_user(user_id: int):
+        return {"id": user_id}
+
+    v2 = FastAPI()
+    v2.include_router(router)
+    app = FastAPI()
+    app.include_router(router)
+    app.mount("/v2", v2)
+    app.add_middleware(MetricsMiddleware)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://core")
+
+    before = requests_total("/users/{user_id}", "200")
+    await client.get("/users/5")
+    await client.get("/users/6")
+    assert requests_total("/users/{user_id}", "200") == before + 2
+
+    mounted = requests_total("/v2/users/{user_id}", "200")
+    await client.get("/v2/users/5")
+    assert requests_total("/v2/users/{user_id}", "200") == mounted + 1
+
+    unmatched = requests_total("unmatched", "404")
+    await client.get("/nowhere")
+    assert requests_total("unmatched", "404") == unmatched + 1
+    await client.aclose()
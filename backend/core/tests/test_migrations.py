@@ -0,0 +1,71 @@
+from sqlalchemy import text
+
+from app import migrations
+from app.db import Base
+from app.partitions import _is_partitioned
+
+# Схема, которую create_all создавал до версионных миграций (первая версия core)
+BASELINE = (
+    "CREATE TABLE users (id SERIAL NOT NULL, telegram_id BIGINT NOT NULL, username VARCHAR(64), "
+    "name VARCHAR(128), skills JSONB, bio TEXT, PRIMARY KEY (id))",
+    "CREATE UNIQUE INDEX ix_users_telegram_id ON users (telegram_id)",
+    "CREATE TABLE projects (id SERIAL NOT NULL, name VARCHAR(200) NOT NULL, description TEXT, roles JSONB, "
+    "owner_id INTEGER NOT NULL, PRIMARY KEY (id), "
+    "FOREIGN KEY(owner_id) REFERENCES users (id) ON DELETE CASCADE)",
+    "CREATE TABLE llm_requests (id SERIAL NOT NULL, project_id INTEGER, user_id INTEGER, "
+    "question TEXT NOT NULL, answer TEXT NOT NULL, created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL, "
+    "PRIMARY KEY (id), FOREIGN KEY(project_id) REFERENCES projects (id) ON DELETE SET NULL, "
+    "FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE SET NULL)",
+    "CREATE TABLE project_members (id SERIAL NOT NULL, project_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+    "role_name VARCHAR(100), PRIMARY KEY (id), CONSTRAINT uq_project_member UNIQUE (project_id, user_id), "
+    "FOREIGN KEY(project_id) REFERENCES projects (id) ON DELETE CASCADE, "
+    "FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE)",
+)
+
+
+async def columns(conn, table: str) -> set[str]:
+    rows = await conn.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table"
+    ), {"table": table})
+    return set(rows.scalars())
+
+
+async def indexes(conn) -> set[str]:
+    rows = await conn.execute(text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()"))
+    return set(rows.scalars())
+
+
+async def test_upgrade_from_baseline_schema(pg_conn):
+    for statement in BASELINE:
+        await pg_conn.execute(text(statement))
+    await pg_conn.execute(text(
+        "INSERT INTO users (id, telegram_id, name, skills) VALUES (1, 100, 'Ivan', '[\"Python\"]')"
+    ))
+    await pg_conn.execute(text(
+        "INSERT INTO llm_requests (id, user_id, question, answer, created_at) "
+        "VALUES (7, 1, 'q', 'a', '2024-03-15T10:00:00+00:00')"
+    ))
+
+    done = await migrations.upgrade(pg_conn)
+
+    assert done == [f"{v} {n}" for v, n, _ in migrations.MIGRATIONS]
+    assert await migrations.upgrade(pg_conn) == []
+    assert await _is_partitioned(pg_conn)
+    assert await pg_conn.scalar(text("SELECT answer FROM llm_requests WHERE id = 7")) == "a"
+    assert await pg_conn.scalar(text("SELECT skills_normalized FROM users WHERE id = 1")) == ["python"]
+    assert await pg_conn.scalar(text("SELECT search_vector IS NOT NULL FROM users WHERE id = 1"))
+    # Следующая запись не упирается в перенесённые id
+    new_id = await pg_conn.scalar(text(
+        "INSERT INTO llm_requests (question, answer) VALUES ('q', 'a') RETURNING id"
+    ))
+    assert new_id > 7
+
+
+async def test_fresh_upgrade_matches_models(pg_conn):
+    await migrations.upgrade(pg_conn)
+
+    existing = await indexes(pg_conn)
+    for table in Base.metadata.sorted_tables:
+        assert await columns(pg_conn, table.name) == {c.name for c in table.columns}, table.name
+        assert {index.name for index in table.indexes} <= existing, table.name
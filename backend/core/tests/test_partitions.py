@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+
+from app import partitions
+from app.config import settings
+
+
+class FakeConn:
+    # Отвечает на scalar() по тексту запроса и запоминает выполненные DDL
+    def __init__(self, locked: bool, partitioned: bool = True):
+        self.locked = locked
+        self.partitioned = partitioned
+        self.statements = []
+
+    async def scalar(self, statement, params=None):
+        sql = str(statement)
+        if "pg_try_advisory_xact_lock" in sql:
+            return self.locked
+        if "pg_partitioned_table" in sql:
+            return self.partitioned
+        raise AssertionError(sql)
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+
+    def begin_nested(self):
+        return _Nested()
+
+
+class _Nested:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+async def test_top_up_creates_months_ahead():
+    conn = FakeConn(locked=True)
+    assert await partitions.top_up(conn)
+
+    current = partitions._month(datetime.now(timezone.utc).date())
+    expected = [partitions.partition_name(partitions._month(current, shift))
+                for shift in range(settings.LLM_PARTITION_MONTHS_AHEAD + 1)]
+    assert [s.split()[5] for s in conn.statements] == expected
+
+
+async def test_top_up_skips_when_another_worker_holds_the_lock():
+    conn = FakeConn(locked=False)
+    assert not await partitions.top_up(conn)
+    assert conn.statements == []
+
+
+async def test_top_up_leaves_legacy_table_to_migrations():
+    conn = FakeConn(locked=True, partitioned=False)
+    assert not await partitions.top_up(conn)
+    assert conn.statements == []
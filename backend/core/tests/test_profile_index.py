@@ -0,0 +1,27 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+
+from app import http_clients, profile_index
+
+
+async def test_push_sends_profile_to_ai_index(monkeypatch):
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        received.append(json.loads(request.content))
+        return httpx.Response(200, json={"indexed": 1, "size": 1})
+
+    client = httpx.AsyncClient(base_url="http://ai", transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(http_clients._clients, "ai", client)
+
+    user = SimpleNamespace(id=7, name="Ann", username="ann", bio="pytorch recommendation models", skills=None)
+    profile_index.push(user)
+    await asyncio.gather(*profile_index._pending)
+
+    assert received == [{"profiles": [
+        {"id": 7, "name": "Ann", "username": "ann", "bio": "pytorch recommendation models", "skills": []},
+    ]}]
+    await client.aclose()
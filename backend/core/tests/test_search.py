@@ -0,0 +1,66 @@
+import itertools
+
+import orjson
+from sqlalchemy import insert
+
+from app.listing import NEXT_CURSOR_HEADER
+from app.models import User
+from app.search import search_page
+
+FIELDS = ["id", "name", "username"]
+_telegram_ids = itertools.count(-1_000_000, -1)
+
+
+async def add_users(session, *users):
+    rows = [{"telegram_id": next(_telegram_ids), **user} for user in users]
+    return list((await session.execute(insert(User).returning(User.id), rows)).scalars())
+
+
+async def search(session, q, cursor=None, limit=None):
+    response = await search_page(session, User, FIELDS, q, [User.name, User.username], cursor, limit)
+    return orjson.loads(response.body), response.headers.get(NEXT_CURSOR_HEADER)
+
+
+async def test_typo_in_name_still_matches(pg_session):
+    petrov, _ = await add_users(
+        pg_session,
+        {"name": "Ivan Petrov", "username": "ivanp", "bio": "backend"},
+        {"name": "Maria Sidorova", "username": "msid", "bio": "design"},
+    )
+
+    # word_similarity('Petrvo', 'Ivan Petrov') ≈ 0.57: ниже порога pg_trgm по умолчанию (0.6),
+    # находится только с SEARCH_TRGM_THRESHOLD, который search_page выставляет через set_config
+    rows, _ = await search(pg_session, "Petrvo")
+
+    assert [row["id"] for row in rows] == [petrov]
+
+
+async def test_prefix_match_ranks_before_typo_match(pg_session):
+    typo, exact = await add_users(
+        pg_session,
+        {"name": "Anna Smirnva", "username": "annas", "bio": None},
+        {"name": "Oleg Smirnov", "username": "olegs", "bio": None},
+    )
+
+    rows, _ = await search(pg_session, "smirnov")
+
+    assert [row["id"] for row in rows] == [exact, typo]
+
+
+async def test_cursor_walks_all_matches_without_repeats(pg_session):
+    ids = await add_users(pg_session, *[
+        {"name": f"Tester {i}", "username": f"tester{i}", "bio": "qa automation"} for i in range(5)
+    ])
+    await add_users(pg_session, {"name": "Someone Else", "username": "other", "bio": "sales"})
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = await search(pg_session, "tester", cursor=cursor, limit=2)
+        seen.extend(row["id"] for row in rows)
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert sorted(seen) == sorted(ids)
+    assert len(set(seen)) == len(seen)
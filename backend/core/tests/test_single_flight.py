@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+
+from app import single_flight
+
+LOCK_KEY = "match:flight:lock:k"
+
+
+async def _wait_for_lock(redis) -> None:
+    for _ in range(100):
+        if await redis.exists(LOCK_KEY):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("leader did not take the lock")
+
+
+async def test_waiter_gets_leader_result(fake_redis):
+    release = asyncio.Event()
+
+    async def leader_compute():
+        await release.wait()
+        return [{"id": 1}]
+
+    async def waiter_compute():
+        raise AssertionError("waiter must not compute")
+
+    leader = asyncio.create_task(single_flight.run("k", leader_compute))
+    await _wait_for_lock(fake_redis)
+    # Ожидающий из другого процесса: in-process future его не касается
+    waiter = asyncio.create_task(single_flight._run_distributed("k", waiter_compute))
+    release.set()
+
+    assert await leader == [{"id": 1}]
+    assert await asyncio.wait_for(waiter, 2) == [{"id": 1}]
+    assert not await fake_redis.exists(LOCK_KEY)
+
+
+async def test_waiter_gets_leader_error(fake_redis):
+    async def leader_compute():
+        await asyncio.sleep(0.05)
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    leader = asyncio.create_task(single_flight.run("k", leader_compute))
+    await _wait_for_lock(fake_redis)
+    waiter = asyncio.create_task(single_flight._run_distributed("k", leader_compute))
+
+    with pytest.raises(HTTPException):
+        await leader
+    with pytest.raises(HTTPException) as e:
+        await asyncio.wait_for(waiter, 2)
+    assert e.value.status_code == 404
+
+
+async def test_cancelled_leader_releases_lock(fake_redis):
+    async def leader_compute():
+        await asyncio.sleep(60)
+
+    async def waiter_compute():
+        return ["computed by waiter"]
+
+    leader = asyncio.create_task(single_flight.run("k", leader_compute))
+    await _wait_for_lock(fake_redis)
+    waiter = asyncio.create_task(single_flight._run_distributed("k", waiter_compute))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    assert not await fake_redis.exists(LOCK_KEY)
+    assert not await fake_redis.exists("match:flight:result:k")
+    # Ожидающий замечает снятую блокировку за один интервал опроса, а не через MATCH_FLIGHT_LOCK_SECONDS
+    assert await asyncio.wait_for(waiter, 1) == ["computed by waiter"]
+    assert single_flight._inflight == {}
+
+
+async def test_cancelled_leader_does_not_cancel_waiters_in_process(fake_redis):
+    async def leader_compute():
+        await asyncio.sleep(60)
+
+    async def waiter_compute():
+        return ["computed by waiter"]
+
+    leader = asyncio.create_task(single_flight.run("k", leader_compute))
+    await _wait_for_lock(fake_redis)
+    # Ожидающие в том же процессе ждут future ведущего, а не Redis
+    waiters = [asyncio.create_task(single_flight.run("k", waiter_compute)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    assert await asyncio.wait_for(asyncio.gather(*waiters), 1) == [["computed by waiter"]] * 2
+    assert single_flight._inflight == {}
+
+
+async def test_waiter_computes_when_redis_fails_while_polling(fake_redis, monkeypatch):
+    release = asyncio.Event()
+
+    async def leader_compute():
+        await release.wait()
+        return ["computed by leader"]
+
+    async def waiter_compute():
+        return ["computed by waiter"]
+
+    async def broken_mget(*keys):
+        raise RedisError("connection lost")
+
+    leader = asyncio.create_task(single_flight.run("k", leader_compute))
+    await _wait_for_lock(fake_redis)
+    monkeypatch.setattr(fake_redis, "mget", broken_mget)
+
+    assert await asyncio.wait_for(single_flight._run_distributed("k", waiter_compute), 1) == ["computed by waiter"]
+    release.set()
+    assert await leader == ["computed by leader"]
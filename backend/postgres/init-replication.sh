@@ -0,0 +1,4 @@
+#!/bin/sh
+# Разрешает потоковую репликацию для postgres-replica (docker compose --profile replica).
+# Выполняется только при инициализации пустого тома; в существующей базе строку нужно добавить в pg_hba.conf вручную
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -3,15 +3,24 @@ import json
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
-from .bot import start_polling, bot
+from . import metrics
+from .bot import start_polling
 from .redis_client import redis_client
+from .send_queue import send_queue
 
 app = FastAPI(title="tg-service")
+metrics.setup(app, send_queue)
 
 
 @app.on_event("startup")
 async def on_startup():
     asyncio.create_task(start_polling())
+    send_queue.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await send_queue.stop()
 
 
 class VerifyIn(BaseModel):
@@ -33,10 +42,24 @@ class NotifyIn(BaseModel):
     text: str
 
 
+class NotifyBatchIn(BaseModel):
+    messages: list[NotifyIn]
+
+
 @app.post("/notify")
 async def notify(payload: NotifyIn):
-    try:
-        await bot.send_message(chat_id=payload.telegram_id, text=payload.text)
-    except Exception:
-        return {"ok": False}
-    return {"ok": True}
\ No newline at end of file
+    # Сообщение ставится в очередь (Redis Stream) и отправляется с учётом лимитов Telegram
+    ids = await send_queue.enqueue([payload.model_dump()])
+    return {"ok": True, "id": ids[0]}
+
+
+@app.post("/notify/batch")
+async def notify_batch(payload: NotifyBatchIn):
+    ids = await send_queue.enqueue([m.model_dump() for m in payload.messages])
+    return {"ok": True, "ids": ids}
+
+
+@app.get("/notify/stats")
+async def notify_stats():
+    # Глубина очереди, доставлено/повторы/ошибки/retry_after, темп и задержка от постановки до отправки
+    return await send_queue.stats()
\ No newline at end of file
@@ -0,0 +1,80 @@
+import time
+
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# HTTP-метрики те же, что в core-service (app/metrics.py)
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route", ["method", "route"])
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being processed")
+
+# Команды Redis (app/redis_client.py): пайплайн считается одной командой PIPELINE/MULTI.
+# XREADGROUP с block ждёт до секунды — смотреть его отдельно от остальных
+REDIS_SECONDS = Histogram(
+    "redis_command_duration_seconds", "Redis command latency", ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+REDIS_ERRORS = Counter("redis_command_errors_total", "Failed Redis commands", ["command"])
+
+# Отправка в Telegram (app/send_queue.py): длительность вызова sendMessage по исходу,
+# ошибки по виду и полное время от постановки в очередь до доставки
+TG_SEND_SECONDS = Histogram("tg_send_duration_seconds", "Telegram sendMessage latency", ["outcome"])
+TG_SEND_ERRORS = Counter("tg_send_errors_total", "Telegram send errors", ["kind"])
+TG_DELIVERY_SECONDS = Histogram(
+    "tg_delivery_seconds", "Time from enqueue to delivery",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900),
+)
+TG_QUEUE_IN_MEMORY = Gauge("tg_send_in_memory", "Messages read from the stream and not yet finished")
+TG_PAUSED_SECONDS = Gauge("tg_send_paused_seconds", "Remaining global pause after retry_after")
+
+
+def route_template(scope) -> str:
+    # scope["route"] выставляет роутер; без совпадения (404) — одна общая метка. Префикс
+    # смонтированного приложения приходит в root_path, префикс роутера задаётся в самом
+    # APIRouter(prefix=...) и уже есть в route.path (префикс include_router FastAPI >= 0.137
+    # в route.path не кладёт)
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if not path:
+        return "unmatched"
+    return scope.get("root_path", "") + path
+
+
+class MetricsMiddleware:
+    # Чистый ASGI (не BaseHTTPMiddleware): не оборачивает тело, стриминговые ответы
+    # (/ai/match/stream) меряются до последнего байта
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_FLIGHT.dec()
+            route = route_template(scope)
+            REQUEST_SECONDS.labels(scope["method"], route).observe(time.perf_counter() - started)
+            REQUESTS.labels(scope["method"], route, str(status)).inc()
+
+
+def setup(app: FastAPI, send_queue) -> None:
+    app.add_middleware(MetricsMiddleware)
+    TG_QUEUE_IN_MEMORY.set_function(lambda: send_queue.inflight)
+    TG_PAUSED_SECONDS.set_function(lambda: max(send_queue.paused_until - time.monotonic(), 0.0))
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,5 +1,42 @@
+import time
+
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+
+from .metrics import REDIS_ERRORS, REDIS_SECONDS
 from .settings import Settings
 
 settings = Settings()
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
\ No newline at end of file
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        command = "MULTI" if self.is_transaction else "PIPELINE"
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        except redis.RedisError:
+            REDIS_ERRORS.labels(command).inc()
+            raise
+        finally:
+            REDIS_SECONDS.labels(command).observe(time.perf_counter() - started)
+
+
+class InstrumentedRedis(redis.Redis):
+    # Время каждой команды — в redis_command_duration_seconds (app/metrics.py)
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        except redis.RedisError:
+            REDIS_ERRORS.labels(command).inc()
+            raise
+        finally:
+            REDIS_SECONDS.labels(command).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+redis_client = InstrumentedRedis.from_url(settings.REDIS_URL, decode_responses=True)
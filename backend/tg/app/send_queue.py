@@ -0,0 +1,284 @@
+import asyncio
+import heapq
+import logging
+import socket
+import time
+from collections import deque
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramNotFound, TelegramRetryAfter
+from redis.exceptions import RedisError, ResponseError
+
+from .bot import bot, settings
+from .metrics import TG_DELIVERY_SECONDS, TG_SEND_ERRORS, TG_SEND_SECONDS
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "tg:send"
+DEAD_KEY = "tg:send:dead"
+GROUP = "senders"
+
+# Ошибки, при которых повтор бессмысленен: бот заблокирован, чат не найден, неверный текст
+PERMANENT_ERRORS = (TelegramForbiddenError, TelegramBadRequest, TelegramNotFound)
+
+
+class SendQueue:
+    # Очередь исходящих сообщений поверх Redis Streams (группа потребителей GROUP):
+    # - reader забирает записи из стрима в память, раскладывая по чатам
+    #   (не больше SEND_MAX_INFLIGHT, остальное ждёт в Redis);
+    # - scheduler выбирает чат, которому уже можно писать (не чаще раза в
+    #   SEND_CHAT_INTERVAL_SECONDS), и берёт токен общего лимита SEND_RATE_PER_SEC;
+    # - retry_after от Telegram откладывает чат и ставит общую паузу на это время;
+    # - запись подтверждается (XACK + XDEL) после доставки или окончательной ошибки,
+    #   так что после рестарта недоставленное дочитывается из pending.
+    # Лимиты общие на процесс: tg-service с polling работает в одном экземпляре.
+
+    def __init__(self):
+        self.consumer = socket.gethostname()
+        self.chats: dict[int, deque] = {}
+        self.entries: set[str] = set()
+        self.ready: list[tuple[float, int]] = []
+        self.scheduled: set[int] = set()
+        self.chat_next: dict[int, float] = {}
+        self.inflight = 0
+        self.tokens = float(settings.SEND_RATE_PER_SEC)
+        self._refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self._wakeup = asyncio.Event()
+        self._sending = asyncio.Semaphore(settings.SEND_CONCURRENCY)
+        self._tasks: list[asyncio.Task] = []
+        self._senders: set[asyncio.Task] = set()
+
+        self.counters = {"sent": 0, "retried": 0, "failed": 0, "retry_after": 0}
+        self.latency_ms = deque(maxlen=2000)
+        self.sent_at = deque(maxlen=10000)
+
+    # --- постановка в очередь ---
+
+    async def enqueue(self, messages: list[dict]) -> list[str]:
+        now = time.time()
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for m in messages:
+                pipe.xadd(STREAM_KEY, {"telegram_id": m["telegram_id"], "text": m["text"], "enqueued_at": now, "attempts": 0})
+            return await pipe.execute()
+
+    # --- чтение из стрима ---
+
+    async def _ensure_group(self) -> None:
+        try:
+            await redis_client.xgroup_create(STREAM_KEY, GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _accept(self, entry_id: str, fields: dict) -> None:
+        if entry_id in self.entries:
+            return
+        self.entries.add(entry_id)
+        chat_id = int(fields["telegram_id"])
+        self.chats.setdefault(chat_id, deque()).append((entry_id, fields))
+        self.inflight += 1
+        self._schedule(chat_id)
+
+    def _schedule(self, chat_id: int) -> None:
+        if chat_id in self.scheduled or not self.chats.get(chat_id):
+            return
+        self.scheduled.add(chat_id)
+        heapq.heappush(self.ready, (self.chat_next.get(chat_id, 0.0), chat_id))
+        self._wakeup.set()
+
+    async def _read(self) -> None:
+        await self._ensure_group()
+        # Сначала свои недоставленные записи (после рестарта), затем новые
+        last_id = "0"
+        claimed_at = 0.0
+        while True:
+            try:
+                if self.inflight >= settings.SEND_MAX_INFLIGHT:
+                    await asyncio.sleep(0.05)
+                    continue
+                if time.monotonic() - claimed_at > settings.SEND_CLAIM_IDLE_SECONDS:
+                    claimed_at = time.monotonic()
+                    self._forget_idle_chats()
+                    await self._claim_stale()
+                count = settings.SEND_MAX_INFLIGHT - self.inflight
+                reply = await redis_client.xreadgroup(
+                    GROUP, self.consumer, {STREAM_KEY: last_id}, count=count, block=None if last_id == "0" else 1000,
+                )
+                entries = reply[0][1] if reply else []
+                if last_id == "0" and not entries:
+                    last_id = ">"
+                    continue
+                for entry_id, fields in entries:
+                    if fields:
+                        self._accept(entry_id, fields)
+                if last_id == "0":
+                    last_id = entries[-1][0]
+            except asyncio.CancelledError:
+                raise
+            except RedisError as e:
+                logger.warning("send queue: redis error: %s", e)
+                await asyncio.sleep(1)
+
+    async def _claim_stale(self) -> None:
+        # Записи, зависшие у других потребителей (упавший процесс), забираем себе
+        _, entries, *_ = await redis_client.xautoclaim(
+            STREAM_KEY, GROUP, self.consumer, min_idle_time=int(settings.SEND_CLAIM_IDLE_SECONDS * 1000), count=100,
+        )
+        for entry_id, fields in entries:
+            if fields:
+                self._accept(entry_id, fields)
+
+    def _forget_idle_chats(self) -> None:
+        now = time.monotonic()
+        self.chat_next = {chat_id: t for chat_id, t in self.chat_next.items() if t > now or chat_id in self.chats}
+
+    # --- отправка ---
+
+    async def _take_token(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(settings.SEND_RATE_PER_SEC, self.tokens + (now - self._refilled_at) * settings.SEND_RATE_PER_SEC)
+            self._refilled_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / settings.SEND_RATE_PER_SEC)
+
+    async def _schedule_loop(self) -> None:
+        while True:
+            if not self.ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            ready_at, chat_id = self.ready[0]
+            delay = ready_at - time.monotonic()
+            if delay > 0:
+                # Ждём готовности чата, но просыпаемся, если появился чат, готовый раньше
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self.ready)
+            self.scheduled.discard(chat_id)
+            queue = self.chats.get(chat_id)
+            if not queue:
+                continue
+            if self.chat_next.get(chat_id, 0.0) > time.monotonic():
+                # Чат успели отложить (retry_after, повтор после ошибки) уже после постановки в heap
+                self._schedule(chat_id)
+                continue
+            await self._take_token()
+            await self._sending.acquire()
+            entry_id, fields = queue.popleft()
+            self.chat_next[chat_id] = time.monotonic() + settings.SEND_CHAT_INTERVAL_SECONDS
+            self._schedule(chat_id)
+            task = asyncio.create_task(self._send(chat_id, entry_id, fields))
+            self._senders.add(task)
+            task.add_done_callback(self._senders.discard)
+
+    async def _send(self, chat_id: int, entry_id: str, fields: dict) -> None:
+        started = time.perf_counter()
+        try:
+            await bot.send_message(chat_id=chat_id, text=fields["text"])
+        except TelegramRetryAfter as e:
+            self._observe_send(started, "retry_after")
+            self.counters["retry_after"] += 1
+            resume = time.monotonic() + e.retry_after
+            self.paused_until = max(self.paused_until, resume)
+            self.chat_next[chat_id] = max(self.chat_next.get(chat_id, 0.0), resume)
+            self._requeue(chat_id, entry_id, fields, count_attempt=False)
+            return
+        except PERMANENT_ERRORS as e:
+            self._observe_send(started, "permanent")
+            await self._finish(chat_id, entry_id, fields, error=f"{type(e).__name__}: {e}")
+            return
+        except Exception as e:
+            self._observe_send(started, "transient")
+            attempts = int(fields.get("attempts", 0)) + 1
+            if attempts >= settings.SEND_MAX_ATTEMPTS:
+                await self._finish(chat_id, entry_id, fields, error=f"{type(e).__name__}: {e}")
+                return
+            fields["attempts"] = attempts
+            self.chat_next[chat_id] = time.monotonic() + min(2 ** attempts, 60)
+            self._requeue(chat_id, entry_id, fields, count_attempt=True)
+            return
+        finally:
+            self._sending.release()
+        TG_SEND_SECONDS.labels("ok").observe(time.perf_counter() - started)
+        await self._finish(chat_id, entry_id, fields)
+
+    @staticmethod
+    def _observe_send(started: float, kind: str) -> None:
+        # Метрики Prometheus (app/metrics.py): длительность по исходу и вид ошибки
+        TG_SEND_SECONDS.labels(kind).observe(time.perf_counter() - started)
+        TG_SEND_ERRORS.labels(kind).inc()
+
+    def _requeue(self, chat_id: int, entry_id: str, fields: dict, count_attempt: bool) -> None:
+        # Сообщение возвращается в начало очереди своего чата, чтобы не нарушать порядок
+        if count_attempt:
+            self.counters["retried"] += 1
+        self.chats.setdefault(chat_id, deque()).appendleft((entry_id, fields))
+        self._schedule(chat_id)
+
+    async def _finish(self, chat_id: int, entry_id: str, fields: dict, error: str | None = None) -> None:
+        self.inflight -= 1
+        self.entries.discard(entry_id)
+        if not self.chats.get(chat_id):
+            self.chats.pop(chat_id, None)
+        try:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                if error is not None:
+                    pipe.xadd(DEAD_KEY, {**fields, "error": error}, maxlen=10000, approximate=True)
+                pipe.xack(STREAM_KEY, GROUP, entry_id)
+                pipe.xdel(STREAM_KEY, entry_id)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("send queue: could not ack %s: %s", entry_id, e)
+
+        if error is not None:
+            self.counters["failed"] += 1
+            logger.warning("send to %s failed permanently: %s", chat_id, error)
+            return
+        self.counters["sent"] += 1
+        self.sent_at.append(time.monotonic())
+        delivery = time.time() - float(fields["enqueued_at"])
+        self.latency_ms.append(delivery * 1000)
+        TG_DELIVERY_SECONDS.observe(delivery)
+
+    # --- жизненный цикл и метрики ---
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._read()), asyncio.create_task(self._schedule_loop())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def stats(self) -> dict:
+        latency = sorted(self.latency_ms)
+        now = time.monotonic()
+        return {
+            "stream_length": await redis_client.xlen(STREAM_KEY),
+            "dead_letters": await redis_client.xlen(DEAD_KEY),
+            "in_memory": self.inflight,
+            "chats_waiting": len(self.chats),
+            "paused_seconds": round(max(self.paused_until - now, 0.0), 1),
+            **self.counters,
+            "rate_last_10s": round(sum(1 for t in self.sent_at if now - t <= 10) / 10, 1),
+            "latency_ms": {
+                "p50": round(latency[len(latency) // 2]) if latency else None,
+                "p95": round(latency[min(len(latency) - 1, int(0.95 * len(latency)))]) if latency else None,
+            },
+        }
+
+
+send_queue = SendQueue()
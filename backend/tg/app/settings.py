@@ -4,4 +4,14 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
     TELEGRAM_BOT_TOKEN: str
-    REDIS_URL: str
\ No newline at end of file
+    REDIS_URL: str
+    # Очередь отправки (app/send_queue.py): общий лимит Telegram ~30 сообщений/с,
+    # в один чат — не чаще раза в секунду
+    SEND_RATE_PER_SEC: float = 30.0
+    SEND_CHAT_INTERVAL_SECONDS: float = 1.0
+    SEND_CONCURRENCY: int = 30
+    # Сколько записей стрима держать в памяти процесса, остальное ждёт в Redis
+    SEND_MAX_INFLIGHT: int = 1000
+    SEND_MAX_ATTEMPTS: int = 5
+    # Через сколько секунд чужие неподтверждённые записи (упавший процесс) забираются себе
+    SEND_CLAIM_IDLE_SECONDS: float = 60.0
@@ -64,9 +64,37 @@ def api_update_me(name, bio, skills):
         return False, str(e)
 
 
-def api_get_users():
+# Размер страницы списков: следующая страница грузится кнопкой «Показать ещё»
+PAGE_SIZE = 50
+
+
+def api_get_page(path, fields=None, cursor=None):
+    # Одна страница списка и курсор следующей (заголовок X-Next-Cursor; на последней — None)
+    params = {"limit": PAGE_SIZE}
+    if fields:
+        params["fields"] = fields
+    if cursor:
+        params["cursor"] = cursor
     try:
-        res = requests.get(f"{API_URL}/users/", headers=get_headers())
+        res = requests.get(f"{API_URL}{path}", headers=get_headers(), params=params)
+        if res.status_code != 200:
+            return [], None
+        return res.json(), res.headers.get("X-Next-Cursor")
+    except:
+        return [], None
+
+
+def api_get_users(fields=None, cursor=None):
+    return api_get_page("/users/", fields, cursor)
+
+
+def api_search_users(query, fields=None):
+    # Первая страница результатов, лучшие совпадения сначала
+    params = {"q": query, "limit": 50}
+    if fields:
+        params["fields"] = fields
+    try:
+        res = requests.get(f"{API_URL}/users/search", headers=get_headers(), params=params)
         return res.json() if res.status_code == 200 else []
     except:
         return []
@@ -80,12 +108,8 @@ def api_get_user(user_id):
         return None
 
 
-def api_get_projects():
-    try:
-        res = requests.get(f"{API_URL}/projects/", headers=get_headers())
-        return res.json() if res.status_code == 200 else []
-    except:
-        return []
+def api_get_projects(cursor=None):
+    return api_get_page("/projects/", cursor=cursor)
 
 
 def api_get_project(project_id):
@@ -145,6 +169,19 @@ def api_add_member(project_id, user_id, role_name=None):
         return False
 
 
+def api_members_batch(project_id, items):
+    # items: [{"user_id": ..., "role_name": ..., "op": "add" | "remove"}]
+    try:
+        res = requests.post(
+            f"{API_URL}/projects/{project_id}/members:batch",
+            headers=get_headers(),
+            json={"items": items},
+        )
+        return res.json() if res.status_code == 200 else None
+    except:
+        return None
+
+
 def api_remove_member(project_id, user_id):
     try:
         res = requests.delete(f"{API_URL}/projects/{project_id}/members/{user_id}", headers=get_headers())
@@ -168,6 +205,26 @@ def api_ai_match(project_id, top_n=3):
         return None
 
 
+def api_ai_match_stream(project_id, top_n=3):
+    # Роли приходят по одной по мере готовности (NDJSON)
+    try:
+        with requests.post(
+            f"{API_URL}/ai/match/stream",
+            headers=get_headers(),
+            json={"project_id": project_id, "top_n": top_n},
+            stream=True,
+            timeout=120
+        ) as res:
+            if res.status_code != 200:
+                yield {"error": res.text}
+                return
+            for line in res.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+    except Exception as e:
+        yield {"error": str(e)}
+
+
 # ============== MAIN APP ==============
 
 def main(page: ft.Page):
@@ -285,8 +342,10 @@ def main(page: ft.Page):
         show_projects()
 
     # ============== PROJECTS VIEW ==============
-    def show_projects():
-        projects = api_get_projects()
+    def show_projects(loaded=None, cursor=None):
+        # loaded — уже показанные страницы: «Показать ещё» дозагружает следующую и перерисовывает список
+        page_items, next_cursor = api_get_projects(cursor)
+        projects = (loaded or []) + page_items
 
         # Фильтруем только свои проекты для кнопок редактирования
         my_projects = [p for p in projects if p.get("owner_id") == state.user.get("id")]
@@ -342,6 +401,10 @@ def main(page: ft.Page):
             projects_list.controls.append(
                 ft.Text("Проектов пока нет", italic=True, color=ft.Colors.GREY)
             )
+        if next_cursor:
+            projects_list.controls.append(
+                ft.TextButton("Показать ещё", on_click=lambda e: show_projects(projects, next_cursor))
+            )
 
         content_area.content = ft.Column([
             ft.Row([
@@ -451,19 +514,25 @@ def main(page: ft.Page):
                 show_snack("Ошибка удаления", "red")
 
         def show_add_member_dialog():
-            users = api_get_users()
+            # Пользователь выбирается из результатов поиска, а не из списка всех пользователей
             member_ids = [m["id"] for m in members]
-            available = [u for u in users if u["id"] not in member_ids and u["id"] != project.get("owner_id")]
-
-            if not available:
-                show_snack("Нет доступных пользователей", "orange")
-                return
+            user_dropdown = ft.Dropdown(label="Пользователь", options=[], width=250)
+
+            def on_search(e):
+                query = e.control.value.strip()
+                users = api_search_users(query, "id,name,username") if query else []
+                available = [u for u in users if u["id"] not in member_ids and u["id"] != project.get("owner_id")]
+                user_dropdown.options = [
+                    ft.dropdown.Option(str(u["id"]), u.get("name") or u.get("username") or f"User #{u['id']}")
+                    for u in available
+                ]
+                user_dropdown.value = None
+                if not available:
+                    show_snack("Никого не найдено", "orange")
+                page.update()
 
-            user_dropdown = ft.Dropdown(
-                label="Пользователь",
-                options=[ft.dropdown.Option(str(u["id"]), u.get("name") or u.get("username") or f"User #{u['id']}") 
-                        for u in available],
-                width=250,
+            search_field = ft.TextField(
+                label="Поиск по имени или username", prefix_icon=ft.Icons.SEARCH, width=250, on_submit=on_search,
             )
             role_dropdown = ft.Dropdown(
                 label="Роль",
@@ -484,7 +553,7 @@ def main(page: ft.Page):
 
             dialog = ft.AlertDialog(
                 title=ft.Text("Добавить участника"),
-                content=ft.Column([user_dropdown, role_dropdown], tight=True, spacing=15),
+                content=ft.Column([search_field, user_dropdown, role_dropdown], tight=True, spacing=15),
                 actions=[
                     ft.TextButton("Отмена", on_click=lambda e: close_dialog()),
                     ft.Button("Добавить", on_click=on_add),
@@ -734,31 +803,55 @@ def main(page: ft.Page):
         ], expand=True)
         page.update()
 
-        # Запрос
-        results = api_ai_match(project_id, top_n=3)
-
-        if results is None:
-            content_area.content = ft.Column([
-                ft.Row([
-                    ft.IconButton(ft.Icons.ARROW_BACK, on_click=lambda e: show_project_detail(project_id)),
-                    ft.Text("Ошибка", size=22, weight=ft.FontWeight.BOLD),
-                ]),
-                ft.Container(
-                    ft.Text("Не удалось получить результаты от AI", color=ft.Colors.RED),
-                    expand=True, alignment=ft.Alignment.CENTER,
-                )
-            ], expand=True)
-            page.update()
-            return
-
-        # Отображаем результаты
+        # Отображаем результаты по мере готовности ролей (потоковый ответ)
         results_list = ft.ListView(expand=True, spacing=10, padding=10)
 
-        all_users = api_get_users()
+        # Данные кандидатов запрашиваются по id: их всего top_n на роль
+        users_by_id = {}
         members = api_get_members(project_id)
         member_ids = [m["id"] for m in members]
+        shown = False
+
+        # Отмеченные кандидаты добавляются одним запросом: user_id -> роль
+        selected = {}
+
+        def add_selected(e):
+            if not selected:
+                show_snack("Никто не выбран", "orange")
+                return
+            items = [{"user_id": uid, "role_name": rname, "op": "add"} for uid, rname in selected.items()]
+            result = api_members_batch(project_id, items)
+            if result is None:
+                show_snack("Ошибка", "red")
+                return
+            added = len([r for r in result if r["status"] in ("added", "updated")])
+            show_snack(f"Добавлено в команду: {added}")
+            show_ai_match(project_id)  # Обновляем
+
+        def make_select_handler(cid, rname):
+            def handler(e):
+                if e.control.value:
+                    selected[cid] = rname
+                else:
+                    selected.pop(cid, None)
+            return handler
+
+        for role_result in api_ai_match_stream(project_id, top_n=3):
+            if "error" in role_result:
+                break
+
+            if not shown:
+                content_area.content = ft.Column([
+                    ft.Row([
+                        ft.IconButton(ft.Icons.ARROW_BACK, on_click=lambda e: show_project_detail(project_id)),
+                        ft.Text("Результаты AI подбора", size=22, weight=ft.FontWeight.BOLD),
+                        ft.Container(expand=True),
+                        ft.Button("Добавить выбранных", icon=ft.Icons.GROUP_ADD, on_click=add_selected),
+                    ]),
+                    results_list,
+                ], expand=True)
+                shown = True
 
-        for role_result in results:
             role_name = role_result.get("role_name", "?")
             needed = role_result.get("needed", 0)
             filled = role_result.get("filled", 0)
@@ -779,10 +872,11 @@ def main(page: ft.Page):
                 results_list.controls.append(
                     ft.Text("Подходящих кандидатов не найдено", italic=True, color=ft.Colors.GREY)
                 )
-                continue
 
             for c in candidates:
-                user_data = next((u for u in all_users if u["id"] == c["id"]), None)
+                if c["id"] not in users_by_id:
+                    users_by_id[c["id"]] = api_get_user(c["id"])
+                user_data = users_by_id[c["id"]]
                 user_name = user_data.get("name") or user_data.get("username") or f"User #{c['id']}" if user_data else f"User #{c['id']}"
                 score = c.get("score", 0)
                 reason = c.get("reason", "")
@@ -803,6 +897,7 @@ def main(page: ft.Page):
                 results_list.controls.append(
                     ft.Card(content=ft.Container(
                         content=ft.Row([
+                            ft.Checkbox(disabled=is_member, value=is_member, on_change=make_select_handler(c["id"], role_name)),
                             ft.Column([
                                 ft.Text(user_name, weight=ft.FontWeight.BOLD),
                                 ft.Text(reason, size=12, color=ft.Colors.GREY_700),
@@ -817,49 +912,80 @@ def main(page: ft.Page):
                     ))
                 )
 
-        content_area.content = ft.Column([
-            ft.Row([
-                ft.IconButton(ft.Icons.ARROW_BACK, on_click=lambda e: show_project_detail(project_id)),
-                ft.Text("Результаты AI подбора", size=22, weight=ft.FontWeight.BOLD),
-            ]),
-            results_list,
-        ], expand=True)
-        page.update()
+            page.update()
+
+        if not shown:
+            content_area.content = ft.Column([
+                ft.Row([
+                    ft.IconButton(ft.Icons.ARROW_BACK, on_click=lambda e: show_project_detail(project_id)),
+                    ft.Text("Ошибка", size=22, weight=ft.FontWeight.BOLD),
+                ]),
+                ft.Container(
+                    ft.Text("Не удалось получить результаты от AI", color=ft.Colors.RED),
+                    expand=True, alignment=ft.Alignment.CENTER,
+                )
+            ], expand=True)
+            page.update()
 
     # ============== USERS VIEW ==============
-    def show_users():
-        users = api_get_users()
+    def show_users(query=""):
+        fields = "id,name,username,skills"
+        next_cursor = None
+        if query:
+            users = api_search_users(query, fields)
+        else:
+            users, next_cursor = api_get_users(fields)
+        search_field = ft.TextField(
+            value=query, hint_text="Поиск по имени, username и описанию", prefix_icon=ft.Icons.SEARCH,
+            on_submit=lambda e: show_users(e.control.value.strip()),
+        )
 
         users_list = ft.ListView(expand=True, spacing=10, padding=10)
 
-        for u in users:
+        def make_user_card(u):
             skills = u.get("skills") or []
             skills_text = ", ".join([s["name"] for s in skills[:4]])
             is_me = u["id"] == state.user.get("id")
 
-            users_list.controls.append(
-                ft.Card(content=ft.Container(
-                    content=ft.ListTile(
-                        leading=ft.Icon(ft.Icons.PERSON, color=ft.Colors.BLUE if is_me else None),
-                        title=ft.Text(
-                            (u.get("name") or u.get("username") or f"User #{u['id']}") + (" (вы)" if is_me else ""),
-                            weight=ft.FontWeight.BOLD
-                        ),
-                        subtitle=ft.Text(skills_text or "Навыки не указаны", size=12),
-                        on_click=lambda e, uid=u["id"]: show_user_detail(uid),
+            return ft.Card(content=ft.Container(
+                content=ft.ListTile(
+                    leading=ft.Icon(ft.Icons.PERSON, color=ft.Colors.BLUE if is_me else None),
+                    title=ft.Text(
+                        (u.get("name") or u.get("username") or f"User #{u['id']}") + (" (вы)" if is_me else ""),
+                        weight=ft.FontWeight.BOLD
                     ),
-                    padding=5,
-                ))
-            )
+                    subtitle=ft.Text(skills_text or "Навыки не указаны", size=12),
+                    on_click=lambda e, uid=u["id"]: show_user_detail(uid),
+                ),
+                padding=5,
+            ))
+
+        more_button = ft.TextButton("Показать ещё")
+
+        def load_more(e):
+            # Следующая страница дописывается в конец списка
+            nonlocal next_cursor
+            more, next_cursor = api_get_users(fields, next_cursor)
+            users_list.controls.remove(more_button)
+            users_list.controls.extend(make_user_card(u) for u in more)
+            if next_cursor:
+                users_list.controls.append(more_button)
+            page.update()
+
+        more_button.on_click = load_more
+        users_list.controls.extend(make_user_card(u) for u in users)
+        if next_cursor:
+            users_list.controls.append(more_button)
 
         if not users:
-            users_list.controls.append(ft.Text("Пользователей нет", italic=True))
+            users_list.controls.append(ft.Text("Ничего не найдено" if query else "Пользователей нет", italic=True))
 
         content_area.content = ft.Column([
             ft.Row([
                 ft.Text("Пользователи", size=24, weight=ft.FontWeight.BOLD),
-                ft.IconButton(ft.Icons.REFRESH, on_click=lambda e: show_users()),
+                ft.IconButton(ft.Icons.REFRESH, on_click=lambda e: show_users(query)),
             ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+            search_field,
             users_list,
         ], expand=True)
         page.update()
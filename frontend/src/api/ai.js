@@ -11,3 +11,49 @@ export async function matchCandidates(projectId, roleName = null, topN = 3) {
   const response = await client.post("/ai/match", payload);
   return response.data;
 }
+
+// Потоковый подбор: onRole вызывается для каждой роли по мере готовности (NDJSON)
+export async function matchCandidatesStream(
+  projectId,
+  onRole,
+  roleName = null,
+  topN = 3,
+) {
+  const payload = {
+    project_id: projectId,
+    top_n: topN,
+  };
+  if (roleName) {
+    payload.role_name = roleName;
+  }
+  const token = localStorage.getItem("token");
+  const response = await fetch(`${client.defaults.baseURL}/ai/match/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify(payload),
+  });
+  if (!response.ok) {
+    const data = await response.json().catch(() => ({}));
+    throw new Error(data.detail || "Ошибка AI сервиса");
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const item = JSON.parse(line);
+      if (item.error) throw new Error(item.error);
+      onRole(item);
+    }
+  }
+}
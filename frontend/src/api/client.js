@@ -30,4 +30,7 @@ client.interceptors.response.use(
   },
 );
 
+// Размер страницы списков (GET /users/, /projects/, поиск); следующая — кнопкой «Показать ещё»
+export const PAGE_SIZE = 50;
+
 export default client;
@@ -1,8 +1,12 @@
-import client from "./client";
-
-export async function getProjects() {
-  const response = await client.get("/projects/");
-  return response.data;
+import client, { PAGE_SIZE } from "./client";
+
+export async function getProjects({ cursor, fields } = {}) {
+  // Одна страница списка; курсор следующей — в заголовке X-Next-Cursor (на последней его нет)
+  const params = { limit: PAGE_SIZE };
+  if (fields) params.fields = fields;
+  if (cursor) params.cursor = cursor;
+  const response = await client.get("/projects/", { params });
+  return { items: response.data, nextCursor: response.headers["x-next-cursor"] || null };
 }
 
 export async function getProject(projectId) {
@@ -1,4 +1,4 @@
-import client from "./client";
+import client, { PAGE_SIZE } from "./client";
 
 export async function getMe() {
   const response = await client.get("/users/me");
@@ -10,8 +10,20 @@ export async function updateMe(data) {
   return response.data;
 }
 
-export async function getUsers() {
-  const response = await client.get("/users/");
+export async function getUsers({ cursor, fields } = {}) {
+  // Одна страница списка; курсор следующей — в заголовке X-Next-Cursor (на последней его нет)
+  const params = { limit: PAGE_SIZE };
+  if (fields) params.fields = fields;
+  if (cursor) params.cursor = cursor;
+  const response = await client.get("/users/", { params });
+  return { items: response.data, nextCursor: response.headers["x-next-cursor"] || null };
+}
+
+export async function searchUsers(query, fields) {
+  // Первая страница результатов, лучшие совпадения сначала
+  const params = { q: query, limit: PAGE_SIZE };
+  if (fields) params.fields = fields;
+  const response = await client.get("/users/search", { params });
   return response.data;
 }
 
@@ -8,8 +8,8 @@ import {
   addProjectMember,
   removeProjectMember,
 } from "../api/projects";
-import { getUsers } from "../api/users";
-import { matchCandidates } from "../api/ai";
+import { getUser, searchUsers } from "../api/users";
+import { matchCandidatesStream } from "../api/ai";
 import Layout from "../components/Layout";
 import UserCard from "../components/UserCard";
 
@@ -20,7 +20,10 @@ export default function ProjectDetail() {
 
   const [project, setProject] = useState(null);
   const [members, setMembers] = useState([]);
-  const [allUsers, setAllUsers] = useState([]);
+  // Пользователи из поиска (для добавления вручную) и данные кандидатов AI по id
+  const [foundUsers, setFoundUsers] = useState([]);
+  const [userQuery, setUserQuery] = useState("");
+  const [candidateUsers, setCandidateUsers] = useState({});
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
 
@@ -39,14 +42,12 @@ export default function ProjectDetail() {
 
   const loadData = async () => {
     try {
-      const [proj, memb, users] = await Promise.all([
+      const [proj, memb] = await Promise.all([
         getProject(projectId),
         getProjectMembers(projectId),
-        getUsers(),
       ]);
       setProject(proj);
       setMembers(memb);
-      setAllUsers(users);
     } catch (err) {
       setError("Проект не найден");
     } finally {
@@ -54,6 +55,35 @@ export default function ProjectDetail() {
     }
   };
 
+  useEffect(() => {
+    // Кандидатов не больше top_n на роль — их профили запрашиваются по одному
+    const missing = (matchResults || [])
+      .flatMap((role) => role.candidates.map((c) => c.id))
+      .filter((id, i, ids) => ids.indexOf(id) === i && !(id in candidateUsers));
+    if (missing.length === 0) return;
+    Promise.all(missing.map((id) => getUser(id).catch(() => null))).then(
+      (loaded) =>
+        setCandidateUsers((prev) => {
+          const next = { ...prev };
+          missing.forEach((id, i) => {
+            next[id] = loaded[i];
+          });
+          return next;
+        }),
+    );
+  }, [matchResults]);
+
+  const handleUserSearch = async (e) => {
+    e.preventDefault();
+    const q = userQuery.trim();
+    setSelectedUserId("");
+    try {
+      setFoundUsers(q ? await searchUsers(q, "id,name,username") : []);
+    } catch (err) {
+      setFoundUsers([]);
+    }
+  };
+
   const isOwner = project && user && project.owner_id === user.id;
 
   const handleDelete = async () => {
@@ -97,10 +127,12 @@ export default function ProjectDetail() {
     setMatching(true);
     setMatchResults(null);
     try {
-      const results = await matchCandidates(projectId, null, 3);
-      setMatchResults(results);
+      // Роли отображаются по мере готовности
+      await matchCandidatesStream(projectId, (roleResult) =>
+        setMatchResults((prev) => [...(prev || []), roleResult]),
+      );
     } catch (err) {
-      alert(err.response?.data?.detail || "Ошибка AI сервиса");
+      alert(err.message || "Ошибка AI сервиса");
     } finally {
       setMatching(false);
     }
@@ -126,7 +158,7 @@ export default function ProjectDetail() {
   };
 
   const memberIds = members.map((m) => m.id);
-  const availableUsers = allUsers.filter(
+  const availableUsers = foundUsers.filter(
     (u) => u.id !== project?.owner_id && !memberIds.includes(u.id),
   );
 
@@ -259,6 +291,14 @@ export default function ProjectDetail() {
               borderRadius: "8px",
             }}
           >
+            <form onSubmit={handleUserSearch} style={{ marginBottom: "12px" }}>
+              <input
+                type="search"
+                value={userQuery}
+                onChange={(e) => setUserQuery(e.target.value)}
+                placeholder="Найдите пользователя по имени или username"
+              />
+            </form>
             <div className="flex" style={{ flexWrap: "wrap" }}>
               <select
                 value={selectedUserId}
@@ -371,9 +411,7 @@ export default function ProjectDetail() {
                   ) : (
                     <div>
                       {roleResult.candidates.map((candidate) => {
-                        const userData = allUsers.find(
-                          (u) => u.id === candidate.id,
-                        );
+                        const userData = candidateUsers[candidate.id];
                         const alreadyMember = memberIds.includes(candidate.id);
 
                         return (
@@ -8,15 +8,18 @@ export default function Projects() {
   const [projects, setProjects] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     loadProjects();
   }, []);
 
-  const loadProjects = async () => {
+  const loadProjects = async (cursor = null) => {
+    setLoading(true);
     try {
-      const data = await getProjects();
-      setProjects(data);
+      const page = await getProjects({ cursor });
+      setProjects((prev) => (cursor ? [...prev, ...page.items] : page.items));
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError("Ошибка загрузки проектов");
     } finally {
@@ -42,6 +45,12 @@ export default function Projects() {
         ))}
       </div>
 
+      {nextCursor && !loading && (
+        <div style={{ textAlign: "center", marginTop: "16px" }}>
+          <button onClick={() => loadProjects(nextCursor)}>Показать ещё</button>
+        </div>
+      )}
+
       {!loading && projects.length === 0 && (
         <div className="card" style={{ textAlign: "center", color: "#666" }}>
           Проектов пока нет. <Link to="/projects/new">Создайте первый!</Link>
@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import { getUsers } from "../api/users";
+import { getUsers, searchUsers } from "../api/users";
 import Layout from "../components/Layout";
 import UserCard from "../components/UserCard";
 
@@ -7,15 +7,38 @@ export default function Users() {
   const [users, setUsers] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
+  const [query, setQuery] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     loadUsers();
   }, []);
 
-  const loadUsers = async () => {
+  const loadUsers = async (search = "") => {
+    setLoading(true);
+    setError("");
     try {
-      const data = await getUsers();
-      setUsers(data);
+      if (search) {
+        setUsers(await searchUsers(search));
+        setNextCursor(null);
+      } else {
+        const page = await getUsers();
+        setUsers(page.items);
+        setNextCursor(page.nextCursor);
+      }
+    } catch (err) {
+      setError("Ошибка загрузки пользователей");
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const loadMore = async () => {
+    setLoading(true);
+    try {
+      const page = await getUsers({ cursor: nextCursor });
+      setUsers((prev) => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError("Ошибка загрузки пользователей");
     } finally {
@@ -27,6 +50,21 @@ export default function Users() {
     <Layout>
       <h1>Пользователи</h1>
 
+      <form
+        onSubmit={(e) => {
+          e.preventDefault();
+          loadUsers(query.trim());
+        }}
+        style={{ marginBottom: "16px" }}
+      >
+        <input
+          type="search"
+          value={query}
+          onChange={(e) => setQuery(e.target.value)}
+          placeholder="Поиск по имени, username и описанию"
+        />
+      </form>
+
       {loading && <div className="loading">Загрузка...</div>}
       {error && <div className="error-message">{error}</div>}
 
@@ -36,9 +74,15 @@ export default function Users() {
         ))}
       </div>
 
+      {nextCursor && !loading && (
+        <div style={{ textAlign: "center", marginTop: "16px" }}>
+          <button onClick={loadMore}>Показать ещё</button>
+        </div>
+      )}
+
       {!loading && users.length === 0 && (
         <div className="card" style={{ textAlign: "center", color: "#666" }}>
-          Пользователей пока нет
+          {query.trim() ? "Ничего не найдено" : "Пользователей пока нет"}
         </div>
       )}
     </Layout>